@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+bench_fetch.py - fetchパイプラインのベンチマーク
+スタブサーバー（bench/stub_server.py）を起動し、各エンドポイントをスタブに向けて
+書籍情報取得 → レビュー収集 を指定件数のISBNで実行する
+スループット・工程別の p50/p95・ピークRSSを計測し、JSONファイルに保存して比較できるようにする
+
+使い方:
+    python bench/bench_fetch.py [--sizes 1,100,10000] [--workers 8] [--latency-ms 20]
+                                [--route-latency serp=300] [--error-rate 0.01] [--output result.json]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from bench_parse import max_rss_kb
+
+
+def generate_isbns(count, prefix='9784'):
+    """チェックディジットが正しいISBN-13を連番で生成"""
+    from main import calculate_isbn13_check_digit
+    isbns = []
+    for i in range(count):
+        isbn12 = f"{prefix}{i:08d}"
+        isbns.append(isbn12 + str(calculate_isbn13_check_digit(isbn12)))
+    return isbns
+
+
+def percentile(values, p):
+    """パーセンタイル（最近傍順位法）"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(values):
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 50), 2) if values else None,
+        'p95_ms': round(percentile(values, 95), 2) if values else None,
+        'max_ms': round(max(values), 2) if values else None,
+    }
+
+
+def stub_config(base_url):
+    """全エンドポイントをスタブに向け、レート制限を実質無効にした設定"""
+    unlimited = {'rps': 100000, 'burst': 100000}
+    return {
+        'endpoints': {
+            'google_books': f"{base_url}/books/v1/volumes",
+            'google_search': f"{base_url}/search",
+            'amazon': base_url,
+            'bing': f"{base_url}/search",
+        },
+        'rate_limits': {'default': unlimited, '127.0.0.1': unlimited},
+        # スタブでは全ブログが同一ホストになるため、ホスト単位の同時接続制限は外す
+        'review_detail': {'per_host': 1000},
+    }
+
+
+def run_case(count, base_url, workers):
+    """
+    1ケースを計測（作業ディレクトリは呼び出し側で用意した空ディレクトリ）
+
+    Returns:
+        dict: 計測結果
+    """
+    import main as app
+    import http_client
+
+    logger = logging.getLogger('bench')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    config = stub_config(base_url)
+    app.apply_config(config)
+    app.apply_fetch_config(config)
+    http_client.configure(pool_maxsize=workers)
+
+    isbns = generate_isbns(count)
+    timings = {'metadata': [], 'reviews': [], 'total': []}
+    failed = 0
+
+    def pipeline(isbn):
+        start = time.perf_counter()
+        book_data, _ = app.fetch_metadata_stage(isbn, logger)
+        metadata_done = time.perf_counter()
+        app.fetch_reviews_stage(book_data, logger)
+        end = time.perf_counter()
+        return (metadata_done - start) * 1000, (end - metadata_done) * 1000, (end - start) * 1000
+
+    start_time = time.perf_counter()
+    app.prefetch_books_bulk(isbns, logger, workers=workers)
+    prefetch_ms = (time.perf_counter() - start_time) * 1000
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(pipeline, isbn) for isbn in isbns]
+        for future in as_completed(futures):
+            try:
+                metadata_ms, reviews_ms, total_ms = future.result()
+            except Exception:
+                failed += 1
+                continue
+            timings['metadata'].append(metadata_ms)
+            timings['reviews'].append(reviews_ms)
+            timings['total'].append(total_ms)
+    elapsed = time.perf_counter() - start_time
+
+    return {
+        'isbns': count,
+        'workers': workers,
+        'wall_s': round(elapsed, 3),
+        'throughput_per_min': round(count / elapsed * 60, 1),
+        'succeeded': count - failed,
+        'failed': failed,
+        'stages': {
+            'prefetch': {'total_ms': round(prefetch_ms, 2)},
+            **{stage: summarize(values) for stage, values in timings.items()},
+        },
+        'peak_rss_kb': max_rss_kb(),
+    }
+
+
+def start_stub(args):
+    """スタブサーバーを別プロセスで起動（計測プロセスのRSSに含めない）"""
+    command = [sys.executable, os.path.join(BENCH_DIR, 'stub_server.py'),
+               '--latency-ms', str(args.latency_ms), '--error-rate', str(args.error_rate),
+               '--pad-kb', str(args.pad_kb)]
+    for value in args.route_latency or []:
+        command += ['--route-latency', value]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    base_url = process.stdout.readline().strip()
+    if not base_url.startswith('http'):
+        process.kill()
+        raise RuntimeError("スタブサーバーの起動に失敗しました")
+    return process, base_url
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='fetchパイプラインのベンチマーク（スタブサーバー使用）')
+    parser.add_argument('--sizes', default='1,100,10000', help='ISBN件数（カンマ区切り）')
+    parser.add_argument('--workers', type=int, default=8, help='並列数')
+    parser.add_argument('--latency-ms', type=float, default=20, help='スタブの応答遅延（ミリ秒）')
+    parser.add_argument('--route-latency', action='append', help='経路別の遅延（例: serp=300）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='スタブが503を返す割合')
+    parser.add_argument('--pad-kb', type=int, default=100, help='HTMLページの水増しサイズ（KB）')
+    parser.add_argument('--output', help='結果JSONの保存先（既定: bench/results/fetch_<日時>.json）')
+    parser.add_argument('--case', type=int, help='（内部用）1ケースのみ計測してJSON出力')
+    parser.add_argument('--base-url', help='（内部用）スタブサーバーのURL')
+    args = parser.parse_args()
+
+    if args.case is not None:
+        result = run_case(args.case, args.base_url, args.workers)
+        print(json.dumps(result))
+        return
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    stub, base_url = start_stub(args)
+    results = []
+    try:
+        print(f"{'isbns':>7}{'wall':>10}{'books/min':>12}{'meta p50/p95':>18}{'reviews p50/p95':>20}{'peak rss':>12}{'failed':>8}")
+        for size in sizes:
+            # ケースごとに別プロセス・空の作業ディレクトリで計測（キャッシュ・RSSを持ち越さない）
+            with tempfile.TemporaryDirectory(prefix='bookpost-bench-') as workdir:
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--case', str(size),
+                     '--base-url', base_url, '--workers', str(args.workers)],
+                    cwd=workdir, check=True, capture_output=True, text=True
+                ).stdout
+            r = json.loads(output.strip().splitlines()[-1])
+            results.append(r)
+            meta, reviews = r['stages']['metadata'], r['stages']['reviews']
+            print(f"{r['isbns']:>7}{r['wall_s']:>9.1f}s{r['throughput_per_min']:>12.1f}"
+                  f"{meta['p50_ms'] or 0:>9.0f}/{meta['p95_ms'] or 0:<8.0f}"
+                  f"{reviews['p50_ms'] or 0:>11.0f}/{reviews['p95_ms'] or 0:<8.0f}"
+                  f"{r['peak_rss_kb'] // 1024:>10}MB{r['failed']:>8}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    report = {
+        'benchmark': 'fetch',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'workers': args.workers,
+            'latency_ms': args.latency_ms,
+            'route_latency': args.route_latency or [],
+            'error_rate': args.error_rate,
+            'pad_kb': args.pad_kb,
+        },
+        'results': results,
+    }
+    output_path = args.output or os.path.join(BENCH_DIR, 'results', f"fetch_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n結果: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+bench_parse.py - HTML解析ベンチマーク
+旧実装（response.text → BeautifulSoupで全体ツリー構築）と
+extractors.py（lxmlでバイト列を直接解析 + XPath）の1ページあたりの
+解析時間・ピークメモリを比較する
+
+使い方:
+    python bench/bench_parse.py [--runs 20] [--size-kb 500]
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import extractors
+
+
+def max_rss_kb():
+    """プロセスの最大RSS（KB）。計測できない環境では0"""
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def build_amazon_page(size_kb):
+    """Amazon商品ページ相当のHTML（レビュー以外のマークアップでsize_kbまで水増し）"""
+    filler = ''.join(
+        f'<div class="a-section a-spacing-small" id="feature-{i}"><span class="a-text-bold">項目{i}</span>'
+        f'<ul class="a-unordered-list"><li><span>説明テキスト{i} ' + 'ダミー' * 20 + '</span></li></ul>'
+        f'<script>var x{i} = {{"k": "{"v" * 40}"}};</script></div>'
+        for i in range(size_kb * 2)
+    )
+    reviews = ''.join(
+        f'<li data-hook="review" class="review aok-relative">'
+        f'<a data-hook="review-title" class="a-link-normal"><span>レビュータイトル{i}</span></a>'
+        f'<i data-hook="review-star-rating"><span class="a-icon-alt">5つ星のうち{i % 5 + 1}.0</span></i>'
+        f'<span data-hook="review-body"><span>とても参考になりました。' + '本文' * 50 + f'{i}</span></span></li>'
+        for i in range(10)
+    )
+    html = (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>商品</title></head><body>'
+        f'<div id="dp">{filler}</div><div id="reviews"><ul>{reviews}</ul></div></body></html>'
+    )
+    return html.encode('utf-8')
+
+
+def build_google_page(size_kb):
+    """Google検索結果ページ相当のHTML"""
+    filler = ''.join(
+        f'<div class="MjjYud"><span class="x{i}">関連キーワード{i}</span>'
+        f'<style>.c{i}{{color:#{i % 999:03d}}}</style></div>'
+        for i in range(size_kb * 8)
+    )
+    results = ''.join(
+        f'<div class="g"><div class="yuRUbf"><a href="https://example.com/review/{i}">'
+        f'<h3 class="LC20lb">書評ブログ{i}</h3></a></div>'
+        f'<div class="VwiC3b">この本は{i}番目のスニペットです。</div></div>'
+        for i in range(10)
+    )
+    html = (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>検索</title></head><body>'
+        f'<div id="search">{results}</div>{filler}</body></html>'
+    )
+    return html.encode('utf-8')
+
+
+# --- 旧実装（比較用）------------------------------------------------------
+
+def legacy_amazon(content):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content.decode('utf-8'), 'lxml')
+    results = []
+    for review in soup.find_all('li', {'data-hook': 'review'}, limit=5):
+        title_elem = review.find('a', {'data-hook': 'review-title'})
+        body_elem = review.find('span', {'data-hook': 'review-body'})
+        results.append((title_elem.get_text(strip=True), body_elem.get_text(strip=True)))
+    return results
+
+
+def legacy_google(content):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content.decode('utf-8'), 'lxml')
+    results = []
+    for result in soup.find_all('div', class_='g', limit=10):
+        snippet = result.find('div', class_='VwiC3b')
+        results.append((result.find('h3').get_text(strip=True), snippet.get_text(strip=True)))
+    return results
+
+
+# --- 新実装 ---------------------------------------------------------------
+
+_logger = logging.getLogger('bench')
+_logger.addHandler(logging.NullHandler())
+_logger.propagate = False
+
+
+def current_amazon(content):
+    return extractors.extract_amazon_reviews(content, '', _logger, 'utf-8')
+
+
+def current_google(content):
+    return extractors.extract_google_results(content, _logger, 'utf-8')
+
+
+CASES = {
+    'amazon_legacy': (build_amazon_page, legacy_amazon),
+    'amazon_current': (build_amazon_page, current_amazon),
+    'google_legacy': (build_google_page, legacy_google),
+    'google_current': (build_google_page, current_google),
+}
+
+
+def measure(case, runs, size_kb):
+    """1ケースを計測（時間: 中央値, メモリ: tracemalloc のピーク + プロセスRSSの増分）"""
+    build, parse = CASES[case]
+    content = build(size_kb)
+    parse(content)  # ウォームアップ（import・XPathコンパイル）
+
+    rss_before = max_rss_kb()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        parse(content)
+        timings.append(time.perf_counter() - start)
+    rss_after = max_rss_kb()
+
+    tracemalloc.start()
+    parse(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'case': case,
+        'page_kb': len(content) // 1024,
+        'median_ms': round(statistics.median(timings) * 1000, 2),
+        'python_peak_kb': peak // 1024,
+        'rss_growth_kb': rss_after - rss_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTML解析ベンチマーク')
+    parser.add_argument('--runs', type=int, default=20, help='計測回数')
+    parser.add_argument('--size-kb', type=int, default=500, help='ページサイズの目安（KB）')
+    parser.add_argument('--case', choices=CASES.keys(), help='（内部用）1ケースのみ計測してJSON出力')
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(measure(args.case, args.runs, args.size_kb)))
+        return
+
+    # ケースごとに別プロセスで計測（RSSが他ケースの影響を受けないように）
+    print(f"{'case':<16}{'page':>8}{'median':>12}{'py peak':>12}{'rss +':>10}")
+    for case in CASES:
+        output = subprocess.run(
+            [sys.executable, __file__, '--case', case, '--runs', str(args.runs), '--size-kb', str(args.size_kb)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        r = json.loads(output)
+        print(f"{r['case']:<16}{r['page_kb']:>6}KB{r['median_ms']:>10}ms{r['python_peak_kb']:>10}KB{r['rss_growth_kb']:>8}KB")
+
+
+if __name__ == '__main__':
+    main()
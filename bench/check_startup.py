@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+check_startup.py - CLI起動時間の確認
+`python -X importtime main.py ...` を複数回実行し、インタープリター自体の起動分
+（`python -X importtime -c pass`）を除いた import 時間の中央値が予算内かを確認する
+cronから頻繁に起動される `--help` と `post` で、通信・スクレイピング系の重いモジュール
+（requests・lxml など）が読み込まれていないことも確認する
+
+予算超過・重いモジュールの読み込みがあれば終了コード1（CIや変更前の確認に使用）
+
+使い方:
+    python bench/check_startup.py [--runs 7] [--budget-ms 50]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN_PATH = os.path.join(os.path.dirname(BENCH_DIR), 'main.py')
+
+# 確認するコマンド（post は空の作業ディレクトリで実行 → ファイル確認で終了）
+CASES = {
+    '--help': ['--help'],
+    'post': ['post', '--isbn', '9784000000000'],
+}
+
+# 起動時に読み込まれてはいけないモジュール（使用するコマンド内でのみ import）
+HEAVY_MODULES = ('requests', 'urllib3', 'lxml', 'bs4', 'cProfile', 'concurrent.futures.process',
+                 'http_client', 'scraper', 'extractors')
+
+
+def parse_importtime(stderr):
+    """
+    -X importtime の出力を解析
+
+    Returns:
+        tuple: (トップレベルの import 時間の合計（マイクロ秒）, 読み込まれたモジュール名のセット)
+    """
+    total_us = 0
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.add(name.strip())
+        # 字下げなし（1スペースのみ）がトップレベルの import
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative)
+    return total_us, modules
+
+
+def run(args, workdir):
+    """1回実行して (import時間（ミリ秒）, 実行時間（ミリ秒）, モジュール名のセット) を返す"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=workdir,
+                            capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    total_us, modules = parse_importtime(result.stderr)
+    return total_us / 1000, wall_ms, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CLI起動時間の確認（-X importtime）')
+    parser.add_argument('--runs', type=int, default=7, help='1コマンドあたりの実行回数（中央値で判定）')
+    parser.add_argument('--budget-ms', type=float, default=50.0,
+                        help='import時間の予算（ミリ秒、インタープリター自体の起動分を除く）')
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory(prefix='bookpost-startup-') as workdir:
+        baseline = [run(['-c', 'pass'], workdir) for _ in range(args.runs)]
+        baseline_import = statistics.median(r[0] for r in baseline)
+        baseline_wall = statistics.median(r[1] for r in baseline)
+        print(f"基準（python -c pass）: import {baseline_import:.1f}ms / 実行 {baseline_wall:.1f}ms")
+
+        for name, case_args in CASES.items():
+            results = [run([MAIN_PATH] + case_args, workdir) for _ in range(args.runs)]
+            import_ms = statistics.median(r[0] for r in results) - baseline_import
+            wall_ms = statistics.median(r[1] for r in results) - baseline_wall
+            heavy = sorted(set().union(*(r[2] for r in results)) & set(HEAVY_MODULES))
+
+            ok = import_ms <= args.budget_ms and not heavy
+            failed |= not ok
+            print(f"{'✅' if ok else '❌'} {name:<8} import +{import_ms:.1f}ms（予算 {args.budget_ms:.0f}ms） / "
+                  f"実行 +{wall_ms:.1f}ms")
+            if heavy:
+                print(f"   読み込まれた重いモジュール: {', '.join(heavy)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
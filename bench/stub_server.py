@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+stub_server.py - ベンチマーク用スタブサーバー
+Google Books API・Google検索・Amazon検索/商品ページ・レビューブログを
+bench/fixtures/ の記録済みレスポンスで返す（ネットワーク不要）
+経路ごとの遅延・エラー率を指定でき、本番に近い負荷で fetch を計測できる
+
+使い方:
+    python bench/stub_server.py [--port 0] [--latency-ms 50] [--route-latency serp=300] [--error-rate 0.01]
+    （起動後、1行目に "http://127.0.0.1:<port>" を出力）
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from string import Template
+from urllib.parse import urlparse, parse_qs, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# 経路名 → (パスの先頭, フィクスチャ)
+ROUTES = {
+    'books': '/books/v1/volumes',
+    'serp': '/search',
+    'amazon_search': '/s',
+    'amazon_product': '/dp/',
+    'blog': '/blog/',
+    'robots': '/robots.txt',
+}
+
+
+def load_fixtures():
+    """フィクスチャの読み込み（HTMLは $base / $isbn / $title / $key / $query を置換して使用）"""
+    def read(name):
+        with open(os.path.join(FIXTURE_DIR, name), 'r', encoding='utf-8') as f:
+            return f.read()
+    return {
+        'volume': json.loads(read('google_books_volume.json')),
+        'serp': Template(read('google_serp.html')),
+        'amazon_search': Template(read('amazon_search.html')),
+        'amazon_product': Template(read('amazon_product.html')),
+        'blog': Template(read('blog.html')),
+        'robots': read('robots.txt'),
+    }
+
+
+def padding(size_kb):
+    """実ページ相当のサイズにするための水増し（結果要素の後ろに付与）"""
+    block = '<div class="pad"><span>関連コンテンツ</span><script>var p={"k":"' + 'v' * 60 + '"};</script></div>\n'
+    return block * (size_kb * 1024 // len(block.encode('utf-8')))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = 'bookpost-stub/1.0'
+    protocol_version = 'HTTP/1.1'   # keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    def route(self, path):
+        for name, prefix in ROUTES.items():
+            if path == prefix or (prefix.endswith('/') and path.startswith(prefix)):
+                return name
+        return None
+
+    def do_GET(self):
+        settings = self.server.settings
+        parsed = urlparse(self.path)
+        name = self.route(parsed.path)
+        with self.server.lock:
+            self.server.counts[name or 'unknown'] = self.server.counts.get(name or 'unknown', 0) + 1
+
+        latency = settings['route_latency'].get(name, settings['latency_ms'])
+        if latency:
+            time.sleep(random.uniform(0.5, 1.5) * latency / 1000)
+
+        if name is None:
+            return self.respond(404, 'text/plain', 'not found')
+        if name != 'robots' and random.random() < settings['error_rate']:
+            return self.respond(503, 'text/plain', 'service unavailable', {'Retry-After': '0'})
+
+        base = f"http://{self.headers.get('Host')}"
+        query = parse_qs(parsed.query)
+        fixtures = self.server.fixtures
+        pad = padding(settings['pad_kb']) if name in ('serp', 'amazon_search', 'amazon_product', 'blog') else ''
+
+        if name == 'books':
+            body = json.dumps(self.books_response(query.get('q', [''])[0]), ensure_ascii=False)
+            return self.respond(200, 'application/json; charset=UTF-8', body)
+        if name == 'robots':
+            return self.respond(200, 'text/plain', fixtures['robots'])
+        if name == 'serp':
+            term = query.get('q', [''])[0]
+            key = hashlib.sha1(term.encode('utf-8')).hexdigest()[:10]
+            html = fixtures['serp'].safe_substitute(base=base, key=key, title=term, query=term)
+        elif name == 'amazon_search':
+            isbn = query.get('k', [''])[0]
+            html = fixtures['amazon_search'].safe_substitute(base=base, isbn=isbn, title=f"書籍 {isbn}")
+        elif name == 'amazon_product':
+            isbn = parsed.path.split('/')[2]
+            html = fixtures['amazon_product'].safe_substitute(base=base, isbn=isbn, title=f"書籍 {isbn}")
+        else:
+            html = fixtures['blog'].safe_substitute(base=base, title=unquote(parsed.path))
+        # 水増しは </body> の直前（結果要素より後ろ）に入れる
+        html = html.replace('</body>', pad + '</body>', 1)
+        return self.respond(200, 'text/html; charset=UTF-8', html)
+
+    def books_response(self, q):
+        """"isbn:A OR isbn:B" 形式のクエリに対し、ISBNごとに1件の volumeInfo を返す"""
+        isbns = [term.split(':', 1)[1] for term in q.split(' OR ') if term.startswith('isbn:')]
+        items = []
+        for isbn in isbns:
+            volume = dict(self.server.fixtures['volume'])
+            volume['title'] = f"{volume['title']} {isbn[-4:]}"
+            volume['industryIdentifiers'] = [{'type': 'ISBN_13', 'identifier': isbn}]
+            items.append({'kind': 'books#volume', 'volumeInfo': volume})
+        return {'kind': 'books#volumes', 'totalItems': len(items), 'items': items}
+
+    def respond(self, status, content_type, body, headers=None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # クライアントの受信打ち切り（必要な要素を受信済み）による切断は無視
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+def create_server(port=0, latency_ms=0, route_latency=None, error_rate=0.0, pad_kb=0):
+    """スタブサーバーを生成（serve_forever は呼び出し側で実行）"""
+    server = StubServer(('127.0.0.1', port), StubHandler)
+    server.fixtures = load_fixtures()
+    server.settings = {
+        'latency_ms': latency_ms,
+        'route_latency': route_latency or {},
+        'error_rate': error_rate,
+        'pad_kb': pad_kb,
+    }
+    server.counts = {}
+    server.lock = threading.Lock()
+    return server
+
+
+def parse_route_latency(values):
+    """["serp=300", "blog=100"] → {"serp": 300, "blog": 100}"""
+    result = {}
+    for value in values or []:
+        name, _, ms = value.partition('=')
+        if name not in ROUTES:
+            raise ValueError(f"不明な経路: {name}（{', '.join(ROUTES)}）")
+        result[name] = float(ms)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ベンチマーク用スタブサーバー')
+    parser.add_argument('--port', type=int, default=0, help='待ち受けポート（0で空きポート）')
+    parser.add_argument('--latency-ms', type=float, default=0, help='全経路の応答遅延（ミリ秒、±50%%のゆらぎ）')
+    parser.add_argument('--route-latency', action='append', help=f"経路別の遅延（例: serp=300）経路: {', '.join(ROUTES)}")
+    parser.add_argument('--error-rate', type=float, default=0.0, help='503を返す割合（0〜1）')
+    parser.add_argument('--pad-kb', type=int, default=0, help='HTMLページの水増しサイズ（KB）')
+    args = parser.parse_args()
+
+    server = create_server(args.port, args.latency_ms, parse_route_latency(args.route_latency),
+                           args.error_rate, args.pad_kb)
+    print(f"http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        sys.stderr.write(json.dumps(server.counts) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+book_cache.py - 書籍情報キャッシュモジュール
+Google Books APIの取得結果をSQLite 1ファイルに保存（TTL・未発見結果のキャッシュ対応）
+旧形式の data/books/book_{isbn}.json も読み込み時・migrate時に取り込む
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+import tracing
+
+
+DB_PATH = "data/books/books.db"
+LEGACY_DIR = "data/books"
+
+# 有効期限（秒）
+BOOK_TTL = 30 * 24 * 3600       # 取得成功: 30日
+NOT_FOUND_TTL = 24 * 3600       # 該当なし: 1日（登録待ちの新刊を考慮して短め）
+
+FOUND = 'found'
+NOT_FOUND = 'not_found'
+
+_local = threading.local()
+
+
+def configure(db_path=None, ttl=None, not_found_ttl=None):
+    """
+    キャッシュ設定の反映（config.json の book_cache）
+
+    Args:
+        db_path: SQLiteファイルパス
+        ttl: 取得成功時の有効期限（秒）
+        not_found_ttl: 該当なし時の有効期限（秒）
+    """
+    global DB_PATH, BOOK_TTL, NOT_FOUND_TTL
+    if db_path:
+        DB_PATH = db_path
+    if ttl is not None:
+        BOOK_TTL = ttl
+    if not_found_ttl is not None:
+        NOT_FOUND_TTL = not_found_ttl
+
+
+def get_connection():
+    """スレッドごとのSQLite接続を取得（初回のみ生成・テーブル作成）"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.db_path == DB_PATH:
+        return conn
+
+    db_dir = os.path.dirname(DB_PATH)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+
+    # 並列ワーカーからの同時書き込みはWAL + ロック待ちで直列化
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS books ("
+            " isbn TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " data TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_books_expires ON books(expires_at)")
+
+    _local.conn = conn
+    _local.db_path = DB_PATH
+    return conn
+
+
+def _legacy_path(isbn):
+    return os.path.join(LEGACY_DIR, f"book_{isbn}.json")
+
+
+def _import_legacy(isbn):
+    """旧形式のJSONファイルがあれば取り込んで返す"""
+    legacy_path = _legacy_path(isbn)
+    if not os.path.exists(legacy_path):
+        return None
+    with open(legacy_path, 'r', encoding='utf-8') as f:
+        book_data = json.load(f)
+    put(isbn, book_data)
+    return book_data
+
+
+def get(isbn):
+    """
+    キャッシュから書籍情報を取得
+
+    Args:
+        isbn: 正規化済みISBN-13
+
+    Returns:
+        tuple | None: (FOUND, 書籍情報) / (NOT_FOUND, None)、未登録・期限切れはNone
+    """
+    row = get_connection().execute(
+        "SELECT status, data, expires_at FROM books WHERE isbn = ?", (isbn,)
+    ).fetchone()
+
+    if row is not None and row[0] == FOUND:
+        if row[2] > time.time():
+            return FOUND, json.loads(row[1])
+        return None
+
+    # 未登録・該当なしの場合は手動で作成されたJSONファイルを優先
+    book_data = _import_legacy(isbn)
+    if book_data is not None:
+        return FOUND, book_data
+
+    if row is not None and row[2] > time.time():
+        return NOT_FOUND, None
+    return None
+
+
+def lookup(isbns):
+    """
+    有効期限内の登録状況をまとめて取得（カタログ取り込みの判定用、旧形式のJSONは参照しない）
+
+    Args:
+        isbns: 正規化済みISBN-13のリスト（1000件程度ずつ）
+
+    Returns:
+        dict: ISBN → FOUND / NOT_FOUND（未登録・期限切れのISBNは含まない）
+    """
+    if not isbns:
+        return {}
+    placeholders = ','.join('?' * len(isbns))
+    rows = get_connection().execute(
+        f"SELECT isbn, status FROM books WHERE expires_at > ? AND isbn IN ({placeholders})",
+        (time.time(), *isbns)
+    )
+    return dict(rows)
+
+
+def load(isbn):
+    """
+    有効期限に関係なく書籍情報を取得（投稿準備など再取得不要な用途向け）
+
+    Returns:
+        dict | None: 書籍情報（未登録・該当なしはNone）
+    """
+    row = get_connection().execute(
+        "SELECT data FROM books WHERE isbn = ? AND status = ?", (isbn, FOUND)
+    ).fetchone()
+    if row is not None:
+        return json.loads(row[0])
+    return _import_legacy(isbn)
+
+
+@tracing.traced('book_cache_put', 'io')
+def put(isbn, book_data):
+    """書籍情報を保存（同一ISBNは置き換え）"""
+    fetched_at = time.time()
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO books (isbn, status, data, fetched_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (isbn, FOUND, json.dumps(book_data, ensure_ascii=False), fetched_at, fetched_at + BOOK_TTL)
+        )
+
+
+def put_not_found(isbn):
+    """該当なしの結果を保存（NOT_FOUND_TTLの間はAPIを再呼び出ししない）"""
+    now = time.time()
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO books (isbn, status, data, fetched_at, expires_at) VALUES (?, ?, NULL, ?, ?)",
+            (isbn, NOT_FOUND, now, now + NOT_FOUND_TTL)
+        )
+
+
+def stats():
+    """
+    キャッシュの統計情報
+
+    Returns:
+        dict: total / found / not_found / expired / db_size（バイト）
+    """
+    now = time.time()
+    row = get_connection().execute(
+        "SELECT COUNT(*),"
+        " COALESCE(SUM(status = ?), 0),"
+        " COALESCE(SUM(status = ?), 0),"
+        " COALESCE(SUM(expires_at <= ?), 0)"
+        " FROM books",
+        (FOUND, NOT_FOUND, now)
+    ).fetchone()
+    db_size = sum(
+        os.path.getsize(path)
+        for path in (DB_PATH, DB_PATH + '-wal')
+        if os.path.exists(path)
+    )
+    return {
+        'total': row[0],
+        'found': row[1],
+        'not_found': row[2],
+        'expired': row[3],
+        'db_size': db_size,
+    }
+
+
+def gc():
+    """
+    期限切れのエントリを削除してファイルを縮小
+
+    Returns:
+        int: 削除件数
+    """
+    conn = get_connection()
+    with conn:
+        cursor = conn.execute("DELETE FROM books WHERE expires_at <= ?", (time.time(),))
+    conn.execute("VACUUM")
+    return cursor.rowcount
+
+
+def migrate(logger, delete_json=False):
+    """
+    旧形式のJSONファイル（data/books/book_{isbn}.json）を一括取り込み
+
+    Args:
+        logger: ロガー
+        delete_json: Trueの場合は取り込み後にJSONファイルを削除
+
+    Returns:
+        int: 取り込み件数
+    """
+    if not os.path.isdir(LEGACY_DIR):
+        return 0
+
+    conn = get_connection()
+    imported = []
+    with conn:
+        for entry in os.scandir(LEGACY_DIR):
+            if not (entry.name.startswith('book_') and entry.name.endswith('.json')):
+                continue
+            isbn = entry.name[len('book_'):-len('.json')]
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    book_data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"取り込みスキップ: {entry.path}: {e}")
+                continue
+            fetched_at = entry.stat().st_mtime
+            conn.execute(
+                "INSERT OR REPLACE INTO books (isbn, status, data, fetched_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (isbn, FOUND, json.dumps(book_data, ensure_ascii=False), fetched_at, fetched_at + BOOK_TTL)
+            )
+            imported.append(entry.path)
+
+    # 取り込みに成功したファイルのみ削除
+    if delete_json:
+        for path in imported:
+            os.remove(path)
+
+    logger.info(f"キャッシュ移行完了: {len(imported)}件")
+    return len(imported)
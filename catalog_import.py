@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+catalog_import.py - カタログ取り込みモジュール
+出版社・取次のカタログ（CSV/TSV）を1行ずつ読み込んでISBN列を取り出す（import コマンド用）
+
+ファイル内の重複判定は一時SQLiteデータベース（ディスク上に作成し、メモリはページキャッシュのみ）で行い、
+数百万行のファイルでもメモリ使用量は一定
+"""
+
+import os
+import csv
+import sys
+import sqlite3
+import itertools
+
+
+CHUNK_SIZE = 1000             # 書籍情報キャッシュの照会・出力をまとめる行数
+SEEN_CACHE_KB = 16 * 1024     # 重複判定用データベースのページキャッシュ（KB）
+PROGRESS_ROWS = 100000        # 進捗をログに出力する行数の間隔
+SHOW_INVALID = 10             # 画面に表示する無効行の件数（全件は --invalid のファイルへ）
+
+# 見出し行の判定（列名に含まれていればISBN列と見なす、大文字小文字は区別しない）
+HEADER_KEYWORD = 'isbn'
+
+
+def detect_delimiter(path, first_line):
+    """区切り文字の判定（拡張子 .tsv または1行目にタブがあればタブ、それ以外はカンマ）"""
+    if path.lower().endswith('.tsv') or first_line.count('\t') > first_line.count(','):
+        return '\t'
+    return ','
+
+
+def resolve_column(first_row, column=None):
+    """
+    ISBN列の位置と1行目が見出しかどうかを判定
+
+    Args:
+        first_row: 1行目の値のリスト
+        column: 列名または列番号（1始まり）、省略時は列名に "isbn" を含む列、なければ1列目
+
+    Returns:
+        tuple: (列の位置（0始まり）, 1行目が見出しならTrue)
+
+    Raises:
+        ValueError: 指定の列名が見出しにない場合
+    """
+    names = [name.strip().casefold() for name in first_row]
+    if column is not None and column.isdigit():
+        index = int(column) - 1
+        is_header = index < len(names) and HEADER_KEYWORD in names[index]
+        return index, is_header
+    if column is not None:
+        if column.strip().casefold() not in names:
+            raise ValueError(f"ISBN列が見つかりません: {column}（見出し: {', '.join(first_row)}）")
+        return names.index(column.strip().casefold()), True
+    for index, name in enumerate(names):
+        if HEADER_KEYWORD in name:
+            return index, True
+    return 0, False
+
+
+def read_rows(path, column=None, delimiter=None):
+    """
+    カタログからISBN列の値を1行ずつ取り出す（ファイル全体は読み込まない）
+
+    Args:
+        path: CSV/TSVファイル（"-"は標準入力、先頭のBOMは無視）
+        column: 列名または列番号（1始まり）
+        delimiter: 区切り文字（省略時は自動判定、"\\t"・"tab" はタブ）
+
+    Yields:
+        tuple: (行番号, ISBN列の値（列がない行は空文字）)
+
+    Raises:
+        ValueError: 指定の列がない・CSVとして読めない行がある場合
+    """
+    if delimiter in ('\\t', 'tab'):
+        delimiter = '\t'
+    f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8-sig', newline='')
+    try:
+        first_line = f.readline()
+        if not first_line:
+            return
+        reader = csv.reader(itertools.chain([first_line], f), delimiter=delimiter or detect_delimiter(path, first_line))
+        try:
+            first_row = next(reader)
+            index, is_header = resolve_column(first_row, column)
+            if not is_header:
+                yield reader.line_num, first_row[index].strip() if index < len(first_row) else ''
+            for row in reader:
+                if not row:
+                    continue
+                yield reader.line_num, row[index].strip() if index < len(row) else ''
+        except csv.Error as e:
+            raise ValueError(f"{reader.line_num}行目を読み込めません: {e}")
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def chunked(rows, size=None):
+    """行をCHUNK_SIZE件ずつのリストにまとめる"""
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size or CHUNK_SIZE))
+        if not chunk:
+            return
+        yield chunk
+
+
+class SeenSet:
+    """取り込み済みISBNの集合（一時SQLiteデータベース、終了時に削除）"""
+
+    def __init__(self):
+        # 空のパスはSQLiteの一時データベース（ディスク上に作成、close時に削除）
+        # 途中経過は保存不要のため、ジャーナルなし・1トランザクションのまま書き込む
+        self.conn = sqlite3.connect('')
+        self.conn.execute(f"PRAGMA cache_size=-{SEEN_CACHE_KB}")
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("CREATE TABLE seen (isbn TEXT PRIMARY KEY) WITHOUT ROWID")
+
+    def filter_new(self, isbns):
+        """
+        初出のISBNだけを記録して返す（リスト内の重複も除く、1チャンクを1回の照会で判定）
+
+        Returns:
+            list: 初出のISBN（入力順）
+        """
+        unique = list(dict.fromkeys(isbns))
+        if not unique:
+            return []
+        placeholders = ','.join('?' * len(unique))
+        seen = {row[0] for row in self.conn.execute(f"SELECT isbn FROM seen WHERE isbn IN ({placeholders})", unique)}
+        new = [isbn for isbn in unique if isbn not in seen]
+        self.conn.executemany("INSERT INTO seen (isbn) VALUES (?)", ((isbn,) for isbn in new))
+        return new
+
+    def close(self):
+        self.conn.close()
+
+
+def open_output(path):
+    """出力先を開く（"-"は標準出力）"""
+    if path == '-':
+        return sys.stdout
+    output_dir = os.path.dirname(path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    return open(path, 'w', encoding='utf-8', newline='')
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+circuit_breaker.py - ホスト別サーキットブレーカーモジュール
+接続失敗・タイムアウト・5xx が続いたホストへのリクエストを一定時間遮断して即時に失敗させ、
+遮断時間の経過後は1件だけ試行（half-open）して復旧を確認する（プロセス共通）
+"""
+
+import threading
+import time
+
+import requests
+
+
+FAILURE_THRESHOLD = 5      # 連続失敗がこの回数に達したら遮断
+OPEN_SECONDS = 60          # 遮断時間（秒）
+MAX_OPEN_SECONDS = 600     # 試行失敗で延長する遮断時間の上限（秒）
+
+# ブレーカーの状態
+CLOSED = 'closed'          # 通常
+OPEN = 'open'              # 遮断中（即時失敗）
+HALF_OPEN = 'half-open'    # 復旧確認中（1件のみ試行）
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """遮断中のホストへのリクエスト（通信エラーと同様に扱う）"""
+
+
+class CircuitBreaker:
+    """1ホスト分のサーキットブレーカー（スレッドセーフ）"""
+
+    def __init__(self, host):
+        self.host = host
+        self.state = CLOSED
+        self.failures = 0            # 連続失敗回数
+        self.open_seconds = OPEN_SECONDS
+        self.opened_at = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+        # 実行サマリー用の集計
+        self.total_failures = 0
+        self.trips = 0
+        self.rejected = 0
+
+    def before_request(self):
+        """リクエスト可否を判定（遮断中は CircuitOpenError）"""
+        with self.lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.host}: 遮断中（連続失敗{self.failures}回）")
+                self.state = HALF_OPEN
+                self.probing = False
+            if self.state == HALF_OPEN:
+                if self.probing:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.host}: 復旧確認中")
+                self.probing = True
+
+    def on_success(self):
+        with self.lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.open_seconds = OPEN_SECONDS
+            self.probing = False
+
+    def release_probe(self):
+        """結果を判定できなかった試行（ホストの障害以外の例外）の後、次のリクエストで復旧確認をやり直す"""
+        with self.lock:
+            self.probing = False
+
+    def on_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.total_failures += 1
+            if self.state == HALF_OPEN:
+                # 復旧確認に失敗: 遮断時間を延長して再遮断
+                self.open_seconds = min(MAX_OPEN_SECONDS, self.open_seconds * 2)
+                self._open()
+            elif self.state == CLOSED and self.failures >= FAILURE_THRESHOLD:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.probing = False
+        self.trips += 1
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def configure(failure_threshold=None, open_seconds=None, max_open_seconds=None):
+    """
+    ブレーカー設定の反映（config.json の circuit_breaker）
+
+    Args:
+        failure_threshold: 遮断までの連続失敗回数
+        open_seconds: 遮断時間（秒）
+        max_open_seconds: 遮断時間の上限（秒）
+    """
+    global FAILURE_THRESHOLD, OPEN_SECONDS, MAX_OPEN_SECONDS
+    if failure_threshold is not None:
+        FAILURE_THRESHOLD = max(1, failure_threshold)
+    if open_seconds is not None:
+        OPEN_SECONDS = open_seconds
+    if max_open_seconds is not None:
+        MAX_OPEN_SECONDS = max_open_seconds
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def get_breaker(host):
+    """ホストに対応するブレーカーを取得（初回のみ生成）"""
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(host, CircuitBreaker(host))
+    return breaker
+
+
+def before_request(host):
+    """ホストへのリクエスト可否を判定（遮断中は CircuitOpenError）"""
+    get_breaker(host).before_request()
+
+
+def record_success(host):
+    get_breaker(host).on_success()
+
+
+def record_failure(host):
+    get_breaker(host).on_failure()
+
+
+def release_probe(host):
+    get_breaker(host).release_probe()
+
+
+def summary():
+    """
+    実行サマリー用のホスト別状態（失敗・遮断があったホストのみ）
+
+    Returns:
+        list: {"host", "state", "failures", "trips", "rejected"} のリスト
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [
+        {
+            'host': breaker.host,
+            'state': breaker.state,
+            'failures': breaker.total_failures,
+            'trips': breaker.trips,
+            'rejected': breaker.rejected,
+        }
+        for breaker in sorted(breakers, key=lambda b: b.host)
+        if breaker.total_failures or breaker.state != CLOSED
+    ]
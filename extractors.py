@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+extractors.py - HTML抽出モジュール
+取得済みHTMLからレビュー・検索結果を抽出（ネットワークアクセスなし）
+スクレイピング時と reparse コマンド（スナップショットの再解析）で共通利用
+
+BeautifulSoupでページ全体のツリーを作らず、lxmlでバイト列を直接解析し
+XPathで必要な要素だけを取り出す（文字列へのデコードも行わない）
+"""
+
+from lxml import etree
+
+import tracing
+
+
+AMAZON_BASE_URL = "https://www.amazon.co.jp"
+AMAZON_REVIEW_LIMIT = 5
+SEARCH_RESULT_LIMIT = 10
+DETAIL_TEXT_LIMIT = 2000    # レビュー本文の最大文字数
+DETAIL_MIN_PARAGRAPH = 10   # これより短い段落はメニュー等とみなして除外
+
+
+def _has_class(name):
+    """class属性に指定クラスを含む要素のXPath条件"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# XPathは事前コンパイルして使い回す
+_AMAZON_PRODUCT_LINK = etree.XPath(
+    f"//a[{_has_class('a-link-normal')} and {_has_class('s-no-outline')}]/@href"
+)
+_AMAZON_REVIEWS = etree.XPath("//li[@data-hook='review']")
+_AMAZON_REVIEW_TITLE = etree.XPath(".//a[@data-hook='review-title']")
+_AMAZON_REVIEW_RATING = etree.XPath(
+    f".//i[@data-hook='review-star-rating']//span[{_has_class('a-icon-alt')}]"
+)
+_AMAZON_REVIEW_BODY = etree.XPath(".//span[@data-hook='review-body']")
+_FIRST_SPAN = etree.XPath(".//span")
+
+_GOOGLE_RESULTS = etree.XPath(f"//div[{_has_class('g')}]")
+_GOOGLE_SNIPPET = etree.XPath(f".//div[{_has_class('VwiC3b')}]")
+_GOOGLE_SNIPPET_OLD = etree.XPath(f".//span[{_has_class('aCOpRe')}]")
+
+_BING_RESULTS = etree.XPath(f"//li[{_has_class('b_algo')}]")
+
+_TEXT = etree.XPath(".//text()")
+
+# 本文抽出: 本文を含む可能性が高い要素（上から順に候補）
+_CONTENT_CANDIDATES = etree.XPath(
+    "//article | //main | //*[@itemprop='articleBody']"
+    f" | //div[{_has_class('entry-content')} or {_has_class('post-content')}"
+    f" or {_has_class('article-body')} or {_has_class('entry-body')}]"
+)
+_PARAGRAPHS = etree.XPath(".//p")
+_NON_CONTENT_TAGS = ('script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'iframe')
+
+
+def parse_html(content, encoding=None):
+    """
+    HTMLのバイト列を解析してルート要素を返す
+
+    Args:
+        content: HTML（bytes。strも可）
+        encoding: 文字コード（bytes時、不明ならNoneでmetaタグから判定）
+
+    Returns:
+        lxml.etree._Element | None: ルート要素（空文書はNone）
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+        encoding = 'utf-8'
+    parser = etree.HTMLParser(encoding=encoding, no_network=True, remove_comments=True)
+    with tracing.span('parse_html', 'parse', bytes=len(content)):
+        return etree.fromstring(content, parser) if content else None
+
+
+def _text(element):
+    """要素内テキストを前後空白を除いて連結（BeautifulSoupの get_text(strip=True) 相当）"""
+    if element is None:
+        return ''
+    return ''.join(text.strip() for text in _TEXT(element))
+
+
+def _first(elements):
+    return elements[0] if elements else None
+
+
+class ElementCounter:
+    """
+    受信途中のHTMLを逐次解析し、目的の要素が必要数そろったかを判定
+    （http_client.fetch_page の stop_when に渡してダウンロードを早期に打ち切る）
+    """
+
+    def __init__(self, tag, match, limit):
+        self.parser = etree.HTMLPullParser(events=('end',), tag=tag, no_network=True)
+        self.match = match
+        self.limit = limit
+        self.count = 0
+
+    def feed(self, chunk):
+        """チャンクを追加し、必要数に達したらTrue"""
+        try:
+            self.parser.feed(chunk)
+            for _, element in self.parser.read_events():
+                if self.match(element):
+                    self.count += 1
+        except etree.LxmlError:
+            return False  # 判定できない場合は受信を続ける
+        return self.count >= self.limit
+
+
+def _class_tokens(element):
+    return (element.get('class') or '').split()
+
+
+def amazon_product_link_counter():
+    """Amazon検索結果: 最初の商品リンクまで"""
+    return ElementCounter(
+        'a', lambda e: {'a-link-normal', 's-no-outline'} <= set(_class_tokens(e)), 1
+    )
+
+
+def amazon_review_counter():
+    """Amazon商品ページ: レビューAMAZON_REVIEW_LIMIT件まで"""
+    return ElementCounter('li', lambda e: e.get('data-hook') == 'review', AMAZON_REVIEW_LIMIT)
+
+
+def google_result_counter():
+    """Google検索結果: SEARCH_RESULT_LIMIT件まで"""
+    return ElementCounter('div', lambda e: 'g' in _class_tokens(e), SEARCH_RESULT_LIMIT)
+
+
+def bing_result_counter():
+    """Bing検索結果: SEARCH_RESULT_LIMIT件まで"""
+    return ElementCounter('li', lambda e: 'b_algo' in _class_tokens(e), SEARCH_RESULT_LIMIT)
+
+
+def extract_amazon_product_url(content, encoding=None):
+    """
+    Amazon検索結果ページから最初の商品ページURLを抽出
+
+    Returns:
+        str | None: 商品ページURL（見つからない場合はNone）
+    """
+    root = parse_html(content, encoding)
+    if root is None:
+        return None
+    href = _first(_AMAZON_PRODUCT_LINK(root))
+    if href is None:
+        return None
+    return AMAZON_BASE_URL + href
+
+
+def extract_amazon_reviews(content, product_url, logger, encoding=None):
+    """
+    Amazon商品ページからカスタマーレビューを抽出
+
+    Args:
+        content: 商品ページのHTML（bytes）
+        product_url: 商品ページURL（結果に記録）
+        logger: ロガー
+        encoding: 文字コード
+
+    Returns:
+        list: レビュー（number / source / title / rating / content / url）
+    """
+    root = parse_html(content, encoding)
+    results = []
+
+    # レビューセクションを探す（liタグ、data-hook="review"）
+    review_elements = _AMAZON_REVIEWS(root)[:AMAZON_REVIEW_LIMIT] if root is not None else []
+
+    logger.info(f"レビュー要素発見: {len(review_elements)}件")
+
+    for i, review in enumerate(review_elements, 1):
+        try:
+            # レビュータイトル（spanタグ内のテキストを優先）
+            title_elem = _first(_AMAZON_REVIEW_TITLE(review))
+            if title_elem is not None:
+                title_span = _first(_FIRST_SPAN(title_elem))
+                title = _text(title_span if title_span is not None else title_elem)
+            else:
+                title = ''
+
+            # 評価
+            rating = _text(_first(_AMAZON_REVIEW_RATING(review)))
+
+            # レビュー本文（div内のspanに含まれる）
+            body_elem = _first(_AMAZON_REVIEW_BODY(review))
+            if body_elem is not None:
+                body_content = _first(_FIRST_SPAN(body_elem))
+                body = _text(body_content if body_content is not None else body_elem)
+            else:
+                body = ''
+
+            if title or body:
+                results.append({
+                    'number': i,
+                    'source': 'Amazon',
+                    'title': title,
+                    'rating': rating,
+                    'content': body,
+                    'url': product_url
+                })
+                logger.debug("  [Amazon-%d] %s...", i, title[:30])
+
+        except Exception as e:
+            logger.warning(f"Amazonレビュー解析エラー: {e}")
+            continue
+
+    return results
+
+
+def extract_google_results(content, logger, encoding=None):
+    """
+    Google検索結果ページから検索結果を抽出
+
+    Returns:
+        list: 検索結果（number / source / title / url / snippet）
+    """
+    root = parse_html(content, encoding)
+    results = []
+
+    # Google検索結果（通常の検索結果）
+    search_results = _GOOGLE_RESULTS(root)[:SEARCH_RESULT_LIMIT] if root is not None else []
+
+    logger.info(f"Google検索結果: {len(search_results)}件")
+
+    for i, result in enumerate(search_results, 1):
+        try:
+            # タイトルとリンク
+            title_elem = _first(result.xpath('.//h3'))
+            if title_elem is None:
+                continue
+
+            link_elem = _first(result.xpath('.//a'))
+            if link_elem is None:
+                continue
+
+            url = link_elem.get('href', '')
+            title = _text(title_elem)
+
+            # スニペット
+            snippet_elem = _first(_GOOGLE_SNIPPET(result))
+            if snippet_elem is None:
+                snippet_elem = _first(_GOOGLE_SNIPPET_OLD(result))
+            snippet = _text(snippet_elem)
+
+            results.append({
+                'number': i,
+                'source': 'Google',
+                'title': title,
+                'url': url,
+                'snippet': snippet
+            })
+
+            logger.debug("  [Google-%d] %s...", i, title[:50])
+
+        except Exception as e:
+            logger.warning(f"Google検索結果解析エラー: {e}")
+            continue
+
+    return results
+
+
+def extract_bing_results(content, logger, encoding=None):
+    """
+    Bing検索結果ページから検索結果を抽出
+
+    Returns:
+        list: 検索結果（number / title / url / snippet）
+    """
+    root = parse_html(content, encoding)
+    results = []
+
+    # Bing検索結果のセレクタ（class="b_algo"）
+    search_results = _BING_RESULTS(root)[:SEARCH_RESULT_LIMIT] if root is not None else []
+
+    logger.info(f"検索結果: {len(search_results)}件")
+
+    for i, result in enumerate(search_results, 1):
+        try:
+            # タイトルとURL抽出
+            title_tag = _first(result.xpath('.//h2'))
+            if title_tag is None:
+                continue
+
+            link_tag = _first(title_tag.xpath('.//a'))
+            if link_tag is None:
+                continue
+
+            url = link_tag.get('href', '')
+            title = _text(title_tag)
+
+            # スニペット（説明文）抽出
+            snippet = _text(_first(result.xpath('.//p')))
+
+            results.append({
+                'number': i,
+                'title': title,
+                'url': url,
+                'snippet': snippet
+            })
+
+            logger.debug("  [%d] %s", i, title)
+
+        except Exception as e:
+            logger.warning(f"検索結果の解析エラー: {e}")
+            continue
+
+    return results
+
+
+def _paragraphs(element):
+    texts = (_text(p) for p in _PARAGRAPHS(element))
+    return [text for text in texts if len(text) >= DETAIL_MIN_PARAGRAPH]
+
+
+def extract_main_content(content, encoding=None, limit=DETAIL_TEXT_LIMIT):
+    """
+    ブログ等の記事ページから本文を抽出
+
+    ナビゲーション・サイドバー等を除去した上で、article / main / 本文用クラスの
+    うち段落テキストが最も多い要素を本文とする（候補がなければ段落が最も多い親要素）
+
+    Args:
+        content: ページのHTML（bytes）
+        encoding: 文字コード
+        limit: 最大文字数
+
+    Returns:
+        str: 本文（段落ごとに改行、見つからない場合は空文字）
+    """
+    root = parse_html(content, encoding)
+    if root is None:
+        return ''
+    etree.strip_elements(root, *_NON_CONTENT_TAGS, with_tail=False)
+
+    best = []
+    for candidate in _CONTENT_CANDIDATES(root):
+        paragraphs = _paragraphs(candidate)
+        if sum(map(len, paragraphs)) > sum(map(len, best)):
+            best = paragraphs
+
+    if not best:
+        # 候補要素がない場合: 段落の親要素ごとに集計
+        parents = {}
+        for p in _PARAGRAPHS(root):
+            text = _text(p)
+            if len(text) >= DETAIL_MIN_PARAGRAPH:
+                parents.setdefault(p.getparent(), []).append(text)
+        if parents:
+            best = max(parents.values(), key=lambda texts: sum(map(len, texts)))
+
+    text = '\n'.join(best)
+    if len(text) > limit:
+        text = text[:limit] + '…'
+    return text
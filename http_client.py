@@ -0,0 +1,350 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+http_client.py - HTTP通信モジュール
+Google Books API・Google検索・Amazon・Bingへのリクエストを共通セッションで処理
+（ホストごとのコネクションプール + keep-alive で TCP/TLS ハンドシェイクを再利用）
+一時的なエラーはジッター付き指数バックオフで再試行し、失敗が続くホストは
+サーキットブレーカー（circuit_breaker.py）で即時に失敗させる
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import circuit_breaker
+import metrics
+import page_cache
+import rate_limiter
+import singleflight
+import tracing
+
+
+# ブラウザ偽装用の共通ヘッダー（User-Agentを設定しないとブロックされる）
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
+}
+
+# クローラーとして名乗るヘッダー（robots.txt とレビュー詳細の取得用）
+# robots.txt の判定（robots_cache）は同じエージェント名 CRAWLER_AGENT で行う
+CRAWLER_AGENT = 'bookpost'
+CRAWLER_HEADERS = {
+    'User-Agent': f'{CRAWLER_AGENT}/1.0 (+https://github.com/tomo4559/bookpost)',
+    'Accept': BROWSER_HEADERS['Accept'],
+    'Accept-Language': BROWSER_HEADERS['Accept-Language'],
+}
+
+# brotliはデコード用パッケージがある場合のみ要求（urllib3が展開できないため）
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+# タイムアウト（秒）。接続と応答待ちを分け、到達できないホストは早めに諦める
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+
+# 再試行設定（config.json の retry）
+MAX_RETRIES = 3           # 初回を除く最大再試行回数
+BACKOFF_BASE = 0.5        # 1回目の待機上限（秒）、以降2倍ずつ
+BACKOFF_MAX = 8.0         # 待機上限（秒）
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+
+# コネクションプール設定
+POOL_CONNECTIONS = 10  # プールを保持するホスト数
+POOL_MAXSIZE = 10      # 1ホストあたりの keep-alive 接続数
+
+# HTMLページのストリーミング受信設定
+CHUNK_SIZE = 16 * 1024
+MAX_PAGE_BYTES = 2 * 1024 * 1024   # 1ページの受信上限（config.json の max_page_bytes）
+
+_session = None
+_session_lock = threading.Lock()
+
+# 同じURLの取得が実行中なら結果を共有（別ISBNで検索語が同じ場合など）
+_page_flight = singleflight.Group('page')
+
+
+def configure(pool_maxsize=None, max_page_bytes=None, connect_timeout=None, read_timeout=None,
+              max_retries=None, backoff_base=None, backoff_max=None):
+    """
+    通信設定の変更（コネクションプールは次回のセッション生成から反映）
+
+    Args:
+        pool_maxsize: 1ホストあたりの最大接続数（並列数に合わせる）
+        max_page_bytes: HTMLページ1件あたりの受信上限（バイト）
+        connect_timeout: 接続タイムアウト（秒）
+        read_timeout: 応答待ちタイムアウト（秒）
+        max_retries: 一時的なエラー時の最大再試行回数
+        backoff_base: 再試行の初回待機上限（秒）
+        backoff_max: 再試行の待機上限（秒）
+    """
+    global POOL_MAXSIZE, MAX_PAGE_BYTES, CONNECT_TIMEOUT, READ_TIMEOUT
+    global MAX_RETRIES, BACKOFF_BASE, BACKOFF_MAX, _session
+    if max_page_bytes is not None:
+        MAX_PAGE_BYTES = max_page_bytes
+    if connect_timeout is not None:
+        CONNECT_TIMEOUT = connect_timeout
+    if read_timeout is not None:
+        READ_TIMEOUT = read_timeout
+    if max_retries is not None:
+        MAX_RETRIES = max(0, max_retries)
+    if backoff_base is not None:
+        BACKOFF_BASE = backoff_base
+    if backoff_max is not None:
+        BACKOFF_MAX = backoff_max
+    if pool_maxsize is None:
+        return
+    with _session_lock:
+        POOL_MAXSIZE = max(1, pool_maxsize)
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_session():
+    """プロセス共通のセッションを取得（初回のみ生成）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+                _session = session
+    return _session
+
+
+def backoff_delay(attempt):
+    """再試行前の待機秒数（フルジッター: 0〜BACKOFF_BASE × 2^attempt の一様乱数）"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def request(method, url, browser=False, headers=None, timeout=None, retries=None, **kwargs):
+    """
+    共通セッションでリクエスト（レート制限・再試行・サーキットブレーカーを適用）
+
+    接続失敗・タイムアウト・429/5xx は再試行し、最後の試行のレスポンスを返す
+    遮断中のホストは再試行せず CircuitOpenError で即時に失敗する
+
+    Args:
+        method: HTTPメソッド
+        url: リクエストURL
+        browser: Trueの場合はブラウザ偽装ヘッダーを付与
+        headers: 追加ヘッダー
+        timeout: タイムアウト秒数（省略時は (CONNECT_TIMEOUT, READ_TIMEOUT)）
+        retries: 最大再試行回数（省略時は冪等なメソッドのみ MAX_RETRIES）
+
+    Returns:
+        requests.Response: レスポンス
+
+    Raises:
+        requests.exceptions.RequestException: 通信失敗時（再試行後）
+    """
+    request_headers = dict(BROWSER_HEADERS) if browser else {}
+    if headers:
+        request_headers.update(headers)
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    if retries is None:
+        retries = MAX_RETRIES if method.upper() in IDEMPOTENT_METHODS else 0
+    
+    host = urlparse(url).hostname
+    # stream=True の場合はヘッダー受信まで（本文の受信は read_body のスパン）
+    with tracing.span('http_request', 'network', method=method.upper(), host=host) as span:
+        try:
+            response = _request(method, url, host, request_headers, timeout, retries, **kwargs)
+        except requests.exceptions.RequestException as e:
+            metrics.HTTP_ERRORS.inc(host=host, type=type(e).__name__)
+            raise
+        span.set(status=response.status_code)
+        if not kwargs.get('stream'):
+            span.set(bytes=len(response.content))
+            metrics.HTTP_BYTES.inc(len(response.content), host=host)
+        return response
+
+
+def _request(method, url, host, request_headers, timeout, retries, **kwargs):
+    attempt = 0
+    while True:
+        circuit_breaker.before_request(host)
+        rate_limiter.acquire(host)
+        start = time.monotonic()
+        try:
+            response = get_session().request(method, url, headers=request_headers, timeout=timeout, **kwargs)
+        except RETRY_EXCEPTIONS as e:
+            metrics.HTTP_REQUESTS.inc(host=host, code=type(e).__name__)
+            circuit_breaker.record_failure(host)
+            if attempt >= retries:
+                raise
+        except BaseException:
+            # リダイレクト過多・URL不正など再試行対象外の例外はホストの障害と見なさないが、
+            # 復旧確認中の試行だった場合は解除する（残したままだと以降のリクエストがすべて遮断される）
+            circuit_breaker.release_probe(host)
+            raise
+        else:
+            metrics.HTTP_REQUESTS.inc(host=host, code=response.status_code)
+            metrics.HTTP_DURATION.observe(time.monotonic() - start, host=host)
+            rate_limiter.record_response(host, response.status_code, response.headers.get('Retry-After'))
+            if response.status_code >= 500:
+                circuit_breaker.record_failure(host)
+            else:
+                circuit_breaker.record_success(host)
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                return response
+            # 再試行前に接続をプールへ返す（Retry-After は rate_limiter 側で待機）
+            response.close()
+        
+        time.sleep(backoff_delay(attempt))
+        attempt += 1
+        tracing.annotate(retries=attempt)
+
+
+def get(url, browser=False, headers=None, timeout=None, **kwargs):
+    """
+    共通セッションでGETリクエスト（ホスト別レート制限・再試行を適用）
+
+    Args:
+        url: リクエストURL
+        browser: Trueの場合はブラウザ偽装ヘッダーを付与
+        headers: 追加ヘッダー
+        timeout: タイムアウト秒数（省略時は (CONNECT_TIMEOUT, READ_TIMEOUT)）
+
+    Returns:
+        requests.Response: レスポンス
+
+    Raises:
+        requests.exceptions.RequestException: 通信失敗時（再試行後）
+    """
+    return request('GET', url, browser=browser, headers=headers, timeout=timeout, **kwargs)
+
+
+class Page:
+    """取得したHTMLページ（ネットワーク取得・キャッシュ共通）"""
+
+    def __init__(self, url, content, encoding, from_cache=False):
+        self.url = url
+        self.content = content  # bytes（デコードはHTMLパーサー側で行う）
+        self.encoding = encoding
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+
+def read_body(response, stop_when=None, logger=None):
+    """
+    レスポンス本文をチャンク単位で受信（必要な要素が揃うか受信上限で打ち切り）
+
+    Args:
+        response: stream=True で取得したレスポンス
+        stop_when: feed(chunk) が True を返したら受信を打ち切るオブジェクト（省略可）
+        logger: ロガー（省略可）
+
+    Returns:
+        bytes: 受信した本文（打ち切り時は途中まで）
+    """
+    chunks = []
+    size = 0
+    with tracing.span('read_body', 'network') as span:
+        try:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                chunks.append(chunk)
+                size += len(chunk)
+                if stop_when is not None and stop_when.feed(chunk):
+                    if logger:
+                        logger.info(f"必要な要素を受信済み、打ち切り: {size // 1024}KB: {response.url}")
+                    break
+                if size >= MAX_PAGE_BYTES:
+                    if logger:
+                        logger.warning(f"受信上限（{MAX_PAGE_BYTES // 1024}KB）で打ち切り: {response.url}")
+                    break
+        finally:
+            # 未受信分が残る接続はプールに戻さず破棄される
+            response.close()
+            span.set(bytes=size)
+            metrics.HTTP_BYTES.inc(size, host=urlparse(response.url).hostname)
+    return b''.join(chunks)[:MAX_PAGE_BYTES]
+
+
+def fetch_page(url, source, logger=None, stop_when=None, crawler=False):
+    """
+    HTMLページを取得（ページキャッシュ・条件付きリクエスト・ストリーミング受信対応）
+    
+    同じURLの取得が他スレッドで実行中の場合は、その結果を共有する
+
+    Args:
+        url: ページURL
+        source: 収集元名（max-age設定のキー: "google" / "amazon" / "bing"）
+        logger: ロガー（省略可）
+        stop_when: 受信打ち切り判定（extractors.ElementCounter など、省略時は上限まで受信）
+        crawler: Trueの場合はブラウザ偽装ではなくクローラーとして名乗る（robots.txt を確認したページ）
+
+    Returns:
+        Page: 取得したページ
+
+    Raises:
+        requests.exceptions.RequestException: 通信失敗・4xx/5xx時
+    """
+    with tracing.span('fetch_page', 'network', source=source, url=url):
+        return _page_flight.do(url, _fetch_page, url, source, logger, stop_when, crawler)
+
+
+def _fetch_page(url, source, logger, stop_when, crawler=False):
+    entry = page_cache.lookup(url)
+    
+    # max-age以内ならネットワークアクセスなし
+    if entry and page_cache.is_fresh(entry, source):
+        if logger:
+            logger.info(f"ページキャッシュ使用: {url}")
+        tracing.annotate(cache='hit')
+        metrics.PAGE_CACHE.inc(source=source, result='hit')
+        return Page(url, page_cache.read_body(entry), entry['encoding'], from_cache=True)
+    
+    headers = dict(CRAWLER_HEADERS) if crawler else {}
+    if entry:
+        headers.update(page_cache.conditional_headers(entry))
+    response = get(url, browser=not crawler, headers=headers, stream=True)
+    
+    # 304: 本文はキャッシュを再利用
+    if response.status_code == 304 and entry:
+        response.close()
+        if logger:
+            logger.info(f"ページ未更新（304）: {url}")
+        page_cache.revalidated(entry)
+        tracing.annotate(cache='revalidated')
+        metrics.PAGE_CACHE.inc(source=source, result='revalidated')
+        return Page(url, page_cache.read_body(entry), entry['encoding'], from_cache=True)
+    
+    if response.status_code >= 400:
+        response.close()
+    response.raise_for_status()
+    
+    # charset指定がない場合はNone（HTMLパーサーがmetaタグから判定）
+    encoding = response.encoding if 'charset' in response.headers.get('Content-Type', '') else None
+    try:
+        content = read_body(response, stop_when, logger)
+    except requests.exceptions.RequestException:
+        # 本文受信中のタイムアウト・切断
+        circuit_breaker.record_failure(urlparse(url).hostname)
+        raise
+    tracing.annotate(cache='miss', bytes=len(content))
+    metrics.PAGE_CACHE.inc(source=source, result='miss')
+    page_cache.store(url, content, response.headers, encoding)
+    return Page(url, content, encoding)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+image_prep.py - サムネイル画像の準備モジュール
+WordPressの上限（2MB）を超える画像を縮小・再圧縮し、元画像のSHA-256をキーに
+data/cache/images/ へ保存する（元画像が変わらなければ再実行しても再エンコードしない）
+
+縮小率は画素数とファイルサイズが比例すると見なして見積もり、超過した場合のみ
+実測サイズから見積もり直す（再エンコードは通常1〜2回）
+デコードは1回だけ行い、JPEGは draft で縮小デコード、大きな縮小は reduce（整数倍の平均化）で
+済ませてから残りを LANCZOS で補間する
+
+一括投稿ではプロセスプールで並列に変換する（Pillow のエンコードはCPU処理のため）
+"""
+
+import os
+import io
+import math
+import hashlib
+import threading
+
+
+MAX_BYTES = 2 * 1024 * 1024        # WordPress投稿時の上限
+CACHE_DIR = "data/cache/images"
+WORKERS = None                     # 一括変換のプロセス数（Noneの場合はCPU数）
+
+MAX_PASSES = 4                     # 再エンコードの上限回数
+SIZE_MARGIN = 0.92                 # 見積もりの安全率（上限ぴったりを狙わず少し小さめに）
+COMPRESS_LEVEL = 9
+
+
+def configure(max_bytes=None, cache_dir=None, workers=None):
+    """
+    画像準備の設定反映（config.json の image）
+
+    Args:
+        max_bytes: 画像サイズの上限（バイト）
+        cache_dir: 変換済み画像の保存先
+        workers: 一括変換のプロセス数
+    """
+    global MAX_BYTES, CACHE_DIR, WORKERS
+    if max_bytes:
+        MAX_BYTES = max_bytes
+    if cache_dir:
+        CACHE_DIR = cache_dir
+    if workers:
+        WORKERS = workers
+
+
+def needs_resize(path, max_bytes=None):
+    """上限を超える画像ならTrue"""
+    return os.path.getsize(path) > (max_bytes or MAX_BYTES)
+
+
+def source_hash(path):
+    """元画像のSHA-256"""
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def cache_path(digest, max_bytes=None, cache_dir=None):
+    """変換済み画像のパス（元画像のハッシュ + 上限サイズ）"""
+    return os.path.join(cache_dir or CACHE_DIR, f"{digest}_{max_bytes or MAX_BYTES}.png")
+
+
+def prepare(path, max_bytes=None, cache_dir=None):
+    """
+    投稿用の画像パスを取得（上限以内ならそのまま、超過時は縮小して保存）
+
+    プロセスプールから呼び出すため、設定は引数でも受け取る
+
+    Args:
+        path: 元画像のパス
+        max_bytes: 画像サイズの上限（省略時は MAX_BYTES）
+        cache_dir: 変換済み画像の保存先（省略時は CACHE_DIR）
+
+    Returns:
+        dict: {"path": 投稿する画像, "resized": 縮小した場合True, "cached": 保存済みを使用した場合True,
+               "passes": エンコード回数, "size": (幅, 高さ), "bytes": ファイルサイズ}
+    """
+    max_bytes = max_bytes or MAX_BYTES
+    cache_dir = cache_dir or CACHE_DIR
+    if not needs_resize(path, max_bytes):
+        return {'path': path, 'resized': False, 'cached': False, 'passes': 0,
+                'size': None, 'bytes': os.path.getsize(path)}
+
+    output_path = cache_path(source_hash(path), max_bytes, cache_dir)
+    if os.path.exists(output_path):
+        return {'path': output_path, 'resized': True, 'cached': True, 'passes': 0,
+                'size': None, 'bytes': os.path.getsize(output_path)}
+
+    data, size, passes = resize_to_budget(path, max_bytes)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, output_path)
+    return {'path': output_path, 'resized': True, 'cached': False, 'passes': passes,
+            'size': size, 'bytes': len(data)}
+
+
+def resize_to_budget(path, max_bytes):
+    """
+    上限サイズ以内のPNGに縮小（アスペクト比維持）
+
+    Returns:
+        tuple: (PNGのバイト列, (幅, 高さ), エンコード回数)
+    """
+    from PIL import Image
+
+    source_bytes = os.path.getsize(path)
+    with Image.open(path) as img:
+        width, height = img.size
+        # 初回の縮小率: ファイルサイズは画素数（縮小率の2乗）に比例すると見なす
+        scale = min(1.0, math.sqrt(max_bytes / source_bytes) * SIZE_MARGIN)
+        # JPEGはデコード時に 1/2・1/4・1/8 へ縮小（PNGなどでは何もしない）
+        img.draft('RGB', (math.ceil(width * scale), math.ceil(height * scale)))
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+        decoded = img.convert('RGBA' if has_alpha else 'RGB')
+
+    passes = 0
+    while True:
+        passes += 1
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        data = _encode(_resize(decoded, size))
+        if len(data) <= max_bytes or passes >= MAX_PASSES:
+            break
+        # 実測サイズから縮小率を見積もり直す
+        scale *= math.sqrt(max_bytes / len(data)) * SIZE_MARGIN
+    if len(data) > max_bytes:
+        raise ValueError(f"画像を{max_bytes / (1024 * 1024):.1f}MB以下にできませんでした: {path}")
+    return data, size, passes
+
+
+def _resize(img, size):
+    from PIL import Image
+
+    # 2倍以上の縮小は reduce（整数倍の平均化、高速）で済ませ、残りを LANCZOS で補間
+    factor = min(img.width // size[0], img.height // size[1])
+    if factor >= 2:
+        img = img.reduce(factor)
+    if img.size != size:
+        img = img.resize(size, resample=Image.Resampling.LANCZOS)
+    return img
+
+
+def _encode(img):
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', compress_level=COMPRESS_LEVEL)
+    return buffer.getvalue()
+
+
+def pending(paths):
+    """
+    上限を超え、変換済みの画像がない元画像を抽出（一括投稿でプロセスプールに渡す対象）
+
+    Returns:
+        dict: 元画像のハッシュ → パスのリスト（同じ画像は1回だけ変換）
+    """
+    groups = {}
+    for path in paths:
+        if not os.path.exists(path) or not needs_resize(path):
+            continue
+        digest = source_hash(path)
+        if not os.path.exists(cache_path(digest)):
+            groups.setdefault(digest, []).append(path)
+    return groups
+
+
+def submit_all(executor, groups):
+    """
+    画像の変換をプロセスプールに投入（投稿ワーカーは自分の画像の完了だけを待つ）
+
+    Args:
+        executor: ProcessPoolExecutor
+        groups: pending() の戻り値
+
+    Returns:
+        dict: 元画像のパス → prepare() の Future
+    """
+    futures = {}
+    for paths in groups.values():
+        future = executor.submit(prepare, paths[0], MAX_BYTES, CACHE_DIR)
+        for path in paths:
+            futures[path] = future
+    return futures
@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+job_queue.py - ジョブキューモジュール
+worker コマンドが処理する ISBN × 種別（fetch・post）のジョブを SQLite 1ファイルで管理する
+（enqueue コマンドで登録、複数のワーカープロセスから同時に取り出し可能）
+
+取り出したジョブにはリース（期限付きの処理権）を設定し、期限内に完了・延長されなければ
+ワーカーが停止したと見なして他のワーカーが再取得する
+同じISBNのジョブはリース中のものがあれば取り出さない（fetch と post も同時に処理しない）
+失敗したジョブは待ち時間を倍々に延ばして max_attempts 回まで再試行する
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+
+DB_PATH = "data/state/jobs.db"
+
+# ジョブの種別
+FETCH = 'fetch'
+POST = 'post'
+KINDS = (FETCH, POST)
+
+# ジョブの状態
+QUEUED = 'queued'      # 待機中（available_at 以降に取り出し可）
+LEASED = 'leased'      # 処理中（lease_expires を過ぎたら再取得可）
+DONE = 'done'
+FAILED = 'failed'      # 再試行の上限到達・再試行しないエラー
+STATES = (QUEUED, LEASED, DONE, FAILED)
+
+MAX_ATTEMPTS = 3
+LEASE_SECONDS = 300
+RETRY_DELAY = 60           # 再試行までの待ち時間（秒、失敗ごとに倍）
+RETRY_DELAY_MAX = 3600
+
+_local = threading.local()
+
+
+def configure(db_path=None, max_attempts=None, lease_seconds=None, retry_delay=None, retry_delay_max=None):
+    """
+    ジョブキューの設定反映（config.json の job_queue）
+
+    Args:
+        db_path: SQLiteファイルパス
+        max_attempts: 1ジョブの最大試行回数
+        lease_seconds: リースの期限（秒）
+        retry_delay: 再試行までの待ち時間（秒、失敗ごとに倍）
+        retry_delay_max: 再試行までの待ち時間の上限（秒）
+    """
+    global DB_PATH, MAX_ATTEMPTS, LEASE_SECONDS, RETRY_DELAY, RETRY_DELAY_MAX
+    if db_path:
+        DB_PATH = db_path
+    if max_attempts:
+        MAX_ATTEMPTS = max_attempts
+    if lease_seconds:
+        LEASE_SECONDS = lease_seconds
+    if retry_delay is not None:
+        RETRY_DELAY = retry_delay
+    if retry_delay_max is not None:
+        RETRY_DELAY_MAX = retry_delay_max
+
+
+def get_connection():
+    """スレッドごとのSQLite接続を取得（初回のみ生成・テーブル作成）"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.db_path == DB_PATH:
+        return conn
+
+    db_dir = os.path.dirname(DB_PATH)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+
+    # 取り出しは BEGIN IMMEDIATE で書き込みロックを取ってから行うため、トランザクションは明示的に開始する
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with _transaction(conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " isbn TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " priority INTEGER NOT NULL DEFAULT 0,"
+            " force INTEGER NOT NULL DEFAULT 0,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " max_attempts INTEGER NOT NULL,"
+            " available_at REAL NOT NULL,"
+            " lease_owner TEXT,"
+            " lease_expires REAL,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " finished_at REAL)"
+        )
+        # 未完了のジョブは ISBN × 種別で1件（登録済みなら優先度を引き上げる）
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active ON jobs(isbn, kind)"
+            " WHERE status IN ('queued', 'leased')"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, priority, available_at)")
+
+    _local.conn = conn
+    _local.db_path = DB_PATH
+    return conn
+
+
+class _transaction:
+    """BEGIN IMMEDIATE 〜 COMMIT（例外時は ROLLBACK）"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def enqueue(isbns, kind, priority=0, force=False, max_attempts=None):
+    """
+    ジョブを登録（同じISBN × 種別の未完了ジョブがあれば優先度の高い方に揃える）
+
+    Args:
+        isbns: 正規化済みISBN-13のリスト
+        kind: ジョブの種別（fetch / post）
+        priority: 優先度（大きいほど先に処理）
+        force: Trueの場合は最新の工程も再実行
+        max_attempts: 最大試行回数（省略時は MAX_ATTEMPTS）
+
+    Returns:
+        tuple: (新規登録件数, 登録済みだった件数)
+    """
+    if kind not in KINDS:
+        raise ValueError(f"不明なジョブ種別です: {kind}")
+    now = time.time()
+    added = 0
+    conn = get_connection()
+    with _transaction(conn):
+        for isbn in isbns:
+            cursor = conn.execute(
+                "UPDATE jobs SET priority = MAX(priority, ?), force = MAX(force, ?)"
+                " WHERE isbn = ? AND kind = ? AND status IN (?, ?)",
+                (priority, int(force), isbn, kind, QUEUED, LEASED)
+            )
+            if cursor.rowcount:
+                continue
+            conn.execute(
+                "INSERT INTO jobs (isbn, kind, priority, force, status, max_attempts, available_at, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (isbn, kind, priority, int(force), QUEUED, max_attempts or MAX_ATTEMPTS, now, now)
+            )
+            added += 1
+    return added, len(isbns) - added
+
+
+def lease(owner, kinds=KINDS, lease_seconds=None):
+    """
+    次のジョブを取り出してリースを設定（優先度の高い順 → 登録の古い順）
+
+    リース期限切れのジョブ（ワーカー停止時）も再取得の対象、試行回数の上限に達していれば失敗にする
+
+    Args:
+        owner: ワーカーの識別子（ホスト名:PID:スレッド）
+        kinds: 取り出す種別
+        lease_seconds: リースの期限（省略時は LEASE_SECONDS）
+
+    Returns:
+        dict | None: ジョブ（id, isbn, kind, priority, force, attempts, max_attempts）、なければNone
+    """
+    now = time.time()
+    placeholders = ','.join('?' * len(kinds))
+    conn = get_connection()
+    with _transaction(conn):
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = 'リース期限切れ（試行回数の上限）', finished_at = ?,"
+            " lease_owner = NULL, lease_expires = NULL"
+            " WHERE status = ? AND lease_expires <= ? AND attempts >= max_attempts",
+            (FAILED, now, LEASED, now)
+        )
+        row = conn.execute(
+            "SELECT id, isbn, kind, priority, force, attempts, max_attempts FROM jobs"
+            f" WHERE kind IN ({placeholders})"
+            " AND ((status = ? AND available_at <= ?) OR (status = ? AND lease_expires <= ?))"
+            " AND isbn NOT IN (SELECT isbn FROM jobs WHERE status = ? AND lease_expires > ?)"
+            " ORDER BY priority DESC, available_at, id LIMIT 1",
+            (*kinds, QUEUED, now, LEASED, now, LEASED, now)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?"
+            " WHERE id = ?",
+            (LEASED, owner, now + (lease_seconds or LEASE_SECONDS), row[0])
+        )
+    return {
+        'id': row[0],
+        'isbn': row[1],
+        'kind': row[2],
+        'priority': row[3],
+        'force': bool(row[4]),
+        'attempts': row[5] + 1,
+        'max_attempts': row[6],
+    }
+
+
+def extend(job_id, owner, lease_seconds=None):
+    """
+    リースの延長（処理の長いジョブを他のワーカーに再取得させない）
+
+    Returns:
+        bool: 延長できた場合True（期限切れで他のワーカーに取られていればFalse）
+    """
+    conn = get_connection()
+    with _transaction(conn):
+        cursor = conn.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+            (time.time() + (lease_seconds or LEASE_SECONDS), job_id, LEASED, owner)
+        )
+    return cursor.rowcount > 0
+
+
+def complete(job_id, owner):
+    """ジョブの完了（リースを持つワーカーのみ）"""
+    conn = get_connection()
+    with _transaction(conn):
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = NULL, finished_at = ?, lease_owner = NULL, lease_expires = NULL"
+            " WHERE id = ? AND status = ? AND lease_owner = ?",
+            (DONE, time.time(), job_id, LEASED, owner)
+        )
+
+
+def fail(job_id, owner, error, retry=True):
+    """
+    ジョブの失敗（試行回数が上限未満なら待ち時間をおいて再登録）
+
+    Args:
+        job_id: ジョブID
+        owner: ワーカーの識別子
+        error: エラー内容
+        retry: Falseの場合は再試行しない（ISBN不正・ファイルなしなど）
+
+    Returns:
+        float | None: 再試行の予定時刻（再試行しない場合はNone）
+    """
+    now = time.time()
+    conn = get_connection()
+    with _transaction(conn):
+        row = conn.execute(
+            "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = ? AND lease_owner = ?",
+            (job_id, LEASED, owner)
+        ).fetchone()
+        if row is None:
+            return None
+        attempts, max_attempts = row
+        if retry and attempts < max_attempts:
+            available_at = now + min(RETRY_DELAY * 2 ** (attempts - 1), RETRY_DELAY_MAX)
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_owner = NULL, lease_expires = NULL"
+                " WHERE id = ?",
+                (QUEUED, str(error), available_at, job_id)
+            )
+            return available_at
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_owner = NULL, lease_expires = NULL"
+            " WHERE id = ?",
+            (FAILED, str(error), now, job_id)
+        )
+    return None
+
+
+def pending_count(kinds=KINDS):
+    """未完了（待機中・処理中）のジョブ件数（再試行待ちも含む）"""
+    placeholders = ','.join('?' * len(kinds))
+    row = get_connection().execute(
+        f"SELECT COUNT(*) FROM jobs WHERE status IN (?, ?) AND kind IN ({placeholders})",
+        (QUEUED, LEASED, *kinds)
+    ).fetchone()
+    return row[0]
+
+
+def stats():
+    """
+    キューの統計情報
+
+    Returns:
+        dict: 種別 → {状態 → 件数}
+    """
+    counts = {kind: {state: 0 for state in STATES} for kind in KINDS}
+    for kind, status, count in get_connection().execute(
+        "SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status"
+    ):
+        counts.setdefault(kind, {state: 0 for state in STATES})[status] = count
+    return counts
+
+
+def list_failed(limit=20):
+    """失敗したジョブ（新しい順）の (ISBN, 種別, エラー) のリスト"""
+    return get_connection().execute(
+        "SELECT isbn, kind, error FROM jobs WHERE status = ? ORDER BY finished_at DESC LIMIT ?",
+        (FAILED, limit)
+    ).fetchall()
+
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+log_handlers.py - ログ出力モジュール
+キュー経由の非同期書き込み（QueueHandler + QueueListener）、JSON Lines 形式、
+サイズ・日付によるローテーションとgzip圧縮、ISBN・工程のコンテキスト付与を提供する
+
+ワーカースレッドはキューに入れるだけで、ファイル・コンソールへの書き込みは
+専用スレッドが行う（並列数が増えてもログ出力で待たされない）
+"""
+
+import os
+import gzip
+import json
+import time
+import atexit
+import shutil
+import logging
+import logging.handlers
+import queue
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+
+
+TEXT_FORMAT = '[%(asctime)s] %(levelname)s: %(message)s'
+
+# ログに付与するコンテキスト（ISBN・工程）
+CONTEXT_FIELDS = ('isbn', 'stage')
+_context = contextvars.ContextVar('log_context', default={})
+
+_listeners = []
+
+
+@contextmanager
+def log_context(**fields):
+    """
+    with文の間に出力するログに ISBN・工程などを付与
+
+    スレッドプールに渡す処理には contextvars.copy_context().run で引き継ぐ
+
+    Args:
+        **fields: 付与する項目（isbn・stage）
+    """
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def bind(**fields):
+    """以降に出力するログに ISBN・工程などを付与（コマンド単位など、with文で囲めない場合）"""
+    _context.set({**_context.get(), **fields})
+
+
+class ContextFilter(logging.Filter):
+    """ログレコードにコンテキストの項目を追加（ロガーに設定し、出力したスレッドで実行）"""
+
+    def filter(self, record):
+        context = _context.get()
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field))
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """JSON Lines 形式（1行1レコード、jq などで検索可能）"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).astimezone().isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    サイズ・日付でローテーションするファイルハンドラー（古いログはgzip圧縮）
+
+    app.log → app.log.1(.gz) → app.log.2(.gz) ... の順に繰り下げ、backup_count 件を超えた分は削除
+    """
+
+    def __init__(self, filename, max_bytes=0, backup_count=0, daily=False, compress=True):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding='utf-8', delay=True)
+        self.daily = daily
+        # 既存ファイルは最終更新日で判定（前日のcron実行分を日付変更でローテーション）
+        if os.path.exists(self.baseFilename):
+            self.day = time.strftime('%Y-%m-%d', time.localtime(os.path.getmtime(self.baseFilename)))
+        else:
+            self.day = time.strftime('%Y-%m-%d')
+        if compress:
+            self.namer = lambda name: f"{name}.gz"
+            self.rotator = _gzip_rotator
+
+    def shouldRollover(self, record):
+        if self.daily and time.strftime('%Y-%m-%d') != self.day and os.path.exists(self.baseFilename):
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.day = time.strftime('%Y-%m-%d')
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """キューへの投入（メッセージの組み立てのみ行い、整形・書き込みはリスナー側）"""
+
+    def prepare(self, record):
+        # 標準の prepare は出力スレッドで整形まで行うため、引数の展開だけにする
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def start_queue(logger):
+    """
+    ロガーの出力をキュー経由に切り替え（既存のハンドラーは書き込みスレッドで実行）
+
+    Args:
+        logger: 対象のロガー
+
+    Returns:
+        logging.handlers.QueueListener: 書き込みスレッド
+    """
+    handlers = list(logger.handlers)
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    queue_handler = _QueueHandler(log_queue)
+
+    logger.handlers.clear()
+    logger.addHandler(queue_handler)
+    listener.start()
+    _listeners.append(listener)
+    return listener
+
+
+def stop():
+    """キューに残ったログを書き込んで書き込みスレッドを終了"""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+atexit.register(stop)
+
+
+# --- プロセスプール ---------------------------------------------------------
+
+def start_process_logging(logger):
+    """
+    子プロセスのログを受け取るキューを作成（親プロセスのハンドラーで書き込み）
+
+    Returns:
+        tuple: (子プロセスに渡すキュー, 受信スレッド)
+    """
+    import multiprocessing
+
+    log_queue = multiprocessing.Queue(-1)
+    listener = logging.handlers.QueueListener(log_queue, *logger.handlers, respect_handler_level=True)
+    listener.start()
+    return log_queue, listener
+
+
+def init_process_logging(log_queue, name="bookpost", level=logging.INFO):
+    """子プロセスの初期化: ロガーの出力を親プロセスへのキューに切り替え（ProcessPoolExecutor の initializer）"""
+    logger = logging.getLogger(name)
+    logger.handlers.clear()
+    logger.setLevel(level)
+    logger.addHandler(_QueueHandler(log_queue))
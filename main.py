@@ -10,37 +10,74 @@ import sys
 import json
 import logging
 import argparse
-import requests
 import time
-from bs4 import BeautifulSoup
-from pathlib import Path
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-print("プログラム起動...")  # デバッグ用
+# 通信・スクレイピング系（requests・lxml を読み込むモジュール）は使用するコマンド内で import する
+# （cronから頻繁に起動される post・--help の起動時間を抑えるため）
+import book_cache
+import image_prep
+import job_queue
+import log_handlers
+import metrics
+import page_cache
+import pipeline_state
+import rate_limiter
+import renderer
+import singleflight
+import snapshot_store
+import tracing
 
-def setup_logger(name="bookpost", log_file="data/logs/app.log"):
-    """ログ設定の初期化"""
-    print(f"ロガー初期化: {log_file}")
+# Google Books API
+GOOGLE_BOOKS_API_URL = "https://www.googleapis.com/books/v1/volumes"
+BULK_LOOKUP_SIZE = 10    # 1クエリにまとめるISBN数
+BULK_MAX_RESULTS = 40    # 1ページの最大件数（APIの上限）
+BULK_MAX_PAGES = 3       # 1クエリあたりのページ送り上限
+
+# メトリクスを保存するコマンド（status・cache・enqueue は集計対象外）
+METRIC_COMMANDS = ('fetch', 'post', 'reparse', 'render', 'worker')
+# 通信・スクレイピング系のモジュールを使うコマンド
+FETCH_COMMANDS = ('fetch', 'reparse', 'worker')
+
+def setup_logger(name="bookpost", log_file="data/logs/app.log", level="INFO", format="text",
+                 queue=True, max_bytes=10 * 1024 * 1024, backup_count=10, rotate_daily=False, compress=True):
+    """
+    ログ設定の初期化（config.json の logging）
     
+    Args:
+        name: ロガー名
+        log_file: ログファイルのパス
+        level: 出力レベル（"DEBUG" で収集元ごとのレビュー1件ずつの行も出力）
+        format: ファイルの形式（"text" / "json": JSON Lines、ISBN・工程の項目付き）
+        queue: Trueの場合は書き込みを専用スレッドで行う（ワーカーはキューに入れるだけ）
+        max_bytes: このサイズを超えたらローテーション（0で無効）
+        backup_count: 保持する世代数
+        rotate_daily: Trueの場合は日付が変わったらローテーション
+        compress: ローテーションした世代をgzip圧縮
+    """
     # ログディレクトリ作成
     log_dir = os.path.dirname(log_file)
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
-        print(f"ログディレクトリ作成: {log_dir}")
     
     # ロガー設定
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
+    logger.setLevel(level)
     
     # 既存のハンドラーをクリア
     if logger.handlers:
         logger.handlers.clear()
+    logger.addFilter(log_handlers.ContextFilter())
     
-    # フォーマット設定
-    formatter = logging.Formatter('[%(asctime)s] %(levelname)s: %(message)s')
+    # フォーマット設定（コンソールは常にテキスト）
+    formatter = logging.Formatter(log_handlers.TEXT_FORMAT)
     
-    # ファイルハンドラー
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setFormatter(formatter)
+    # ファイルハンドラー（最初の出力時に開く）
+    file_handler = log_handlers.RotatingFileHandler(
+        log_file, max_bytes=max_bytes, backup_count=backup_count, daily=rotate_daily, compress=compress
+    )
+    file_handler.setFormatter(log_handlers.JsonFormatter() if format == 'json' else formatter)
     logger.addHandler(file_handler)
     
     # コンソールハンドラー
@@ -48,16 +85,98 @@ def setup_logger(name="bookpost", log_file="data/logs/app.log"):
     console_handler.setFormatter(formatter)
     logger.addHandler(console_handler)
     
+    if queue:
+        log_handlers.start_queue(logger)
+    
     return logger
 
 
+def load_config(config_path="config.json"):
+    """config.jsonの読み込み（存在しない場合は空の設定）"""
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def apply_config(config):
+    """config.json の設定を各モジュールに反映（通信・スクレイピング系は apply_fetch_config）"""
+    global GOOGLE_BOOKS_API_URL
+    GOOGLE_BOOKS_API_URL = config.get('endpoints', {}).get('google_books', GOOGLE_BOOKS_API_URL)
+    rate_limiter.configure(config.get('rate_limits', {}))
+    book_cache.configure(**config.get('book_cache', {}))
+    page_cache.configure(**config.get('page_cache', {}))
+    snapshot_store.configure(config.get('snapshot_dir'))
+    image_prep.configure(**config.get('image', {}))
+    renderer.configure(**config.get('render', {}))
+    job_queue.configure(**config.get('job_queue', {}))
+    pipeline_state.configure(max_age=config.get('pipeline_max_age'))
+    metrics.configure(**config.get('metrics', {}))
+
+
+def apply_fetch_config(config):
+    """config.json の設定を通信・スクレイピング系のモジュールに反映（fetch・reparse・worker 実行時のみ）"""
+    import circuit_breaker
+    import http_client
+    import scraper
+    
+    endpoints = config.get('endpoints', {})
+    scraper.configure_endpoints(
+        google_search=endpoints.get('google_search'),
+        amazon=endpoints.get('amazon'),
+        bing=endpoints.get('bing'),
+    )
+    scraper.configure(
+        enabled=config.get('review_sources'),
+        target=config.get('review_target'),
+        deadlines=config.get('review_deadlines'),
+    )
+    scraper.configure_detail(**config.get('review_detail', {}))
+    http_client.configure(max_page_bytes=config.get('max_page_bytes'), **config.get('http', {}))
+    circuit_breaker.configure(**config.get('circuit_breaker', {}))
+
+
+def apply_post_config(config):
+    """config.json の設定を通信・WordPress投稿のモジュールに反映（post 実行時、ファイル確認後）"""
+    import circuit_breaker
+    import http_client
+    import wp_client
+    
+    http_client.configure(**config.get('http', {}))
+    circuit_breaker.configure(**config.get('circuit_breaker', {}))
+    wp_client.configure(
+        url=config.get('wp_url'),
+        user=config.get('wp_user'),
+        app_password=config.get('wp_app_password'),
+        category_id=config.get('wp_category_id'),
+        default_tags=config.get('wp_default_tags'),
+        upload_workers=config.get('wp_upload_workers'),
+        upload_timeout=config.get('wp_upload_timeout'),
+    )
+
+
 def normalize_isbn(isbn):
-    """ISBNを13桁ハイフンなし形式に統一"""
-    isbn_clean = isbn.replace('-', '').replace(' ', '')
+    """
+    ISBNを13桁ハイフンなし形式に統一（チェックディジットも検証）
+    
+    全角数字・"ISBN" の接頭辞・ハイフン・空白の表記ゆれに対応し、ISBN-10 は 978 を付けて変換
+    
+    Raises:
+        ValueError: 桁数・文字種が不正な場合、チェックディジットが一致しない場合
+    """
+    isbn_clean = isbn.upper() if isbn.isascii() else unicodedata.normalize('NFKC', isbn).upper()
+    isbn_clean = isbn_clean.strip().removeprefix('ISBN').lstrip(':').replace('-', '').replace(' ', '')
     
-    if len(isbn_clean) == 13:
+    if len(isbn_clean) == 13 and isbn_clean.isascii() and isbn_clean.isdigit():
+        if not isbn_clean.startswith(('978', '979')):
+            raise ValueError(f"無効なISBN形式: {isbn}")
+        if int(isbn_clean[-1]) != calculate_isbn13_check_digit(isbn_clean[:12]):
+            raise ValueError(f"ISBNのチェックディジットが一致しません: {isbn}")
         return isbn_clean
-    elif len(isbn_clean) == 10:
+    elif len(isbn_clean) == 10 and isbn_clean.isascii() and isbn_clean[:9].isdigit() and \
+            (isbn_clean[9].isdigit() or isbn_clean[9] == 'X'):
+        if isbn_clean[9] != calculate_isbn10_check_digit(isbn_clean[:9]):
+            raise ValueError(f"ISBNのチェックディジットが一致しません: {isbn}")
         isbn13 = '978' + isbn_clean[:-1]
         check_digit = calculate_isbn13_check_digit(isbn13)
         return isbn13 + str(check_digit)
@@ -66,7 +185,7 @@ def normalize_isbn(isbn):
 
 
 def calculate_isbn13_check_digit(isbn12):
-    """ISBN-13のチェックディジットを計算"""
+    """ISBN-13のチェックディジットを計算（奇数桁 ×1・偶数桁 ×3 の合計から）"""
     total = 0
     for i, digit in enumerate(isbn12):
         weight = 1 if i % 2 == 0 else 3
@@ -75,59 +194,198 @@ def calculate_isbn13_check_digit(isbn12):
     return check_digit
 
 
+def calculate_isbn10_check_digit(isbn9):
+    """ISBN-10のチェックディジットを計算（10の場合は "X"）"""
+    total = sum(int(digit) * weight for digit, weight in zip(isbn9, range(10, 1, -1)))
+    check_digit = (11 - total % 11) % 11
+    return 'X' if check_digit == 10 else str(check_digit)
+
+
+def parse_volume_info(isbn, volume_info):
+    """Google Books APIのvolumeInfoから書籍情報を生成"""
+    return {
+        'isbn': isbn,
+        'title': volume_info.get('title', ''),
+        'authors': volume_info.get('authors', []),
+        'publisher': volume_info.get('publisher', ''),
+        'published_date': volume_info.get('publishedDate', ''),
+        'description': volume_info.get('description', ''),
+        'page_count': volume_info.get('pageCount', 0),
+        'categories': volume_info.get('categories', []),
+        'image_url': volume_info.get('imageLinks', {}).get('thumbnail', ''),
+        'language': volume_info.get('language', 'ja')
+    }
+
+
+def volume_isbns(volume_info):
+    """volumeInfoのindustryIdentifiersからISBN-13一覧を取得"""
+    isbns = set()
+    for identifier in volume_info.get('industryIdentifiers', []):
+        if identifier.get('type') not in ('ISBN_13', 'ISBN_10'):
+            continue
+        try:
+            isbns.add(normalize_isbn(identifier.get('identifier', '')))
+        except ValueError:
+            continue
+    return isbns
+
+
+def resolve_isbn_chunk(isbns, logger):
+    """
+    複数ISBNを1つのクエリでまとめて検索し、各ISBNの書籍情報に振り分け
+    
+    Args:
+        isbns: 正規化済みISBN-13のリスト（BULK_LOOKUP_SIZE件以下）
+        logger: ロガー
+    
+    Returns:
+        tuple: (ISBN → 書籍情報 の辞書, 複数の書籍が該当したISBNのセット)
+    """
+    import http_client
+    
+    query = ' OR '.join(f"isbn:{isbn}" for isbn in isbns)
+    wanted = set(isbns)
+    matches = {}
+    
+    for page in range(BULK_MAX_PAGES):
+        logger.info(f"Google Books API一括検索: {len(isbns)}件（{page + 1}ページ目）")
+        metrics.BOOK_API_CALLS.inc(kind='bulk')
+        response = http_client.get(GOOGLE_BOOKS_API_URL, params={
+            'q': query,
+            'startIndex': page * BULK_MAX_RESULTS,
+            'maxResults': BULK_MAX_RESULTS,
+        })
+        response.raise_for_status()
+        data = response.json()
+        items = data.get('items', [])
+        
+        for item in items:
+            volume_info = item.get('volumeInfo', {})
+            for isbn in volume_isbns(volume_info) & wanted:
+                matches.setdefault(isbn, []).append(volume_info)
+        
+        # 全ISBNが見つかった or 最終ページなら終了
+        if wanted <= matches.keys():
+            break
+        if len(items) < BULK_MAX_RESULTS or (page + 1) * BULK_MAX_RESULTS >= data.get('totalItems', 0):
+            break
+    
+    resolved = {}
+    ambiguous = set()
+    for isbn, volumes in matches.items():
+        if len(volumes) == 1:
+            resolved[isbn] = parse_volume_info(isbn, volumes[0])
+        else:
+            ambiguous.add(isbn)
+    return resolved, ambiguous
+
+
+def prefetch_books_bulk(isbns, logger, workers=1):
+    """
+    キャッシュ未登録のISBNをまとめてGoogle Books APIで取得し、キャッシュに保存
+    
+    解決できなかったISBN（該当なし・複数該当・通信エラー）は
+    キャッシュに保存せず、fetch_book_data の個別取得に任せる
+    
+    Args:
+        isbns: ISBNのリスト（任意の形式）
+        logger: ロガー
+        workers: 並列で投げるクエリ数
+    
+    Returns:
+        int: まとめて取得できた件数
+    """
+    import requests
+    
+    misses = []
+    seen = set()
+    for isbn in isbns:
+        try:
+            isbn_normalized = normalize_isbn(isbn)
+        except ValueError:
+            continue  # 個別取得時にエラー表示
+        if isbn_normalized in seen:
+            continue
+        seen.add(isbn_normalized)
+        if book_cache.get(isbn_normalized) is None:
+            misses.append(isbn_normalized)
+    
+    if not misses:
+        return 0
+    
+    chunks = [misses[i:i + BULK_LOOKUP_SIZE] for i in range(0, len(misses), BULK_LOOKUP_SIZE)]
+    logger.info(f"Google Books API一括取得: {len(misses)}件（{len(chunks)}クエリ）")
+    
+    resolved_count = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(resolve_isbn_chunk, chunk, logger): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            try:
+                resolved, ambiguous = future.result()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.warning(f"一括取得エラー（個別取得で再試行）: {e}")
+                continue
+            for isbn, book_data in resolved.items():
+                book_cache.put(isbn, book_data)
+            resolved_count += len(resolved)
+            if ambiguous:
+                logger.info(f"複数該当のため個別取得: {', '.join(sorted(ambiguous))}")
+    
+    logger.info(f"一括取得完了: {resolved_count}/{len(misses)}件")
+    return resolved_count
+
+
+# 同じISBNの取得が実行中なら結果を共有
+_book_flight = singleflight.Group('book')
+
+
 def fetch_book_data(isbn, logger):
-    """Google Books APIから書籍情報を取得"""
+    """Google Books APIから書籍情報を取得（同じISBNの取得が実行中ならその結果を共有）"""
     isbn_normalized = normalize_isbn(isbn)
     logger.info(f"ISBN正規化: {isbn} → {isbn_normalized}")
+    with tracing.span('fetch_book_data', 'metadata', isbn=isbn_normalized):
+        return _book_flight.do(isbn_normalized, _fetch_book_data, isbn_normalized, logger)
+
+
+def _fetch_book_data(isbn_normalized, logger):
+    import requests
+    import http_client
     
-    # キャッシュディレクトリ作成
-    cache_dir = "data/books"
-    if not os.path.exists(cache_dir):
-        os.makedirs(cache_dir)
-        logger.info(f"ディレクトリ作成: {cache_dir}")
-    
-    cache_path = os.path.join(cache_dir, f"book_{isbn_normalized}.json")
-    
-    # キャッシュ確認
-    if os.path.exists(cache_path):
-        logger.info(f"キャッシュから読み込み: {cache_path}")
-        with open(cache_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    # キャッシュ確認（該当なしの結果もキャッシュ）
+    cached = book_cache.get(isbn_normalized)
+    tracing.annotate(cache='hit' if cached is not None else 'miss')
+    metrics.BOOK_CACHE.inc(result='hit' if cached is not None else 'miss')
+    if cached is not None:
+        status, book_data = cached
+        if status == book_cache.NOT_FOUND:
+            logger.error(f"該当するISBNが見つかりませんでした（キャッシュ）: {isbn_normalized}")
+            raise ValueError(f"該当するISBNが見つかりませんでした")
+        logger.info(f"キャッシュから読み込み: ISBN={isbn_normalized}")
+        return book_data
     
     # Google Books API呼び出し
     logger.info(f"Google Books APIから取得: ISBN={isbn_normalized}")
-    api_url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn_normalized}"
+    api_url = f"{GOOGLE_BOOKS_API_URL}?q=isbn:{isbn_normalized}"
+    metrics.BOOK_API_CALLS.inc(kind='single')
     
     try:
-        response = requests.get(api_url, timeout=10)
+        response = http_client.get(api_url)
         response.raise_for_status()
         data = response.json()
         
         if 'items' not in data or len(data['items']) == 0:
             logger.error(f"該当するISBNが見つかりませんでした: {isbn_normalized}")
+            book_cache.put_not_found(isbn_normalized)
             raise ValueError(f"該当するISBNが見つかりませんでした")
         
         volume_info = data['items'][0]['volumeInfo']
-        book_data = {
-            'isbn': isbn_normalized,
-            'title': volume_info.get('title', ''),
-            'authors': volume_info.get('authors', []),
-            'publisher': volume_info.get('publisher', ''),
-            'published_date': volume_info.get('publishedDate', ''),
-            'description': volume_info.get('description', ''),
-            'page_count': volume_info.get('pageCount', 0),
-            'categories': volume_info.get('categories', []),
-            'image_url': volume_info.get('imageLinks', {}).get('thumbnail', ''),
-            'language': volume_info.get('language', 'ja')
-        }
+        book_data = parse_volume_info(isbn_normalized, volume_info)
         
         logger.info(f"書籍情報取得: {book_data['title']}")
         
         # キャッシュ保存
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            json.dump(book_data, f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"キャッシュ保存: {cache_path}")
+        book_cache.put(isbn_normalized, book_data)
+        logger.info(f"キャッシュ保存: ISBN={isbn_normalized}")
         return book_data
         
     except requests.exceptions.RequestException as e:
@@ -135,253 +393,406 @@ def fetch_book_data(isbn, logger):
         raise Exception(f"Google Books API通信エラー: {e}")
 
 
-def scrape_amazon_reviews(isbn, logger):
-    """AmazonからISBN検索してレビュー取得"""
-    logger.info(f"Amazon商品ページからレビュー取得: ISBN={isbn}")
+def record_stage(stage, result, start=None, error=None):
+    """工程の実行結果をメトリクスに記録"""
+    metrics.STAGE_RUNS.inc(stage=stage, result=result)
+    if start is not None:
+        metrics.STAGE_DURATION.observe(time.monotonic() - start, stage=stage)
+    if error is not None:
+        metrics.ERRORS.inc(stage=stage, type=type(error).__name__)
+
+
+def fetch_metadata_stage(isbn, logger, force=False):
+    """
+    書籍情報工程（マニフェスト上で最新ならキャッシュから読み込みのみ）
     
-    # AmazonのISBN検索URL
-    amazon_url = f"https://www.amazon.co.jp/s?k={isbn}"
+    Returns:
+        tuple: (書籍情報, 実行した場合True)
+    """
+    if not force and pipeline_state.is_fresh(isbn, pipeline_state.METADATA):
+        book_data = book_cache.load(isbn)
+        if book_data:
+            record_stage(pipeline_state.METADATA, 'skipped')
+            return book_data, False
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
-    }
+    pipeline_state.mark_running(isbn, pipeline_state.METADATA)
+    start = time.monotonic()
+    try:
+        with log_handlers.log_context(isbn=isbn, stage=pipeline_state.METADATA):
+            book_data = fetch_book_data(isbn, logger)
+    except Exception as e:
+        pipeline_state.mark_failed(isbn, pipeline_state.METADATA, e)
+        record_stage(pipeline_state.METADATA, 'failed', start, e)
+        raise
+    pipeline_state.mark_done(isbn, pipeline_state.METADATA, pipeline_state.data_hash(book_data))
+    record_stage(pipeline_state.METADATA, 'done', start)
+    return book_data, True
+
+
+def fetch_reviews_stage(book_data, logger, force=False):
+    """
+    レビュー収集工程（書籍情報・レビューファイルが記録時から変わっていなければスキップ）
     
-    results = []
+    Returns:
+        tuple: (レビューファイルパス, 実行した場合True)
+    """
+    import scraper
     
+    isbn = book_data['isbn']
+    review_path = scraper.review_file_path(isbn)
+    if not force and pipeline_state.is_fresh(isbn, pipeline_state.REVIEWS, review_path):
+        record_stage(pipeline_state.REVIEWS, 'skipped')
+        return review_path, False
+    
+    # レビュー収集（書籍タイトルで検索）
+    search_term = f"{book_data['title']} {' '.join(book_data.get('authors', []))}"
+    pipeline_state.mark_running(isbn, pipeline_state.REVIEWS)
+    start = time.monotonic()
     try:
-        # Amazon検索ページにアクセス
-        logger.info(f"Amazon検索: {amazon_url}")
-        response = requests.get(amazon_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'lxml')
-        
-        # 最初の商品リンクを取得
-        product_link = soup.find('a', class_='a-link-normal s-no-outline')
-        if product_link:
-            product_url = 'https://www.amazon.co.jp' + product_link.get('href', '')
-            logger.info(f"商品ページ発見: {product_url}")
-            
-            # 商品ページにアクセス
-            time.sleep(1)  # 負荷軽減
-            response = requests.get(product_url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            # レビューセクションを探す（liタグ、data-hook="review"）
-            review_elements = soup.find_all('li', {'data-hook': 'review'}, limit=5)
-            
-            logger.info(f"レビュー要素発見: {len(review_elements)}件")
-            
-            for i, review in enumerate(review_elements, 1):
-                try:
-                    # レビュータイトル
-                    title_elem = review.find('a', {'data-hook': 'review-title'})
-                    if title_elem:
-                        # spanタグ内のテキストを取得
-                        title_span = title_elem.find('span')
-                        title = title_span.get_text(strip=True) if title_span else title_elem.get_text(strip=True)
-                    else:
-                        title = ''
-                    
-                    # 評価
-                    rating_elem = review.find('i', {'data-hook': 'review-star-rating'})
-                    if rating_elem:
-                        rating_span = rating_elem.find('span', class_='a-icon-alt')
-                        rating = rating_span.get_text(strip=True) if rating_span else ''
-                    else:
-                        rating = ''
-                    
-                    # レビュー本文
-                    body_elem = review.find('span', {'data-hook': 'review-body'})
-                    if body_elem:
-                        # レビュー本文はdiv内のspanに含まれる
-                        body_content = body_elem.find('span')
-                        body = body_content.get_text(strip=True) if body_content else body_elem.get_text(strip=True)
-                    else:
-                        body = ''
-                    
-                    if title or body:
-                        results.append({
-                            'number': i,
-                            'source': 'Amazon',
-                            'title': title,
-                            'rating': rating,
-                            'content': body,
-                            'url': product_url
-                        })
-                        logger.info(f"  [Amazon-{i}] {title[:30]}...")
-                        
-                except Exception as e:
-                    logger.warning(f"Amazonレビュー解析エラー: {e}")
-                    continue
-        
+        with log_handlers.log_context(isbn=isbn, stage=pipeline_state.REVIEWS):
+            review_path = scraper.scrape_reviews(isbn, logger, search_term=search_term)
     except Exception as e:
-        logger.warning(f"Amazon取得エラー: {e}")
-    
-    return results
+        pipeline_state.mark_failed(isbn, pipeline_state.REVIEWS, e)
+        record_stage(pipeline_state.REVIEWS, 'failed', start, e)
+        raise
+    pipeline_state.mark_done(isbn, pipeline_state.REVIEWS, pipeline_state.file_hash(review_path))
+    record_stage(pipeline_state.REVIEWS, 'done', start)
+    return review_path, True
 
 
-def scrape_google_search(search_term, logger):
-    """Google検索からレビューサイト情報を取得"""
-    logger.info(f"Google検索: {search_term}")
+def run_fetch_pipeline(isbn, logger, force=False):
+    """
+    1冊分の書籍情報取得 + レビュー収集（最新の工程はスキップ）
     
-    search_query = f"{search_term} 書評 レビュー"
-    # Google検索URL（User-Agentを設定しないとブロックされる）
-    search_url = f"https://www.google.com/search?q={search_query}&hl=ja"
+    Returns:
+        tuple: (書籍情報, レビューファイルパス, 実行した工程名のリスト)
+    """
+    isbn = normalize_isbn(isbn)
+    ran = []
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
+    book_data, executed = fetch_metadata_stage(isbn, logger, force)
+    if executed:
+        ran.append(pipeline_state.METADATA)
+    
+    review_path, executed = fetch_reviews_stage(book_data, logger, force)
+    if executed:
+        ran.append(pipeline_state.REVIEWS)
+    
+    return book_data, review_path, ran
+
+
+def article_path(isbn):
+    """記事ファイルのパス"""
+    return f"data/outputs/article_{isbn}.md"
+
+
+def image_path(isbn):
+    """サムネイル画像のパス"""
+    return f"data/images/thumbnail_{isbn}.png"
+
+
+def stage_output_paths(isbn):
+    """工程名 → 出力ファイルパス（ファイルを出力する工程のみ）"""
+    import scraper
+    
+    return {
+        pipeline_state.REVIEWS: scraper.review_file_path(isbn),
+        pipeline_state.ARTICLE: article_path(isbn),
+        pipeline_state.IMAGE: image_path(isbn),
     }
+
+
+def generate_post(isbn, logger):
+    """
+    記事ファイル・書籍情報からWordPress投稿用データを生成（ネットワークなし）
+    
+    記事・書籍情報・テンプレートが前回のレンダリングから変わっていなければ保存済みの結果を使用
+    
+    Returns:
+        dict: 投稿データ（tags は著者名、投稿時に既定のタグを加えてIDへ変換）
+    
+    Raises:
+        FileNotFoundError: 書籍情報・記事・画像が見つからない場合
+    """
+    book_data = book_cache.load(isbn)
+    if book_data is None:
+        raise FileNotFoundError(f"書籍情報が見つかりません: ISBN={isbn}")
     
-    results = []
+    article_file = article_path(isbn)
+    if not os.path.exists(article_file):
+        raise FileNotFoundError(f"記事ファイルが見つかりません: {article_file}")
+    with open(article_file, 'r', encoding='utf-8') as f:
+        article_content = f.read()
+    pipeline_state.observe(isbn, pipeline_state.ARTICLE, article_file)
+    
+    image_file = image_path(isbn)
+    if not os.path.exists(image_file):
+        raise FileNotFoundError(f"画像ファイルが見つかりません: {image_file}")
+    pipeline_state.observe(isbn, pipeline_state.IMAGE, image_file)
+    
+    with tracing.span('render', 'parse', isbn=isbn) as span:
+        post_data, rendered = renderer.render_cached(isbn, book_data, article_content)
+        span.set(cache='miss' if rendered else 'hit')
+    return post_data
+
+
+def upload_image(image_file, logger, filename=None):
+    """
+    WordPressに画像をアップロード
+    
+    Args:
+        image_file: 画像ファイルパス
+        filename: WordPress に登録する画像のファイル名（省略時は image_file のファイル名）
+    
+    Returns:
+        int: メディアID
+    """
+    import wp_client
+    
+    with tracing.span('upload_media', 'network'):
+        media = wp_client.upload_media(image_file, filename)
+    logger.info(f"画像アップロード: media_id={media['id']}")
+    return media['id']
+
+
+def post_to_wp(post_data, image_file, logger, post_id=None, media_id=None, filename=None):
+    """
+    WordPressに画像をアップロードして記事を投稿
+    
+    Args:
+        post_data: generate_post() の戻り値
+        image_file: 画像ファイルパス
+        post_id: 投稿済みの記事ID（指定時は同じ記事を更新）
+        media_id: アップロード済みの画像ID（指定時はアップロードしない）
+        filename: WordPress に登録する画像のファイル名（省略時は image_file のファイル名）
+    
+    Returns:
+        dict: 記事情報（id, link, status, featured_media）
+    """
+    import wp_client
+    
+    post_data = dict(post_data)
+    if media_id is None:
+        media_id = upload_image(image_file, logger, filename)
+    post_data['featured_media'] = media_id
+    if wp_client.CATEGORY_ID is not None and not post_data['categories']:
+        post_data['categories'] = [wp_client.CATEGORY_ID]
+    post_data['tags'] = wp_client.resolve_tags(wp_client.DEFAULT_TAGS + post_data['tags'])
+    
+    with tracing.span('save_post', 'network'):
+        result = wp_client.save_post(post_data, post_id)
+    logger.info(f"WordPressに投稿しました: {result.get('link')}")
+    return result
+
+
+def prepare_post_stage(isbn, logger, force=False):
+    """
+    投稿工程の準備（ファイル確認・投稿データ生成、最新ならスキップ）
+    
+    Returns:
+        dict: 投稿データ（投稿済みで記事・画像・書籍情報・レンダリング結果が変わっていなければNone）
+    """
+    post_data = generate_post(isbn, logger)
+    if not force and pipeline_state.is_fresh(isbn, pipeline_state.POSTED):
+        # テンプレートの変更は工程のハッシュに含まれないため、投稿時の本文と比較
+        previous = pipeline_state.get_post(isbn)
+        if previous and previous['content_hash'] == pipeline_state.data_hash(post_data):
+            record_stage(pipeline_state.POSTED, 'skipped')
+            return None
+    return post_data
+
+
+def prepare_image(image_file, logger, image_future=None):
+    """
+    アップロードする画像を準備（上限超過時は縮小、変換済みなら保存済みの画像を使用）
     
+    Args:
+        image_file: 元画像のパス
+        image_future: 一括投稿でプロセスプールに投入した変換の Future（指定時は完了を待つ）
+    
+    Returns:
+        str: アップロードする画像のパス
+    """
+    with tracing.span('prepare_image', 'image'):
+        if image_future is not None:
+            prepared = image_future.result()
+        else:
+            prepared = image_prep.prepare(image_file)
+    if prepared['resized'] and not prepared['cached']:
+        width, height = prepared['size']
+        logger.info(f"画像をリサイズしました: {image_file} → {width}x{height} "
+                    f"({prepared['bytes'] / (1024 * 1024):.2f}MB, エンコード{prepared['passes']}回)")
+    elif prepared['resized']:
+        logger.info(f"リサイズ済みの画像を使用: {prepared['path']}")
+    return prepared['path']
+
+
+def post_stage(isbn, post_data, logger, image_future=None):
+    """
+    投稿工程（投稿済みなら同じ記事を更新、画像が変わっていなければ再アップロードしない）
+    
+    Returns:
+        dict: 記事情報
+    """
+    import wp_client
+    
+    image_file = image_path(isbn)
+    image_hash = pipeline_state.file_hash(image_file)
+    previous = pipeline_state.get_post(isbn)
+    post_id = previous['post_id'] if previous else None
+    media_id = pipeline_state.get_media(isbn, image_hash)
+    
+    pipeline_state.mark_running(isbn, pipeline_state.POSTED)
+    start = time.monotonic()
     try:
-        response = requests.get(search_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'lxml')
-        
-        # Google検索結果（通常の検索結果）
-        search_results = soup.find_all('div', class_='g', limit=10)
-        
-        logger.info(f"Google検索結果: {len(search_results)}件")
-        
-        for i, result in enumerate(search_results, 1):
+        with log_handlers.log_context(isbn=isbn, stage=pipeline_state.POSTED):
+            if media_id is None:
+                upload_file = prepare_image(image_file, logger, image_future)
+                # 縮小済みの画像はキャッシュのファイル名（ハッシュ）ではなく元の名前で登録
+                media_id = upload_image(upload_file, logger, filename=os.path.basename(image_file))
+                # 記事の投稿に失敗しても、次回は同じ画像を再アップロードしない
+                pipeline_state.record_media(isbn, media_id, image_hash)
             try:
-                # タイトルとリンク
-                title_elem = result.find('h3')
-                if not title_elem:
-                    continue
-                
-                link_elem = result.find('a')
-                if not link_elem:
-                    continue
-                
-                url = link_elem.get('href', '')
-                title = title_elem.get_text(strip=True)
-                
-                # スニペット
-                snippet_elem = result.find('div', class_='VwiC3b')
-                if not snippet_elem:
-                    snippet_elem = result.find('span', class_='aCOpRe')
-                snippet = snippet_elem.get_text(strip=True) if snippet_elem else ''
-                
-                results.append({
-                    'number': i,
-                    'source': 'Google',
-                    'title': title,
-                    'url': url,
-                    'snippet': snippet
-                })
-                
-                logger.info(f"  [Google-{i}] {title[:50]}...")
-                
-            except Exception as e:
-                logger.warning(f"Google検索結果解析エラー: {e}")
-                continue
-        
+                result = post_to_wp(post_data, image_file, logger, post_id=post_id, media_id=media_id)
+            except wp_client.WordPressError as e:
+                if post_id is None or e.status_code != 404:
+                    raise
+                # WordPress 側で削除された記事は新しい記事として投稿
+                logger.warning(f"投稿済みの記事が見つかりません（post_id={post_id}）。新規に投稿します")
+                pipeline_state.clear_post(isbn)
+                result = post_to_wp(post_data, image_file, logger, media_id=media_id)
     except Exception as e:
-        logger.warning(f"Google検索エラー: {e}")
-    
-    return results
-
-
-def scrape_reviews(isbn, search_term, logger):
-    """Google検索 + Amazon商品ページからレビュー収集（2段階）"""
-    logger.info(f"レビュー収集開始（2段階取得）: {search_term}")
-    
-    # 保存先ディレクトリ作成
-    review_dir = "data/reviews"
-    if not os.path.exists(review_dir):
-        os.makedirs(review_dir)
-        logger.info(f"ディレクトリ作成: {review_dir}")
-    
-    review_path = os.path.join(review_dir, f"review_{isbn}.txt")
-    
-    all_results = []
-    
-    # Phase 1: Google検索
-    logger.info("Phase 1: Google検索からレビューサイト情報取得")
-    google_results = scrape_google_search(search_term, logger)
-    all_results.extend(google_results)
-    
-    # Phase 2: Amazon直接取得
-    time.sleep(2)  # 負荷軽減
-    logger.info("Phase 2: Amazon商品ページからレビュー取得")
-    amazon_results = scrape_amazon_reviews(isbn, logger)
-    all_results.extend(amazon_results)
-    
-    # レビューテキスト生成
-    if len(all_results) == 0:
-        logger.info("レビューがありませんでした")
-        review_text = "※ レビューが見つかりませんでした\n\n"
-        review_text += f"書籍: {search_term}\n"
-        review_text += f"ISBN: {isbn}\n"
-        review_text += f"収集日時: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-        review_text += "【対処方法】\n"
-        review_text += "1. Amazon等で手動検索してレビューをコピー\n"
-        review_text += "2. このファイルに直接貼り付けて保存\n"
-        review_text += "3. ChatGPT/Perplexityで記事生成時に使用\n"
+        pipeline_state.mark_failed(isbn, pipeline_state.POSTED, e)
+        record_stage(pipeline_state.POSTED, 'failed', start, e)
+        raise
+    pipeline_state.record_post(isbn, result['id'], media_id, image_hash, result.get('link'),
+                               pipeline_state.data_hash(post_data))
+    pipeline_state.mark_done(isbn, pipeline_state.POSTED,
+                             pipeline_state.data_hash({'id': result['id'], 'link': result.get('link')}))
+    record_stage(pipeline_state.POSTED, 'done', start)
+    return result
+
+
+def run_post_pipeline(isbn, logger, force=False, image_future=None):
+    """
+    1冊分の投稿（最新ならスキップ）
+    
+    Returns:
+        tuple: (記事タイトル, 記事情報（スキップ時はNone）)
+    """
+    post_data = prepare_post_stage(isbn, logger, force)
+    if post_data is None:
+        book_data = book_cache.load(isbn)
+        return book_data['title'], None
+    return post_data['title'], post_stage(isbn, post_data, logger, image_future)
+
+
+def review_search_term(isbn):
+    """レビュー検索語（キャッシュ済みの書籍タイトル + 著者、未取得ならISBN）"""
+    book_data = book_cache.load(isbn)
+    if book_data:
+        return f"{book_data['title']} {' '.join(book_data.get('authors', []))}"
+    return isbn
+
+
+def read_isbn_list(isbn_file):
+    """ISBNリストの読み込み（1行1件、"-"は標準入力）"""
+    if isbn_file == '-':
+        lines = sys.stdin.read().splitlines()
     else:
-        review_text = f"書籍レビュー要約\n"
-        review_text += "="*70 + "\n"
-        review_text += f"書籍: {search_term}\n"
-        review_text += f"ISBN: {isbn}\n"
-        review_text += f"収集日時: {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
-        review_text += f"収集件数: {len(all_results)}件（Google: {len(google_results)}件, Amazon: {len(amazon_results)}件）\n"
-        review_text += "="*70 + "\n\n"
-        
-        for result in all_results:
-            if result['source'] == 'Google':
-                review_text += f"【{result['number']}】 {result['title']}\n"
-                review_text += f"出典: Google検索結果\n"
-                review_text += f"URL: {result['url']}\n"
-                review_text += f"要約: {result['snippet']}\n"
-            else:  # Amazon
-                review_text += f"【{result['number']}】 {result['title']}\n"
-                review_text += f"出典: Amazon カスタマーレビュー\n"
-                review_text += f"評価: {result['rating']}\n"
-                review_text += f"内容: {result['content'][:200]}...\n"
-                review_text += f"URL: {result['url']}\n"
-            
-            review_text += "-"*70 + "\n\n"
-        
-        review_text += "="*70 + "\n"
-        review_text += "※ 上記はGoogle検索結果とAmazonレビューの要約です\n"
-        review_text += "※ ChatGPT/Perplexityで記事生成時に参考にしてください\n"
+        with open(isbn_file, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    
+    isbns = []
+    for line in lines:
+        line = line.strip()
+        # 空行・コメント行はスキップ
+        if not line or line.startswith('#'):
+            continue
+        isbns.append(line)
+    return isbns
+
+
+def dedupe_isbns(isbns):
+    """
+    ISBNリストを13桁に正規化して重複を除去（ISBN-10/13・ハイフン有無の表記ゆれも統合）
     
-    # ファイル保存
-    with open(review_path, 'w', encoding='utf-8') as f:
-        f.write(review_text)
+    Returns:
+        tuple: (正規化済みISBNのリスト（入力順）, (入力値, エラー) のリスト, 統合した重複件数)
+    """
+    unique = []
+    invalid = []
+    seen = set()
+    for isbn in isbns:
+        try:
+            isbn_normalized = normalize_isbn(isbn)
+        except ValueError as e:
+            invalid.append((isbn, str(e)))
+            continue
+        if isbn_normalized in seen:
+            continue
+        seen.add(isbn_normalized)
+        unique.append(isbn_normalized)
+    duplicates = len(isbns) - len(invalid) - len(unique)
+    return unique, invalid, duplicates
+
+
+def select_isbns(args, logger, command, list_all):
+    """
+    コマンドの対象ISBN（--isbn / --isbn-file、どちらもなければ list_all() の全件）
+    
+    ISBNリストを読み込めない場合は終了し、不正なISBNはエラーを表示して除外する
+    
+    Returns:
+        tuple: (正規化済みISBNのリスト（重複除去済み）, 不正なISBNの件数)
+    """
+    if args.isbn:
+        isbns = [args.isbn]
+    elif args.isbn_file:
+        try:
+            isbns = read_isbn_list(args.isbn_file)
+        except OSError as e:
+            logger.error(f"ISBNリスト読み込みエラー: {e}")
+            print(f"\n❌ エラー: {e}")
+            sys.exit(1)
+    else:
+        return list_all(), 0
     
-    logger.info(f"レビュー保存: {review_path} ({len(all_results)}件)")
-    return review_path
+    isbns, invalid, _ = dedupe_isbns(isbns)
+    for isbn, error in invalid:
+        logger.error(f"{command}エラー: ISBN={isbn}: {error}")
+        print(f"  ❌ {isbn}: {error}")
+    return isbns, len(invalid)
 
 
 def cmd_fetch(args, logger):
     """fetchコマンド実行"""
+    if args.isbn_file:
+        cmd_fetch_batch(args, logger)
+        return
+    
     isbn = args.isbn
     logger.info(f"=== fetch開始: ISBN={isbn} ===")
     print(f"\n📚 書籍情報取得開始: ISBN={isbn}")
     
     try:
+        isbn = normalize_isbn(isbn)
+        
         # 書籍情報取得
         print("1. Google Books APIから書籍情報を取得中...")
-        book_data = fetch_book_data(isbn, logger)
-        isbn_normalized = book_data['isbn']
-        print(f"   ✅ 取得完了: {book_data['title']}")
+        book_data, executed = fetch_metadata_stage(isbn, logger, args.force)
+        if executed:
+            print(f"   ✅ 取得完了: {book_data['title']}")
+        else:
+            print(f"   ⏭️  最新のためスキップ: {book_data['title']}")
         
         # レビュー収集（書籍タイトルで検索）
-        print("2. Bing検索からレビューを収集中...")
-        search_term = f"{book_data['title']} {' '.join(book_data.get('authors', []))}"
-        review_path = scrape_reviews(isbn_normalized, search_term, logger)
-        print(f"   ✅ 収集完了: {review_path}")
+        print("2. レビューを収集中...")
+        review_path, executed = fetch_reviews_stage(book_data, logger, args.force)
+        if executed:
+            print(f"   ✅ 収集完了: {review_path}")
+        else:
+            print(f"   ⏭️  最新のためスキップ: {review_path}")
         
         logger.info("=== fetch完了 ===")
         
@@ -395,60 +806,145 @@ def cmd_fetch(args, logger):
         print("\n次のステップ:")
         print("1. ChatGPT/Perplexityで記事を生成")
         print(f"   入力: {review_path}")
-        print(f"   出力: data/outputs/article_{isbn_normalized}.md")
+        print(f"   出力: {article_path(isbn)}")
         print("2. 画像を生成")
-        print(f"   出力: data/images/thumbnail_{isbn_normalized}.png")
+        print(f"   出力: {image_path(isbn)}")
         
     except Exception as e:
         logger.error(f"fetchエラー: {e}")
         print(f"\n❌ エラー: {e}")
+        print_breaker_summary(logger)
         sys.exit(1)
 
 
-def cmd_post(args, logger):
-    """postコマンド実行（試作版）"""
+def print_breaker_summary(logger):
+    """通信エラーのあったホストのサーキットブレーカー状態を表示"""
+    import circuit_breaker
+    
+    hosts = circuit_breaker.summary()
+    if not hosts:
+        return
+    print("\n🔌 通信エラーのあったホスト:")
+    for host in hosts:
+        line = (f"{host['host']}: {host['state']}（失敗 {host['failures']}回 / "
+                f"遮断 {host['trips']}回 / 即時失敗 {host['rejected']}件）")
+        logger.warning(f"サーキットブレーカー: {line}")
+        print(f"  - {line}")
+
+
+def cmd_fetch_batch(args, logger):
+    """fetchコマンド実行（ISBNリスト一括・並列）"""
+    import http_client
+    
+    try:
+        isbns = read_isbn_list(args.isbn_file)
+    except OSError as e:
+        logger.error(f"ISBNリスト読み込みエラー: {e}")
+        print(f"\n❌ エラー: {e}")
+        sys.exit(1)
+    
+    # 表記ゆれ・重複を統合（同じ書籍の取得・検索は1回だけ）
+    isbns, invalid, duplicates = dedupe_isbns(isbns)
+    
+    workers = max(1, args.workers)
+    total = len(isbns)
+    
+    # 並列数分の keep-alive 接続をホストごとに保持
+    http_client.configure(pool_maxsize=workers)
+    
+    # キャッシュ未登録分の書籍情報を先にまとめて取得（残りは各ワーカーで個別取得）
+    prefetch_books_bulk(isbns, logger, workers=workers)
+    logger.info(f"=== fetch一括開始: {total}件, 並列数={workers} ===")
+    print(f"\n📚 一括取得開始: {total}件（並列数: {workers}）")
+    if duplicates:
+        print(f"  🔗 重複ISBNを統合: {duplicates}件")
+    
+    succeeded = 0
+    skipped = 0
+    failed = list(invalid)
+    for isbn, error in invalid:
+        logger.error(f"fetchエラー: ISBN={isbn}: {error}")
+        print(f"  ❌ {isbn}: {error}")
+    start_time = time.perf_counter()
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(run_fetch_pipeline, isbn, logger, args.force): isbn
+            for isbn in isbns
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            isbn = futures[future]
+            try:
+                book_data, review_path, ran = future.result()
+                succeeded += 1
+                if ran:
+                    print(f"  [{done}/{total}] ✅ {isbn}: {book_data['title']}（{', '.join(ran)}）")
+                else:
+                    skipped += 1
+                    print(f"  [{done}/{total}] ⏭️  {isbn}: {book_data['title']}（最新のためスキップ）")
+            except Exception as e:
+                failed.append((isbn, str(e)))
+                logger.error(f"fetchエラー: ISBN={isbn}: {e}")
+                print(f"  [{done}/{total}] ❌ {isbn}: {e}")
+    
+    elapsed = time.perf_counter() - start_time
+    logger.info(f"=== fetch一括完了: 成功={succeeded}（スキップ={skipped}）, 失敗={len(failed)}, {elapsed:.1f}秒 ===")
+    
+    print("\n" + "="*60)
+    print("📊 一括取得結果")
+    print("="*60)
+    print(f"対象: {total}件（入力: {total + len(invalid) + duplicates}件） / "
+          f"成功: {succeeded}件（うちスキップ: {skipped}件） / 失敗: {len(failed)}件")
+    print(f"所要時間: {elapsed:.1f}秒（並列数: {workers}）")
+    if total > 0:
+        print(f"スループット: {total / elapsed * 60:.1f}冊/分")
+    shared = sum(singleflight.stats().values())
+    if shared:
+        print(f"重複リクエストの統合: {shared}件（実行中の取得結果を共有）")
+    print_breaker_summary(logger)
+    if failed:
+        print("\n失敗したISBN:")
+        for isbn, error in failed:
+            print(f"  - {isbn}: {error}")
+        sys.exit(1)
+
+
+def cmd_post(args, logger, config):
+    """postコマンド実行"""
+    if args.isbn_file or args.all:
+        cmd_post_batch(args, logger, config)
+        return
+    
     isbn = normalize_isbn(args.isbn)
+    log_handlers.bind(isbn=isbn, stage='post')
     logger.info(f"=== post開始: ISBN={isbn} ===")
-    print(f"\n📝 投稿準備確認: ISBN={isbn}")
+    print(f"\n📝 WordPress投稿: ISBN={isbn}")
     
     try:
-        book_path = f"data/books/book_{isbn}.json"
-        article_path = f"data/outputs/article_{isbn}.md"
-        image_path = f"data/images/thumbnail_{isbn}.png"
-        
-        # ファイル確認
+        # ファイル確認（ネットワーク系のモジュールは確認後に読み込む）
         print("ファイル確認中...")
+        post_data = prepare_post_stage(isbn, logger, args.force)
+        print(f"  ✅ 書籍情報: {book_cache.DB_PATH}")
+        print(f"  ✅ 記事: {article_path(isbn)}")
+        print(f"  ✅ 画像: {image_path(isbn)}")
         
-        if not os.path.exists(book_path):
-            raise FileNotFoundError(f"書籍情報が見つかりません: {book_path}")
-        
-        with open(book_path, 'r', encoding='utf-8') as f:
-            book_data = json.load(f)
-        print(f"  ✅ 書籍情報: {book_path}")
-        
-        if not os.path.exists(article_path):
-            raise FileNotFoundError(f"記事ファイルが見つかりません: {article_path}")
-        
-        with open(article_path, 'r', encoding='utf-8') as f:
-            article_content = f.read()
-        print(f"  ✅ 記事: {article_path} ({len(article_content)}文字)")
+        if post_data is None:
+            posted = pipeline_state.get_post(isbn)
+            print(f"\n⏭️  投稿済みのためスキップ: {posted['link'] if posted else ''}")
+            logger.info("=== post完了（スキップ） ===")
+            return
         
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"画像ファイルが見つかりません: {image_path}")
-        
-        image_size_mb = os.path.getsize(image_path) / (1024 * 1024)
-        print(f"  ✅ 画像: {image_path} ({image_size_mb:.2f}MB)")
-        
-        if image_size_mb > 2:
-            print(f"  ⚠️  画像が2MB超過: {image_size_mb:.2f}MB")
+        print("投稿中...")
+        apply_post_config(config)
+        result = post_stage(isbn, post_data, logger)
         
         print("\n" + "="*60)
-        print("✅ 投稿準備ファイルの確認完了")
+        print("✅ WordPressに下書きを投稿しました")
         print("="*60)
-        print(f"📖 書籍名: {book_data['title']}")
-        print("【試作版】WordPress投稿機能は次フェーズで実装")
+        print(f"📖 書籍名: {post_data['title']}")
+        print(f"🔗 投稿URL: {result.get('link')}")
         
-        logger.info("=== post確認完了 ===")
+        logger.info("=== post完了 ===")
         
     except FileNotFoundError as e:
         logger.error(f"ファイルエラー: {e}")
@@ -460,41 +956,718 @@ def cmd_post(args, logger):
         sys.exit(1)
 
 
-def main():
-    """メイン関数"""
-    print("main()関数開始")  # デバッグ
+def list_article_isbns():
+    """記事ファイルのあるISBN一覧（data/outputs/article_{isbn}.md）"""
+    output_dir = os.path.dirname(article_path(''))
+    if not os.path.isdir(output_dir):
+        return []
+    isbns = []
+    for name in sorted(os.listdir(output_dir)):
+        if name.startswith('article_') and name.endswith('.md'):
+            isbns.append(name[len('article_'):-len('.md')])
+    return isbns
+
+
+def cmd_post_batch(args, logger, config):
+    """postコマンド実行（ISBNリスト・記事のある全件を並列投稿）"""
+    import http_client
     
-    # ロガー初期化
-    logger = setup_logger()
-    logger.info("プログラム起動")
+    if args.all:
+        isbns = list_article_isbns()
+    else:
+        try:
+            isbns = read_isbn_list(args.isbn_file)
+        except OSError as e:
+            logger.error(f"ISBNリスト読み込みエラー: {e}")
+            print(f"\n❌ エラー: {e}")
+            sys.exit(1)
+    isbns, invalid, duplicates = dedupe_isbns(isbns)
+    
+    workers = max(1, args.workers)
+    total = len(isbns)
+    apply_post_config(config)
+    # 並列数分の keep-alive 接続を保持（アップロードは wp_upload_workers 件まで、残りは記事投稿）
+    http_client.configure(pool_maxsize=workers)
+    logger.info(f"=== post一括開始: {total}件, 並列数={workers} ===")
+    print(f"\n📝 一括投稿開始: {total}件（並列数: {workers}）")
+    if duplicates:
+        print(f"  🔗 重複ISBNを統合: {duplicates}件")
+    
+    succeeded = 0
+    skipped = 0
+    failed = list(invalid)
+    for isbn, error in invalid:
+        logger.error(f"postエラー: ISBN={isbn}: {error}")
+        print(f"  ❌ {isbn}: {error}")
+    start_time = time.perf_counter()
+    
+    # 上限超過の画像は投稿と並行してプロセスプールで縮小（各ワーカーは自分の画像の完了だけを待つ）
+    resize_groups = image_prep.pending([image_path(isbn) for isbn in isbns])
+    image_executor = None
+    image_futures = {}
+    if resize_groups:
+        from concurrent.futures import ProcessPoolExecutor
+        
+        image_workers = min(image_prep.WORKERS or os.cpu_count() or 1, len(resize_groups))
+        image_executor = ProcessPoolExecutor(max_workers=image_workers)
+        image_futures = image_prep.submit_all(image_executor, resize_groups)
+        print(f"  🖼️  画像の縮小: {len(resize_groups)}件（並列数: {image_workers}）")
     
-    # 引数パーサー
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(run_post_pipeline, isbn, logger, args.force,
+                                image_futures.get(image_path(isbn))): isbn
+                for isbn in isbns
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                isbn = futures[future]
+                try:
+                    title, result = future.result()
+                    succeeded += 1
+                    if result is not None:
+                        print(f"  [{done}/{total}] ✅ {isbn}: {title}（{result.get('link')}）")
+                    else:
+                        skipped += 1
+                        print(f"  [{done}/{total}] ⏭️  {isbn}: {title}（投稿済みのためスキップ）")
+                except Exception as e:
+                    failed.append((isbn, str(e)))
+                    logger.error(f"postエラー: ISBN={isbn}: {e}")
+                    print(f"  [{done}/{total}] ❌ {isbn}: {e}")
+    finally:
+        if image_executor is not None:
+            image_executor.shutdown(cancel_futures=True)
+    
+    elapsed = time.perf_counter() - start_time
+    logger.info(f"=== post一括完了: 成功={succeeded}（スキップ={skipped}）, 失敗={len(failed)}, {elapsed:.1f}秒 ===")
+    
+    print("\n" + "="*60)
+    print("📊 一括投稿結果")
+    print("="*60)
+    print(f"対象: {total}件（入力: {total + len(invalid) + duplicates}件） / "
+          f"成功: {succeeded}件（うちスキップ: {skipped}件） / 失敗: {len(failed)}件")
+    print(f"所要時間: {elapsed:.1f}秒（並列数: {workers}）")
+    if total > 0:
+        print(f"スループット: {total / elapsed * 60:.1f}冊/分")
+    print_breaker_summary(logger)
+    if failed:
+        print("\n失敗したISBN:")
+        for isbn, error in failed:
+            print(f"  - {isbn}: {error}")
+        sys.exit(1)
+
+
+def cmd_reparse(args, logger):
+    """reparseコマンド実行（スナップショットからレビューを再抽出・プロセス並列）"""
+    from concurrent.futures import ProcessPoolExecutor
+    import scraper
+    
+    isbns, invalid = select_isbns(args, logger, 'reparse', snapshot_store.list_isbns)
+    
+    workers = max(1, args.workers or os.cpu_count() or 1)
+    total = len(isbns)
+    logger.info(f"=== reparse開始: {total}件, 並列数={workers} ===")
+    print(f"\n🔁 スナップショット再解析: {total}件（並列数: {workers}）")
+    
+    # 不正なISBNも失敗として数える（終了コードに反映）
+    failed = invalid
+    start_time = time.perf_counter()
+    
+    # 子プロセスのログはキュー経由で親プロセスのハンドラーが書き込む（ファイルの同時書き込みを避ける）
+    log_queue, listener = log_handlers.start_process_logging(logger)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=log_handlers.init_process_logging,
+                                 initargs=(log_queue, logger.name, logger.level)) as executor:
+            futures = {
+                executor.submit(scraper.reparse_reviews, isbn, review_search_term(isbn), snapshot_store.SNAPSHOT_DIR,
+                                scraper.REVIEW_DIR, scraper.ENABLED_SOURCES, scraper.AMAZON_URL): isbn
+                for isbn in isbns
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                isbn = futures[future]
+                try:
+                    counts = future.result()
+                    # 再生成したレビューファイルを記録（次回の fetch で再収集・上書きしない）
+                    pipeline_state.mark_done(isbn, pipeline_state.REVIEWS,
+                                             pipeline_state.file_hash(scraper.review_file_path(isbn)))
+                    summary = ', '.join(f"{name} {count}件" for name, count in counts.items())
+                    print(f"  [{done}/{total}] ✅ {isbn}: {summary}")
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"reparseエラー: ISBN={isbn}: {e}")
+                    print(f"  [{done}/{total}] ❌ {isbn}: {e}")
+    finally:
+        listener.stop()
+    
+    elapsed = time.perf_counter() - start_time
+    logger.info(f"=== reparse完了: 失敗={failed}, {elapsed:.1f}秒 ===")
+    print(f"\n対象: {total}件 / 失敗: {failed}件 / 所要時間: {elapsed:.1f}秒")
+    if failed:
+        sys.exit(1)
+
+
+def cmd_render(args, logger):
+    """renderコマンド実行（記事をHTMLに変換・プロセス並列、変更のない記事はスキップ）"""
+    from concurrent.futures import ProcessPoolExecutor
+    
+    isbns, invalid = select_isbns(args, logger, 'render', list_article_isbns)
+    
+    total = len(isbns)
+    logger.info(f"=== render開始: {total}件 ===")
+    print(f"\n🖋️  記事のレンダリング: {total}件")
+    
+    template = renderer.load_template()
+    # 不正なISBNも失敗として数える（終了コードに反映）
+    failed = invalid
+    skipped = 0
+    start_time = time.perf_counter()
+    
+    # 記事・書籍情報・テンプレートのハッシュを確認し、変更のあった記事だけを変換
+    targets = []
+    for isbn in isbns:
+        book_data = book_cache.load(isbn)
+        article_file = article_path(isbn)
+        if book_data is None or not os.path.exists(article_file):
+            failed += 1
+            missing = '書籍情報' if book_data is None else '記事ファイル'
+            logger.error(f"renderエラー: ISBN={isbn}: {missing}が見つかりません")
+            print(f"  ❌ {isbn}: {missing}が見つかりません")
+            record_stage('render', 'failed')
+            continue
+        pipeline_state.observe(isbn, pipeline_state.ARTICLE, article_file)
+        with open(article_file, 'r', encoding='utf-8') as f:
+            key = renderer.render_key(book_data, f.read(), template)
+        if not args.force and renderer.load_cached(isbn, key) is not None:
+            skipped += 1
+            record_stage('render', 'skipped')
+            continue
+        targets.append((isbn, book_data, article_file))
+    
+    rendered = 0
+    if targets:
+        workers = max(1, min(args.workers or os.cpu_count() or 1, len(targets)))
+        print(f"  変換: {len(targets)}件 / 変更なし: {skipped}件（並列数: {workers}）")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(renderer.render_file, isbn, book_data, article_file,
+                                renderer.RENDER_DIR, template, args.force): isbn
+                for isbn, book_data, article_file in targets
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                isbn = futures[future]
+                try:
+                    future.result()
+                    rendered += 1
+                    record_stage('render', 'done')
+                    print(f"  [{done}/{len(targets)}] ✅ {isbn}: {renderer.output_path(isbn)}")
+                except Exception as e:
+                    failed += 1
+                    record_stage('render', 'failed', error=e)
+                    logger.error(f"renderエラー: ISBN={isbn}: {e}")
+                    print(f"  [{done}/{len(targets)}] ❌ {isbn}: {e}")
+    
+    elapsed = time.perf_counter() - start_time
+    logger.info(f"=== render完了: 変換={rendered}, スキップ={skipped}, 失敗={failed}, {elapsed:.1f}秒 ===")
+    print(f"\n対象: {total}件 / 変換: {rendered}件 / 変更なし: {skipped}件 / 失敗: {failed}件 / "
+          f"所要時間: {elapsed:.1f}秒")
+    if failed:
+        sys.exit(1)
+
+
+def run_job(job, logger):
+    """
+    ジョブ1件を実行（fetch: 書籍情報取得 + レビュー収集、post: 投稿）
+    
+    Returns:
+        str: 結果の表示（書籍タイトルと実行内容）
+    """
+    if job['kind'] == job_queue.FETCH:
+        book_data, _, ran = run_fetch_pipeline(job['isbn'], logger, job['force'])
+        return f"{book_data['title']}（{'・'.join(ran) if ran else '最新のためスキップ'}）"
+    title, result = run_post_pipeline(job['isbn'], logger, job['force'])
+    return f"{title}（{result.get('link') if result else '投稿済みのためスキップ'}）"
+
+
+def is_retryable(error):
+    """再試行で解決する見込みのあるエラーならTrue（ISBN不正・ファイルなし・認証失敗などは再試行しない）"""
+    if isinstance(error, (ValueError, FileNotFoundError)):
+        return False
+    status_code = getattr(error, 'status_code', None)
+    if status_code is not None and 400 <= status_code < 500 and status_code not in (408, 429):
+        return False
+    return True
+
+
+def cmd_worker(args, logger, config):
+    """workerコマンド実行（ジョブキューを常駐処理、HTTP接続・キャッシュはプロセス内で保持）"""
+    import signal
+    import socket
+    import threading
+    import http_client
+    
+    kinds = tuple(args.kind or job_queue.KINDS)
+    workers = max(1, args.workers)
+    lease_seconds = args.lease or job_queue.LEASE_SECONDS
+    apply_post_config(config)
+    http_client.configure(pool_maxsize=workers)
+    
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    stop = threading.Event()
+    finished = threading.Event()
+    lock = threading.Lock()
+    active = {}    # 処理中のジョブID → リースの所有者（期限の延長対象）
+    counts = {'done': 0, 'retry': 0, 'failed': 0}
+    
+    def request_stop(signum, frame):
+        if not stop.is_set():
+            logger.info(f"停止要求を受信: {signal.Signals(signum).name}")
+            print("\n⏹️  停止要求を受信しました（処理中のジョブの完了を待って終了します）")
+        stop.set()
+    
+    def extend_leases():
+        # リース期限の1/3ごとに処理中のジョブを延長（停止したワーカーのジョブだけが期限切れになる）
+        while not finished.wait(lease_seconds / 3):
+            with lock:
+                leased = list(active.items())
+            for job_id, job_owner in leased:
+                if not job_queue.extend(job_id, job_owner, lease_seconds):
+                    logger.warning(f"リースの延長に失敗（期限切れで他のワーカーが再取得した可能性）: job={job_id}")
+    
+    def process_jobs(slot):
+        slot_owner = f"{owner}:{slot}"
+        while not stop.is_set():
+            job = job_queue.lease(slot_owner, kinds, lease_seconds)
+            if job is None:
+                if args.exit_when_empty and job_queue.pending_count(kinds) == 0:
+                    return
+                stop.wait(args.poll)
+                continue
+            
+            isbn, kind = job['isbn'], job['kind']
+            with lock:
+                active[job['id']] = slot_owner
+            start = time.monotonic()
+            try:
+                with log_handlers.log_context(isbn=isbn, stage=kind):
+                    logger.info(f"ジョブ開始: {kind} ISBN={isbn}（{job['attempts']}/{job['max_attempts']}回目）")
+                    summary = run_job(job, logger)
+            except Exception as e:
+                retry_at = job_queue.fail(job['id'], slot_owner, e, retry=is_retryable(e))
+                record_stage(f"job_{kind}", 'failed', start, e)
+                with lock:
+                    counts['retry' if retry_at else 'failed'] += 1
+                if retry_at:
+                    logger.warning(f"ジョブ失敗（{time.strftime('%H:%M:%S', time.localtime(retry_at))}に再試行）: "
+                                   f"{kind} ISBN={isbn}: {e}")
+                    print(f"  🔁 [{kind}] {isbn}: {e}（再試行予定）")
+                else:
+                    logger.error(f"ジョブ失敗: {kind} ISBN={isbn}: {e}")
+                    print(f"  ❌ [{kind}] {isbn}: {e}")
+            else:
+                job_queue.complete(job['id'], slot_owner)
+                record_stage(f"job_{kind}", 'done', start)
+                with lock:
+                    counts['done'] += 1
+                logger.info(f"ジョブ完了: {kind} ISBN={isbn}")
+                print(f"  ✅ [{kind}] {isbn}: {summary}")
+            finally:
+                with lock:
+                    active.pop(job['id'], None)
+                    processed = counts['done'] + counts['retry'] + counts['failed']
+                if args.max_jobs and processed >= args.max_jobs:
+                    stop.set()
+    
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    
+    logger.info(f"=== worker開始: {owner}, 種別={','.join(kinds)}, 並列数={workers} ===")
+    print(f"\n👷 ワーカー起動: {owner}（種別: {', '.join(kinds)} / 並列数: {workers} / "
+          f"キュー: {job_queue.DB_PATH}）")
+    start_time = time.perf_counter()
+    
+    heartbeat = threading.Thread(target=extend_leases, name='job-lease', daemon=True)
+    heartbeat.start()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job-worker') as executor:
+        futures = [executor.submit(process_jobs, slot) for slot in range(workers)]
+        # シグナルを受け取れるよう、メインスレッドは短い間隔で完了を確認
+        while not all(future.done() for future in futures):
+            time.sleep(0.5)
+    finished.set()
+    heartbeat.join()
+    for future in futures:
+        future.result()
+    
+    elapsed = time.perf_counter() - start_time
+    logger.info(f"=== worker終了: 完了={counts['done']}, 再試行待ち={counts['retry']}, "
+                f"失敗={counts['failed']}, {elapsed:.1f}秒 ===")
+    print(f"\n完了: {counts['done']}件 / 再試行待ち: {counts['retry']}件 / 失敗: {counts['failed']}件 / "
+          f"稼働時間: {elapsed:.1f}秒")
+    print_breaker_summary(logger)
+
+
+def print_queue_stats():
+    """ジョブキューの件数（種別 × 状態）と最近の失敗を表示"""
+    labels = {job_queue.QUEUED: '待機', job_queue.LEASED: '処理中', job_queue.DONE: '完了',
+              job_queue.FAILED: '失敗'}
+    print(f"\n📮 ジョブキュー: {job_queue.DB_PATH}")
+    for kind, counts in job_queue.stats().items():
+        print(f"  {kind:<6} " + ' / '.join(f"{labels[state]}: {counts[state]}件" for state in job_queue.STATES))
+    failed = job_queue.list_failed()
+    if failed:
+        print("\n最近失敗したジョブ:")
+        for isbn, kind, error in failed:
+            print(f"  - [{kind}] {isbn}: {error}")
+
+
+def cmd_enqueue(args, logger):
+    """enqueueコマンド実行（worker が処理するジョブを登録）"""
+    if args.stats:
+        print_queue_stats()
+        return
+    
+    if args.isbn:
+        isbns = [args.isbn]
+    elif args.isbn_file:
+        try:
+            isbns = read_isbn_list(args.isbn_file)
+        except OSError as e:
+            logger.error(f"ISBNリスト読み込みエラー: {e}")
+            print(f"\n❌ エラー: {e}")
+            sys.exit(1)
+    else:
+        isbns = list_article_isbns()
+    isbns, invalid, duplicates = dedupe_isbns(isbns)
+    
+    added, existing = job_queue.enqueue(isbns, args.kind, priority=args.priority, force=args.force)
+    logger.info(f"ジョブ登録: {args.kind} 新規={added}, 登録済み={existing}, 優先度={args.priority}")
+    print(f"\n📮 ジョブを登録しました: {args.kind} {added}件（登録済み: {existing}件 / 優先度: {args.priority}）")
+    if duplicates:
+        print(f"  🔗 重複ISBNを統合: {duplicates}件")
+    for isbn, error in invalid:
+        logger.error(f"enqueueエラー: ISBN={isbn}: {error}")
+        print(f"  ❌ {isbn}: {error}")
+    if invalid:
+        sys.exit(1)
+
+
+def cmd_import(args, logger):
+    """importコマンド実行（カタログのCSV/TSVを1行ずつ検証・重複除去し、取得が必要なISBNを出力）"""
+    import csv
+    import catalog_import
+    
+    # ISBNの出力先（標準出力の場合、結果の表示は標準エラーへ）
+    output_path = args.output or (None if args.enqueue else '-')
+    if output_path == '-' and args.invalid == '-':
+        # ISBNリストを読む他のツールに無効行のCSVが混ざらないよう、標準出力はどちらか一方だけ
+        logger.error("importエラー: ISBNの出力先と --invalid の両方に標準出力は指定できません")
+        print("\n❌ エラー: ISBNの出力先が標準出力の場合、--invalid にはファイルを指定してください", file=sys.stderr)
+        sys.exit(1)
+    report = sys.stderr if '-' in (output_path, args.invalid) else sys.stdout
+    counts = {'rows': 0, 'invalid': 0, 'duplicates': 0, 'cached': 0, 'not_found': 0, 'needed': 0}
+    shown_invalid = 0
+    
+    logger.info(f"=== import開始: {args.file} ===")
+    print(f"\n📥 カタログ取り込み: {args.file}", file=report)
+    start_time = time.perf_counter()
+    
+    output = catalog_import.open_output(output_path) if output_path else None
+    invalid_writer = None
+    invalid_file = None
+    seen = catalog_import.SeenSet()
+    try:
+        if args.invalid:
+            invalid_file = catalog_import.open_output(args.invalid)
+            invalid_writer = csv.writer(invalid_file)
+            invalid_writer.writerow(['line', 'value', 'error'])
+        
+        rows = catalog_import.read_rows(args.file, args.column, args.delimiter)
+        for chunk in catalog_import.chunked(rows):
+            valid = []
+            for line_no, value in chunk:
+                try:
+                    valid.append(normalize_isbn(value))
+                except ValueError as e:
+                    counts['invalid'] += 1
+                    if invalid_writer is not None:
+                        invalid_writer.writerow([line_no, value, str(e)])
+                    if shown_invalid < catalog_import.SHOW_INVALID:
+                        shown_invalid += 1
+                        print(f"  ❌ {line_no}行目: {e}", file=report)
+            candidates = seen.filter_new(valid)
+            counts['duplicates'] += len(valid) - len(candidates)
+            counts['rows'] += len(chunk)
+            
+            # 書籍情報キャッシュに有効期限内の結果があるISBNは出力しない
+            cached = book_cache.lookup(candidates)
+            needed = []
+            for isbn in candidates:
+                status = cached.get(isbn)
+                if status == book_cache.FOUND:
+                    counts['cached'] += 1
+                elif status == book_cache.NOT_FOUND:
+                    counts['not_found'] += 1
+                else:
+                    needed.append(isbn)
+            counts['needed'] += len(needed)
+            if output is not None:
+                output.write(''.join(f"{isbn}\n" for isbn in needed))
+            if args.enqueue and needed:
+                job_queue.enqueue(needed, args.enqueue, priority=args.priority)
+            
+            if counts['rows'] % catalog_import.PROGRESS_ROWS < len(chunk):
+                logger.info(f"import進捗: {counts['rows']:,}行（出力 {counts['needed']:,}件）")
+    except (OSError, ValueError) as e:
+        logger.error(f"importエラー: {e}")
+        print(f"\n❌ エラー: {e}", file=report)
+        sys.exit(1)
+    finally:
+        seen.close()
+        if output is not None and output is not sys.stdout:
+            output.close()
+        if invalid_file is not None and invalid_file is not sys.stdout:
+            invalid_file.close()
+    
+    elapsed = time.perf_counter() - start_time
+    logger.info(f"=== import完了: {counts['rows']}行, 出力={counts['needed']}, 無効={counts['invalid']}, "
+                f"重複={counts['duplicates']}, 取得済み={counts['cached'] + counts['not_found']}, {elapsed:.1f}秒 ===")
+    if counts['invalid'] > shown_invalid:
+        print(f"  … ほか{counts['invalid'] - shown_invalid}行" +
+              (f"（{args.invalid} に出力）" if args.invalid else "（--invalid で全件をファイルに出力）"), file=report)
+    print(f"\n行数: {counts['rows']:,} / 取得が必要: {counts['needed']:,}件 / 無効: {counts['invalid']:,}行 / "
+          f"重複: {counts['duplicates']:,}行 / 取得済み: {counts['cached']:,}件 / "
+          f"該当なし（キャッシュ）: {counts['not_found']:,}件", file=report)
+    print(f"所要時間: {elapsed:.1f}秒", file=report)
+    if output_path and output_path != '-':
+        print(f"📄 出力: {output_path}", file=report)
+    if args.enqueue:
+        print(f"📮 ジョブを登録しました: {args.enqueue} {counts['needed']:,}件", file=report)
+
+
+STATE_ICONS = {
+    pipeline_state.FRESH: '✅',
+    pipeline_state.STALE: '🔄',
+    pipeline_state.MISSING: '⬜',
+}
+
+
+def cmd_status(args, logger):
+    """statusコマンド実行（ISBN × 工程の進捗表示）"""
+    isbns, invalid = select_isbns(args, logger, 'status', pipeline_state.list_isbns)
+    
+    print(f"\n📋 パイプライン状態: {len(isbns)}件（✅ 最新 / 🔄 要再実行 / ⬜ 未実行）")
+    print("  " + " ".join(f"{stage:<9}" for stage in pipeline_state.STAGES))
+    
+    totals = {stage: {state: 0 for state in STATE_ICONS} for stage in pipeline_state.STAGES}
+    for isbn in isbns:
+        output_paths = stage_output_paths(isbn)
+        # 手作業の工程（記事・画像）はファイルの有無・変更を反映
+        pipeline_state.observe(isbn, pipeline_state.ARTICLE, output_paths[pipeline_state.ARTICLE])
+        pipeline_state.observe(isbn, pipeline_state.IMAGE, output_paths[pipeline_state.IMAGE])
+        
+        stages = pipeline_state.status(isbn, output_paths)
+        for stage, info in stages.items():
+            totals[stage][info['state']] += 1
+        icons = " ".join(f"{STATE_ICONS[info['state']]:<8}" for info in stages.values())
+        print(f"  {icons} {isbn}")
+    
+    print("\n工程別:")
+    for stage, counts in totals.items():
+        summary = ' / '.join(f"{STATE_ICONS[state]} {count}件" for state, count in counts.items())
+        print(f"  {stage:<9} {summary}")
+    if invalid:
+        sys.exit(1)
+
+
+def cmd_cache(args, logger):
+    """cacheコマンド実行（書籍情報キャッシュの管理）"""
+    if args.cache_command == 'stats':
+        stats = book_cache.stats()
+        print(f"\n🗄️  書籍情報キャッシュ: {book_cache.DB_PATH}")
+        print(f"  登録件数: {stats['total']}件（取得済み: {stats['found']}件, 該当なし: {stats['not_found']}件）")
+        print(f"  期限切れ: {stats['expired']}件")
+        print(f"  ファイルサイズ: {stats['db_size'] / (1024 * 1024):.2f}MB")
+    elif args.cache_command == 'gc':
+        removed = book_cache.gc()
+        logger.info(f"キャッシュ削除: 期限切れ{removed}件")
+        print(f"\n🧹 期限切れエントリを削除しました: {removed}件")
+    elif args.cache_command == 'migrate':
+        count = book_cache.migrate(logger, delete_json=args.delete_json)
+        print(f"\n📦 JSONキャッシュを取り込みました: {count}件")
+
+
+def write_profile(logger, cprofile=False):
+    """--profile: トレース（Chrome形式）・cProfile統計の保存と処理時間の内訳表示"""
+    stamp = time.strftime('%Y%m%d_%H%M%S')
+    stats_path = os.path.join(tracing.PROFILE_DIR, f"profile_{stamp}.prof")
+    if cprofile:
+        tracing.stop_profile(stats_path)
+    
+    trace_path = os.path.join(tracing.PROFILE_DIR, f"trace_{stamp}.json")
+    count = tracing.write_trace(trace_path)
+    logger.info(f"トレース保存: {trace_path}（{count}件）")
+    
+    print(f"\n⏱️  処理時間の内訳（合計時間の上位10件、並列実行分は重複して計上）")
+    for item in tracing.summary()[:10]:
+        size = f"  {item['bytes'] // 1024:,}KB" if item['bytes'] else ''
+        print(f"  {item['name']:<24}{item['count']:>6}回  合計 {item['total_ms'] / 1000:>7.2f}秒"
+              f"  最大 {item['max_ms']:>7.0f}ms{size}")
+    print(f"\n📄 トレース: {trace_path}（chrome://tracing / https://ui.perfetto.dev で表示）")
+    if cprofile:
+        print(f"📄 cProfile: {stats_path}（python -m pstats {stats_path}）")
+
+
+def build_parser(config):
+    """引数パーサーの生成"""
     parser = argparse.ArgumentParser(description='bookpost - Book Review Auto Poster')
+    parser.add_argument('--profile', action='store_true',
+                        help=f'処理時間のトレース（Chrome形式）を {tracing.PROFILE_DIR}/ に出力')
+    parser.add_argument('--cprofile', action='store_true', help='--profile と併せて cProfile の統計も出力')
     subparsers = parser.add_subparsers(dest='command', help='コマンド')
     
     # fetchコマンド
     parser_fetch = subparsers.add_parser('fetch', help='書籍情報取得')
-    parser_fetch.add_argument('--isbn', required=True, help='ISBN-13')
+    fetch_target = parser_fetch.add_mutually_exclusive_group(required=True)
+    fetch_target.add_argument('--isbn', help='ISBN-13')
+    fetch_target.add_argument('--isbn-file', help='ISBNリストファイル（1行1件、"-"で標準入力）')
+    parser_fetch.add_argument('--workers', type=int, default=config.get('fetch_workers', 4),
+                              help='一括取得時の並列数')
+    parser_fetch.add_argument('--force', action='store_true', help='最新の工程も再実行')
     
     # postコマンド
-    parser_post = subparsers.add_parser('post', help='投稿準備確認')
-    parser_post.add_argument('--isbn', required=True, help='ISBN-13')
+    parser_post = subparsers.add_parser('post', help='WordPressに下書きを投稿')
+    post_target = parser_post.add_mutually_exclusive_group(required=True)
+    post_target.add_argument('--isbn', help='ISBN-13')
+    post_target.add_argument('--isbn-file', help='ISBNリストファイル（1行1件、"-"で標準入力）')
+    post_target.add_argument('--all', action='store_true', help='記事ファイルのある全件（投稿済みはスキップ）')
+    parser_post.add_argument('--workers', type=int, default=config.get('post_workers', 4),
+                             help='一括投稿時の並列数')
+    parser_post.add_argument('--force', action='store_true', help='投稿済みの記事も更新')
+    
+    # reparseコマンド
+    parser_reparse = subparsers.add_parser('reparse', help='保存済みHTMLからレビューを再抽出（ネットワークなし）')
+    reparse_target = parser_reparse.add_mutually_exclusive_group()
+    reparse_target.add_argument('--isbn', help='ISBN-13（省略時は全件）')
+    reparse_target.add_argument('--isbn-file', help='ISBNリストファイル（1行1件、"-"で標準入力）')
+    parser_reparse.add_argument('--workers', type=int, default=None, help='並列プロセス数（既定: CPU数）')
+    
+    # renderコマンド
+    parser_render = subparsers.add_parser('render', help='記事をHTMLに変換（書籍情報と合わせて投稿データを生成）')
+    render_target = parser_render.add_mutually_exclusive_group()
+    render_target.add_argument('--isbn', help='ISBN-13（省略時は記事ファイルのある全件）')
+    render_target.add_argument('--isbn-file', help='ISBNリストファイル（1行1件、"-"で標準入力）')
+    parser_render.add_argument('--workers', type=int, default=None, help='並列プロセス数（既定: CPU数）')
+    parser_render.add_argument('--force', action='store_true', help='変更のない記事も再変換')
+    
+    # enqueueコマンド
+    parser_enqueue = subparsers.add_parser('enqueue', help='worker が処理するジョブを登録')
+    enqueue_target = parser_enqueue.add_mutually_exclusive_group(required=True)
+    enqueue_target.add_argument('--isbn', help='ISBN-13')
+    enqueue_target.add_argument('--isbn-file', help='ISBNリストファイル（1行1件、"-"で標準入力）')
+    enqueue_target.add_argument('--all', action='store_true', help='記事ファイルのある全件')
+    enqueue_target.add_argument('--stats', action='store_true', help='キューの件数と最近の失敗を表示（登録しない）')
+    parser_enqueue.add_argument('--kind', choices=job_queue.KINDS, default=job_queue.FETCH, help='ジョブの種別')
+    parser_enqueue.add_argument('--priority', type=int, default=0, help='優先度（大きいほど先に処理）')
+    parser_enqueue.add_argument('--force', action='store_true', help='最新の工程・投稿済みの記事も再実行')
     
-    # 引数解析
+    # workerコマンド
+    parser_worker = subparsers.add_parser('worker', help='ジョブキューを常駐処理（複数起動で分散）')
+    parser_worker.add_argument('--kind', choices=job_queue.KINDS, action='append',
+                               help='処理する種別（複数指定可、省略時は全種別）')
+    parser_worker.add_argument('--workers', type=int, default=config.get('worker_threads', 4),
+                               help='並列数（スレッド）')
+    parser_worker.add_argument('--lease', type=int, default=None,
+                               help=f'リースの期限（秒、既定: {job_queue.LEASE_SECONDS}）')
+    parser_worker.add_argument('--poll', type=float, default=2.0, help='キューが空の場合の確認間隔（秒）')
+    parser_worker.add_argument('--max-jobs', type=int, default=0,
+                               help='この件数を処理したら終了（0: 無制限、定期的な再起動用）')
+    parser_worker.add_argument('--exit-when-empty', action='store_true',
+                               help='未完了のジョブがなくなったら終了')
+    
+    # importコマンド
+    parser_import = subparsers.add_parser('import', help='カタログ（CSV/TSV）からISBNを検証・重複除去して取り込み')
+    parser_import.add_argument('file', help='CSV/TSVファイル（"-"で標準入力）')
+    parser_import.add_argument('--column', default=None,
+                               help='ISBN列の列名または列番号（1始まり、省略時は列名に "isbn" を含む列）')
+    parser_import.add_argument('--delimiter', default=None, help='区切り文字（省略時は拡張子・1行目から判定）')
+    parser_import.add_argument('--output', default=None,
+                               help='取得が必要なISBNの出力先（1行1件、省略時は標準出力）')
+    parser_import.add_argument('--invalid', default=None,
+                               help='無効な行の出力先（CSV: 行番号・値・エラー、"-"は標準出力（--output 指定時のみ））')
+    parser_import.add_argument('--enqueue', choices=job_queue.KINDS, default=None,
+                               help='取得が必要なISBNをジョブとして登録（worker で処理）')
+    parser_import.add_argument('--priority', type=int, default=0, help='--enqueue で登録するジョブの優先度')
+    
+    # statusコマンド
+    parser_status = subparsers.add_parser('status', help='ISBN × 工程の進捗表示')
+    status_target = parser_status.add_mutually_exclusive_group()
+    status_target.add_argument('--isbn', help='ISBN-13（省略時は記録済みの全件）')
+    status_target.add_argument('--isbn-file', help='ISBNリストファイル（1行1件、"-"で標準入力）')
+    
+    # cacheコマンド
+    parser_cache = subparsers.add_parser('cache', help='書籍情報キャッシュ管理')
+    cache_subparsers = parser_cache.add_subparsers(dest='cache_command', required=True)
+    cache_subparsers.add_parser('stats', help='キャッシュの統計表示')
+    cache_subparsers.add_parser('gc', help='期限切れエントリの削除')
+    parser_migrate = cache_subparsers.add_parser('migrate', help='旧JSONキャッシュの取り込み')
+    parser_migrate.add_argument('--delete-json', action='store_true', help='取り込み後にJSONファイルを削除')
+    
+    return parser
+
+
+def main():
+    """メイン関数"""
+    config = load_config()
+    
+    # 引数解析（--help・引数エラーはロガー初期化前に終了）
+    parser = build_parser(config)
     args = parser.parse_args()
-    print(f"コマンド: {args.command}")  # デバッグ
     
-    # コマンド実行
-    if args.command == 'fetch':
-        cmd_fetch(args, logger)
-    elif args.command == 'post':
-        cmd_post(args, logger)
-    else:
+    if args.command is None:
         parser.print_help()
         sys.exit(1)
+    
+    # ロガー初期化
+    logger = setup_logger(**config.get('logging', {}))
+    logger.info(f"プログラム起動: {args.command}")
+    
+    apply_config(config)
+    if args.command in FETCH_COMMANDS:
+        apply_fetch_config(config)
+    
+    if args.profile:
+        tracing.enable()
+        if args.cprofile:
+            tracing.start_profile()
+    if args.command in METRIC_COMMANDS:
+        metrics.start(args.command)
+    
+    # コマンド実行
+    try:
+        with tracing.span(f"cmd_{args.command}", 'cli'):
+            if args.command == 'fetch':
+                cmd_fetch(args, logger)
+            elif args.command == 'post':
+                cmd_post(args, logger, config)
+            elif args.command == 'reparse':
+                cmd_reparse(args, logger)
+            elif args.command == 'render':
+                cmd_render(args, logger)
+            elif args.command == 'enqueue':
+                cmd_enqueue(args, logger)
+            elif args.command == 'worker':
+                cmd_worker(args, logger, config)
+            elif args.command == 'import':
+                cmd_import(args, logger)
+            elif args.command == 'status':
+                cmd_status(args, logger)
+            elif args.command == 'cache':
+                cmd_cache(args, logger)
+    finally:
+        metrics.stop()
+        if args.profile:
+            write_profile(logger, cprofile=args.cprofile)
+        log_handlers.stop()
 
 
 if __name__ == '__main__':
-    print("スクリプト実行開始")  # デバッグ
-    main()
-    print("スクリプト実行終了")  # デバッグ
\ No newline at end of file
+    main()
\ No newline at end of file
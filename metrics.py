@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+metrics.py - メトリクス集計モジュール
+API呼び出し・キャッシュヒット率・HTTP応答時間・収集元ごとのレビュー件数・受信バイト数・エラーを
+ラベル（ホスト・収集元・工程）付きのカウンター／ヒストグラムで集計し、
+Prometheus のテキスト形式で保存する（node_exporter の textfile collector で収集）
+
+保存は実行終了時と、長時間の一括処理中は一定間隔ごと（config.json の metrics）
+カウンターは実行ごとに0から始まる（Prometheus の rate() はリセットとして扱う）
+"""
+
+import os
+import time
+import threading
+
+
+METRICS_PATH = "data/metrics/bookpost_{command}.prom"   # {command} はコマンド名（コマンドごとに別ファイル）
+WRITE_INTERVAL = 60      # 実行中の保存間隔（秒、0で終了時のみ）
+
+# 応答時間・工程時間のバケット（秒）
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = []
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """単調増加のカウンター（ラベルの組ごとに集計、スレッドセーフ）"""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """現在値（最終実行時刻など）"""
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = value
+
+
+class Histogram:
+    """値の分布（応答時間など、ラベルの組ごとに集計、スレッドセーフ）"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}   # ラベル → [バケットごとの件数, 合計, 件数]
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with _lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        for key, (counts, total, count) in sorted(self.values.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                le = ('le', _format_value(float(bound)))
+                yield f"{self.name}_bucket{_format_labels(self.labels, key, le)} {bucket_count}"
+            yield f"{self.name}_bucket{_format_labels(self.labels, key, ('le', '+Inf'))} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {count}"
+
+
+# --- メトリクス定義 ---------------------------------------------------------
+
+HTTP_REQUESTS = Counter(
+    'bookpost_http_requests_total', 'HTTPリクエスト数（再試行を含む）', ('host', 'code'))
+HTTP_DURATION = Histogram(
+    'bookpost_http_request_duration_seconds', 'HTTP応答時間（ヘッダー受信まで）', ('host',))
+HTTP_BYTES = Counter(
+    'bookpost_http_response_bytes_total', '受信バイト数（本文）', ('host',))
+HTTP_ERRORS = Counter(
+    'bookpost_http_errors_total', '通信エラー数（再試行後の失敗、例外の種類別）', ('host', 'type'))
+BOOK_API_CALLS = Counter(
+    'bookpost_book_api_calls_total', 'Google Books API呼び出し数', ('kind',))
+BOOK_CACHE = Counter(
+    'bookpost_book_cache_lookups_total', '書籍情報キャッシュの参照数（hit / miss）', ('result',))
+PAGE_CACHE = Counter(
+    'bookpost_page_cache_lookups_total', 'ページキャッシュの参照数（hit / revalidated / miss）', ('source', 'result'))
+REVIEWS_FOUND = Counter(
+    'bookpost_reviews_found_total', '収集元ごとの取得レビュー件数', ('source',))
+SOURCE_RUNS = Counter(
+    'bookpost_review_source_runs_total', '収集元の実行数（ok / timeout / cancelled / error）', ('source', 'status'))
+STAGE_RUNS = Counter(
+    'bookpost_stage_runs_total', '工程の実行数（done / skipped / failed）', ('stage', 'result'))
+STAGE_DURATION = Histogram(
+    'bookpost_stage_duration_seconds', '工程の所要時間（スキップを除く）', ('stage',))
+ERRORS = Counter(
+    'bookpost_errors_total', '工程の失敗数（例外の種類別）', ('stage', 'type'))
+RUN_STARTED = Gauge(
+    'bookpost_run_started_timestamp_seconds', '実行開始時刻（UNIX時間）', ('command',))
+LAST_WRITE = Gauge(
+    'bookpost_last_write_timestamp_seconds', 'メトリクスの最終保存時刻（UNIX時間）', ('command',))
+
+
+def configure(path=None, interval=None):
+    """
+    保存先・保存間隔の設定（config.json の metrics）
+
+    Args:
+        path: 保存先（textfile collector の収集ディレクトリ内の .prom ファイル、
+              {command} はコマンド名に置き換え）
+        interval: 実行中の保存間隔（秒、0で終了時のみ）
+    """
+    global METRICS_PATH, WRITE_INTERVAL
+    if path:
+        METRICS_PATH = path
+    if interval is not None:
+        WRITE_INTERVAL = max(0, interval)
+
+
+def metrics_path(command):
+    """コマンドの保存先（METRICS_PATH の {command} をコマンド名に置き換え）"""
+    return METRICS_PATH.replace('{command}', command)
+
+
+def render():
+    """全メトリクスを Prometheus テキスト形式で出力"""
+    lines = []
+    with _lock:
+        for metric in _registry:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+def write(path):
+    """
+    メトリクスを保存（一時ファイル経由で置き換え、収集中に途中の内容を読ませない）
+
+    Args:
+        path: 保存先（metrics_path() で決めたファイル）
+    """
+    metrics_dir = os.path.dirname(path)
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+class _Writer:
+    """実行中の定期保存と終了時の保存"""
+
+    def __init__(self, command):
+        self.command = command
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def run(self):
+        while not self.stopped.wait(WRITE_INTERVAL):
+            self.write()
+
+    def write(self):
+        LAST_WRITE.set(time.time(), command=self.command)
+        write(metrics_path(self.command))
+
+
+_writer = None
+
+
+def start(command):
+    """
+    実行開始（定期保存を開始）
+
+    Args:
+        command: コマンド名（ラベル）
+    """
+    global _writer
+    RUN_STARTED.set(time.time(), command=command)
+    _writer = _Writer(command)
+    if WRITE_INTERVAL:
+        _writer.thread = threading.Thread(target=_writer.run, name='metrics-writer', daemon=True)
+        _writer.thread.start()
+
+
+def stop():
+    """実行終了（定期保存を止めて最終値を保存）"""
+    global _writer
+    if _writer is None:
+        return
+    _writer.stopped.set()
+    if _writer.thread is not None:
+        _writer.thread.join()
+    _writer.write()
+    _writer = None
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+page_cache.py - HTMLページキャッシュモジュール
+スクレイピングで取得したページをディスクに保存し、再取得時は
+max-age以内ならキャッシュをそのまま使用、超過時は条件付きリクエスト
+（If-None-Match / If-Modified-Since）で304なら本文を再ダウンロードしない
+インデックスはSQLite、本文はファイルで保持し、合計サイズ超過時は最終アクセスが古い順に削除
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+
+import tracing
+
+
+CACHE_DIR = "data/cache/http"
+MAX_BYTES = 500 * 1024 * 1024    # キャッシュ合計サイズの上限
+
+# 収集元ごとの max-age（秒）。この期間内は再リクエストしない
+# config.json の page_cache.max_age で上書き可
+DEFAULT_MAX_AGE = {
+    'google': 24 * 3600,
+    'amazon': 7 * 24 * 3600,
+    'bing': 24 * 3600,
+    'detail': 7 * 24 * 3600,
+}
+
+_max_age = dict(DEFAULT_MAX_AGE)
+_local = threading.local()
+_evict_lock = threading.Lock()
+
+
+def configure(cache_dir=None, max_bytes=None, max_age=None):
+    """
+    キャッシュ設定の反映（config.json の page_cache）
+
+    Args:
+        cache_dir: キャッシュ保存先ディレクトリ
+        max_bytes: 合計サイズの上限（バイト）
+        max_age: 収集元名 → max-age（秒）の辞書
+    """
+    global CACHE_DIR, MAX_BYTES
+    if cache_dir:
+        CACHE_DIR = cache_dir
+    if max_bytes is not None:
+        MAX_BYTES = max_bytes
+    if max_age:
+        _max_age.update(max_age)
+
+
+def get_connection():
+    """スレッドごとのインデックスDB接続を取得（初回のみ生成・テーブル作成）"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.cache_dir == CACHE_DIR:
+        return conn
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(CACHE_DIR, "index.db"), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " key TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " encoding TEXT,"
+            " size INTEGER NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages(accessed_at)")
+
+    _local.conn = conn
+    _local.cache_dir = CACHE_DIR
+    return conn
+
+
+def _key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def _body_path(key):
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.html")
+
+
+def max_age(source):
+    """収集元の max-age（秒）を取得（未設定は0 = 毎回条件付きリクエスト）"""
+    return _max_age.get(source, 0)
+
+
+def lookup(url):
+    """
+    キャッシュエントリを取得
+
+    Returns:
+        dict | None: key / etag / last_modified / encoding / fetched_at（未登録・本文欠損はNone）
+    """
+    key = _key(url)
+    row = get_connection().execute(
+        "SELECT etag, last_modified, encoding, fetched_at FROM pages WHERE key = ?", (key,)
+    ).fetchone()
+    if row is None or not os.path.exists(_body_path(key)):
+        return None
+    return {
+        'key': key,
+        'etag': row[0],
+        'last_modified': row[1],
+        'encoding': row[2],
+        'fetched_at': row[3],
+    }
+
+
+def is_fresh(entry, source):
+    """max-age以内ならTrue（ネットワークアクセス不要）"""
+    return time.time() - entry['fetched_at'] < max_age(source)
+
+
+def conditional_headers(entry):
+    """条件付きリクエスト用ヘッダーを生成"""
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def read_body(entry):
+    """キャッシュ本文を読み込み、最終アクセス日時を更新"""
+    with open(_body_path(entry['key']), 'rb') as f:
+        content = f.read()
+    conn = get_connection()
+    with conn:
+        conn.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (time.time(), entry['key']))
+    return content
+
+
+def revalidated(entry):
+    """304受信時: 取得日時を更新（max-ageを再開）"""
+    now = time.time()
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+            (now, now, entry['key'])
+        )
+
+
+@tracing.traced('page_cache_store', 'io')
+def store(url, content, headers, encoding):
+    """
+    ページを保存（本文は一時ファイル経由で置き換え）
+
+    Args:
+        url: ページURL
+        content: 本文（bytes）
+        headers: レスポンスヘッダー
+        encoding: 文字コード
+    """
+    key = _key(url)
+    body_path = _body_path(key)
+    os.makedirs(os.path.dirname(body_path), exist_ok=True)
+
+    tmp_path = f"{body_path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, body_path)
+
+    now = time.time()
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO pages"
+            " (key, url, etag, last_modified, encoding, size, fetched_at, accessed_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, url, headers.get('ETag'), headers.get('Last-Modified'), encoding, len(content), now, now)
+        )
+
+    evict()
+
+
+def evict():
+    """合計サイズが上限を超えた場合、最終アクセスが古い順に削除"""
+    if not _evict_lock.acquire(blocking=False):
+        return  # 他スレッドで削除中
+    try:
+        conn = get_connection()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= MAX_BYTES:
+            return
+
+        removed = []
+        for key, size in conn.execute("SELECT key, size FROM pages ORDER BY accessed_at"):
+            if total <= MAX_BYTES:
+                break
+            removed.append(key)
+            total -= size
+
+        with conn:
+            conn.executemany("DELETE FROM pages WHERE key = ?", [(key,) for key in removed])
+        for key in removed:
+            try:
+                os.remove(_body_path(key))
+            except FileNotFoundError:
+                pass
+    finally:
+        _evict_lock.release()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+pipeline_state.py - パイプライン状態管理モジュール
+ISBN × 工程（書籍情報・レビュー・記事・画像・投稿）の完了日時と出力ハッシュを
+SQLiteのマニフェストに記録し、最新の工程はスキップ・中断した一括実行は途中から再開する
+
+工程の依存関係（DEPENDENCIES）は make と同様に扱い、上流工程の出力ハッシュが
+記録時から変わっていれば下流工程は再実行が必要（stale）と判定する
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+
+DB_PATH = "data/state/pipeline.db"
+
+# 工程（実行順）
+METADATA = 'metadata'
+REVIEWS = 'reviews'
+ARTICLE = 'article'
+IMAGE = 'image'
+POSTED = 'posted'
+STAGES = (METADATA, REVIEWS, ARTICLE, IMAGE, POSTED)
+
+# 工程 → 入力となる上流工程
+DEPENDENCIES = {
+    METADATA: (),
+    REVIEWS: (METADATA,),
+    ARTICLE: (REVIEWS,),
+    IMAGE: (METADATA,),
+    POSTED: (METADATA, ARTICLE, IMAGE),
+}
+
+# 工程の有効期限（秒）。期限なしの工程は上流・出力が変わらない限り最新
+# config.json の pipeline_max_age で上書き可
+DEFAULT_MAX_AGE = {
+    METADATA: 30 * 24 * 3600,
+    REVIEWS: 30 * 24 * 3600,
+}
+
+# 工程の状態
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# 判定結果
+FRESH = 'fresh'        # 最新（スキップ可）
+STALE = 'stale'        # 上流・出力の変更、期限切れ（再実行が必要）
+MISSING = 'missing'    # 未実行・失敗・中断
+
+_max_age = dict(DEFAULT_MAX_AGE)
+_local = threading.local()
+
+
+def configure(db_path=None, max_age=None):
+    """
+    状態管理の設定反映（config.json の pipeline_state / pipeline_max_age）
+
+    Args:
+        db_path: SQLiteファイルパス
+        max_age: 工程名 → 有効期限（秒）の辞書
+    """
+    global DB_PATH
+    if db_path:
+        DB_PATH = db_path
+    if max_age:
+        _max_age.update(max_age)
+
+
+def get_connection():
+    """スレッドごとのSQLite接続を取得（初回のみ生成・テーブル作成）"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.db_path == DB_PATH:
+        return conn
+
+    db_dir = os.path.dirname(DB_PATH)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS stages ("
+            " isbn TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " input_hash TEXT,"
+            " output_hash TEXT,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " error TEXT,"
+            " PRIMARY KEY (isbn, stage))"
+        )
+        # 投稿済みの記事（再投稿時は同じ記事を更新、画像が同じならメディアを再利用）
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS posts ("
+            " isbn TEXT PRIMARY KEY,"
+            " post_id INTEGER NOT NULL,"
+            " media_id INTEGER,"
+            " image_hash TEXT,"
+            " link TEXT,"
+            " content_hash TEXT,"
+            " posted_at REAL NOT NULL)"
+        )
+        # アップロード済みの画像（記事の投稿前に記録し、投稿に失敗しても次回は再アップロードしない）
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS media ("
+            " isbn TEXT PRIMARY KEY,"
+            " media_id INTEGER NOT NULL,"
+            " image_hash TEXT NOT NULL,"
+            " uploaded_at REAL NOT NULL)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(posts)")}
+        if 'content_hash' not in columns:
+            conn.execute("ALTER TABLE posts ADD COLUMN content_hash TEXT")
+
+    _local.conn = conn
+    _local.db_path = DB_PATH
+    return conn
+
+
+def file_hash(path):
+    """ファイル内容のSHA-256（存在しない場合はNone）"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def data_hash(data):
+    """JSON化できるデータのSHA-256（キー順に正規化）"""
+    encoded = json.dumps(data, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _rows(isbn):
+    rows = get_connection().execute(
+        "SELECT stage, status, input_hash, output_hash, started_at, finished_at, error"
+        " FROM stages WHERE isbn = ?", (isbn,)
+    ).fetchall()
+    return {
+        row[0]: {
+            'status': row[1],
+            'input_hash': row[2],
+            'output_hash': row[3],
+            'started_at': row[4],
+            'finished_at': row[5],
+            'error': row[6],
+        }
+        for row in rows
+    }
+
+
+def _input_hash(rows, stage):
+    """上流工程の出力ハッシュを連結したハッシュ（上流が未完了ならNone）"""
+    parts = []
+    for dependency in DEPENDENCIES[stage]:
+        row = rows.get(dependency)
+        if row is None or row['status'] != DONE:
+            return None
+        parts.append(f"{dependency}:{row['output_hash']}")
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _check(rows, stage, output_path=None):
+    row = rows.get(stage)
+    if row is None or row['status'] != DONE:
+        return MISSING
+    input_hash = _input_hash(rows, stage)
+    # 上流工程が未完了、または上流の出力が記録時から変わった場合
+    if DEPENDENCIES[stage] and input_hash is None:
+        return STALE
+    if row['input_hash'] != input_hash:
+        return STALE
+    max_age = _max_age.get(stage)
+    if max_age and time.time() - row['finished_at'] >= max_age:
+        return STALE
+    # 出力ファイルが削除・手動編集された場合
+    if output_path and file_hash(output_path) != row['output_hash']:
+        return STALE
+    return FRESH
+
+
+def check(isbn, stage, output_path=None):
+    """
+    工程の状態を判定
+
+    Args:
+        isbn: ISBN-13
+        stage: 工程名
+        output_path: 出力ファイル（指定時は内容が記録時と同じかも確認）
+
+    Returns:
+        str: FRESH / STALE / MISSING
+    """
+    return _check(_rows(isbn), stage, output_path)
+
+
+def is_fresh(isbn, stage, output_path=None):
+    """工程が最新ならTrue（スキップ可）"""
+    return check(isbn, stage, output_path) == FRESH
+
+
+def mark_running(isbn, stage):
+    """工程の開始を記録（完了前に中断した場合は次回再実行）"""
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT INTO stages (isbn, stage, status, started_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (isbn, stage) DO UPDATE SET status = excluded.status,"
+            " started_at = excluded.started_at, error = NULL",
+            (isbn, stage, RUNNING, time.time())
+        )
+
+
+def mark_done(isbn, stage, output_hash):
+    """
+    工程の完了を記録
+
+    Args:
+        isbn: ISBN-13
+        stage: 工程名
+        output_hash: 出力のハッシュ（file_hash / data_hash）
+    """
+    conn = get_connection()
+    with conn:
+        input_hash = _input_hash(_rows(isbn), stage)
+        now = time.time()
+        conn.execute(
+            "INSERT INTO stages (isbn, stage, status, input_hash, output_hash, started_at, finished_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (isbn, stage) DO UPDATE SET status = excluded.status,"
+            " input_hash = excluded.input_hash, output_hash = excluded.output_hash,"
+            " started_at = COALESCE(stages.started_at, excluded.started_at),"
+            " finished_at = excluded.finished_at, error = NULL",
+            (isbn, stage, DONE, input_hash, output_hash, now, now)
+        )
+
+
+def mark_failed(isbn, stage, error):
+    """工程の失敗を記録"""
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT INTO stages (isbn, stage, status, finished_at, error) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (isbn, stage) DO UPDATE SET status = excluded.status,"
+            " finished_at = excluded.finished_at, error = excluded.error",
+            (isbn, stage, FAILED, time.time(), str(error))
+        )
+
+
+def observe(isbn, stage, path):
+    """
+    手作業の工程（記事・画像）の出力ファイルを確認し、内容が変わっていれば完了として記録
+
+    Returns:
+        bool: 出力ファイルが存在する場合True
+    """
+    digest = file_hash(path)
+    if digest is None:
+        return False
+    row = _rows(isbn).get(stage)
+    if row is None or row['status'] != DONE or row['output_hash'] != digest:
+        mark_done(isbn, stage, digest)
+    return True
+
+
+def record_post(isbn, post_id, media_id, image_hash, link, content_hash=None):
+    """投稿した記事を記録（content_hash: 投稿データのハッシュ、テンプレート変更の検出用）"""
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO posts (isbn, post_id, media_id, image_hash, link, content_hash, posted_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (isbn, post_id, media_id, image_hash, link, content_hash, time.time())
+        )
+
+
+def clear_post(isbn):
+    """投稿済みの記事の記録を削除（WordPress 側で削除された記事は次回新規に投稿する）"""
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM posts WHERE isbn = ?", (isbn,))
+
+
+def record_media(isbn, media_id, image_hash):
+    """アップロードした画像を記録（image_hash: 元画像のハッシュ）"""
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO media (isbn, media_id, image_hash, uploaded_at) VALUES (?, ?, ?, ?)",
+            (isbn, media_id, image_hash, time.time())
+        )
+
+
+def get_media(isbn, image_hash):
+    """
+    同じ画像のアップロード済みメディアIDを取得（記録がなければ投稿済みの記事の画像を参照）
+
+    Returns:
+        int | None: メディアID（未アップロード・画像が変わっていればNone）
+    """
+    conn = get_connection()
+    for table in ('media', 'posts'):
+        row = conn.execute(
+            f"SELECT media_id FROM {table} WHERE isbn = ? AND image_hash = ? AND media_id IS NOT NULL",
+            (isbn, image_hash)
+        ).fetchone()
+        if row is not None:
+            return row[0]
+    return None
+
+
+def get_post(isbn):
+    """
+    投稿済みの記事を取得
+
+    Returns:
+        dict: {"post_id", "media_id", "image_hash", "link", "content_hash", "posted_at"}（未投稿ならNone）
+    """
+    row = get_connection().execute(
+        "SELECT post_id, media_id, image_hash, link, content_hash, posted_at FROM posts WHERE isbn = ?", (isbn,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {
+        'post_id': row[0],
+        'media_id': row[1],
+        'image_hash': row[2],
+        'link': row[3],
+        'content_hash': row[4],
+        'posted_at': row[5],
+    }
+
+
+def status(isbn, output_paths=None):
+    """
+    全工程の状態を取得
+
+    Args:
+        isbn: ISBN-13
+        output_paths: 工程名 → 出力ファイルパス（内容確認する工程のみ）
+
+    Returns:
+        dict: 工程名 → {"state": FRESH / STALE / MISSING, "finished_at", "error"}
+    """
+    output_paths = output_paths or {}
+    rows = _rows(isbn)
+    result = {}
+    for stage in STAGES:
+        row = rows.get(stage) or {}
+        result[stage] = {
+            'state': _check(rows, stage, output_paths.get(stage)),
+            'finished_at': row.get('finished_at'),
+            'error': row.get('error'),
+        }
+    return result
+
+
+def list_isbns():
+    """マニフェストに記録されているISBN一覧"""
+    rows = get_connection().execute(
+        "SELECT DISTINCT isbn FROM stages ORDER BY isbn"
+    ).fetchall()
+    return [row[0] for row in rows]
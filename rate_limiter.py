@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+rate_limiter.py - ホスト別レート制限モジュール
+ホストごとのトークンバケットでリクエスト間隔を制御（プロセス共通）
+429/503 で減速し、成功が続くと設定値まで徐々に回復する
+"""
+
+import threading
+import time
+
+
+# ホスト別の既定値（rps: 1秒あたりのリクエスト数, burst: 連続で許可する回数）
+# config.json の rate_limits で上書き可（"default" は未登録ホスト用）
+DEFAULT_RATE_LIMITS = {
+    'default': {'rps': 2.0, 'burst': 2},
+    'www.googleapis.com': {'rps': 5.0, 'burst': 10},
+    'www.google.com': {'rps': 0.5, 'burst': 1},
+    'www.amazon.co.jp': {'rps': 1.0, 'burst': 1},
+    'www.bing.com': {'rps': 1.0, 'burst': 1},
+}
+
+# 減速・回復の調整値
+BACKOFF_FACTOR = 0.5      # 429/503 受信時にレートを何倍にするか
+RECOVERY_STEP = 0.1       # 成功1回ごとに設定レートの何割ずつ戻すか
+MIN_RATE_RATIO = 0.05     # 減速の下限（設定レートに対する比率）
+MAX_RETRY_AFTER = 300     # Retry-After を尊重する上限（秒）
+
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+class TokenBucket:
+    """1ホスト分のトークンバケット（スレッドセーフ）"""
+
+    def __init__(self, rps, burst):
+        self.max_rate = float(rps)
+        self.rate = float(rps)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """トークンを1つ取得（不足している場合は補充まで待機）"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            # 待機はロック外で行い、他スレッドの状態更新を妨げない
+            time.sleep(wait)
+
+    def on_throttled(self, retry_after=None):
+        """429/503 受信時: レートを下げ、Retry-After の間は停止"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.max_rate * MIN_RATE_RATIO, self.rate * BACKOFF_FACTOR)
+            self.tokens = 0.0
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + min(retry_after, MAX_RETRY_AFTER))
+
+    def on_success(self):
+        """成功時: 設定レートまで段階的に回復"""
+        if self.rate >= self.max_rate:
+            return
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_STEP)
+
+
+_limits = dict(DEFAULT_RATE_LIMITS)
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def configure(rate_limits):
+    """
+    ホスト別レート設定の反映（config.json の rate_limits）
+
+    Args:
+        rate_limits: ホスト名 → {"rps": float, "burst": int} の辞書
+    """
+    global _limits
+    with _buckets_lock:
+        limits = dict(DEFAULT_RATE_LIMITS)
+        for host, setting in (rate_limits or {}).items():
+            limits[host] = {**limits.get(host, limits['default']), **setting}
+        _limits = limits
+        _buckets.clear()
+
+
+def get_bucket(host):
+    """ホストに対応するトークンバケットを取得（初回のみ生成）"""
+    bucket = _buckets.get(host)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.get(host)
+            if bucket is None:
+                setting = _limits.get(host, _limits['default'])
+                bucket = TokenBucket(setting['rps'], setting['burst'])
+                _buckets[host] = bucket
+    return bucket
+
+
+def acquire(host):
+    """ホストへのリクエスト許可を待つ"""
+    get_bucket(host).acquire()
+
+
+def limit_rate(host, rps):
+    """
+    ホストのレート上限を引き下げ（robots.txt の Crawl-delay など、設定値より高くはしない）
+
+    Args:
+        host: ホスト名
+        rps: 1秒あたりのリクエスト数の上限
+    """
+    bucket = get_bucket(host)
+    with bucket.lock:
+        bucket.max_rate = min(bucket.max_rate, rps)
+        bucket.rate = min(bucket.rate, bucket.max_rate)
+
+
+def record_response(host, status_code, retry_after=None):
+    """
+    レスポンス結果をレート制御に反映
+
+    Args:
+        host: ホスト名
+        status_code: HTTPステータスコード
+        retry_after: Retry-After ヘッダーの値（秒数形式のみ対応）
+    """
+    bucket = get_bucket(host)
+    if status_code in THROTTLE_STATUS_CODES:
+        try:
+            seconds = float(retry_after) if retry_after else None
+        except ValueError:
+            seconds = None  # HTTP日付形式は減速のみで対応
+        bucket.on_throttled(seconds)
+    elif status_code < 400:
+        bucket.on_success()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+renderer.py - 記事レンダリングモジュール
+Markdown記事（data/outputs/article_{isbn}.md）をHTMLに変換し、書籍情報（書名・著者・表紙）の
+ボックスと合わせてWordPress投稿用データ（タイトル・本文・タグ）を生成する
+
+結果は data/rendered/post_{isbn}.json に保存し、記事・書籍情報・テンプレートのハッシュが
+前回と同じなら再変換しない（テンプレート変更時は全件を再変換）
+"""
+
+import os
+import html
+import json
+import hashlib
+import threading
+
+
+RENDER_DIR = "data/rendered"
+TEMPLATE_PATH = None       # 独自テンプレート（config.json の render.template、省略時は DEFAULT_TEMPLATE）
+MARKDOWN_EXTENSIONS = ['extra', 'sane_lists']
+
+# 本文テンプレート（{book_box}: 書籍情報、{article}: 記事本文のHTML、書籍情報の各項目も使用可）
+DEFAULT_TEMPLATE = """{book_box}
+{article}
+"""
+
+BOOK_BOX_TEMPLATE = """<div class="bookpost-book">
+{cover}<dl class="bookpost-book-info">
+{rows}</dl>
+</div>"""
+
+# 書籍情報ボックスの項目（値が空の項目は出力しない）
+BOOK_BOX_ROWS = (
+    ('書名', 'title'),
+    ('著者', 'authors'),
+    ('出版社', 'publisher'),
+    ('発売日', 'published_date'),
+    ('ISBN', 'isbn'),
+)
+
+COVER_TEMPLATE = '<img class="bookpost-cover" src="{url}" alt="{title}" loading="lazy">\n'
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def configure(render_dir=None, template=None):
+    """
+    レンダリングの設定反映（config.json の render）
+
+    Args:
+        render_dir: 変換結果の保存先
+        template: 本文テンプレートのファイルパス
+    """
+    global RENDER_DIR, TEMPLATE_PATH, _template
+    if render_dir:
+        RENDER_DIR = render_dir
+    if template:
+        TEMPLATE_PATH = template
+        _template = None
+
+
+def load_template():
+    """本文テンプレートを取得（独自テンプレートは初回のみ読み込み）"""
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                if TEMPLATE_PATH:
+                    with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f:
+                        _template = f.read()
+                else:
+                    _template = DEFAULT_TEMPLATE
+    return _template
+
+
+def output_path(isbn, render_dir=None):
+    """変換結果のパス"""
+    return os.path.join(render_dir or RENDER_DIR, f"post_{isbn}.json")
+
+
+def render_key(book_data, article_content, template=None):
+    """変換結果のキャッシュキー（記事・書籍情報・テンプレートのハッシュ）"""
+    digest = hashlib.sha256()
+    for part in (
+        article_content,
+        json.dumps(book_data, ensure_ascii=False, sort_keys=True),
+        template if template is not None else load_template(),
+        BOOK_BOX_TEMPLATE,
+        repr(BOOK_BOX_ROWS),
+        COVER_TEMPLATE,
+        ','.join(MARKDOWN_EXTENSIONS),
+    ):
+        encoded = part.encode('utf-8')
+        digest.update(len(encoded).to_bytes(8, 'big'))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+def load_cached(isbn, key, render_dir=None):
+    """保存済みの変換結果（キーが一致しない・未変換ならNone）"""
+    try:
+        with open(output_path(isbn, render_dir), 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if cached.get('key') != key:
+        return None
+    return cached['payload']
+
+
+def _cover_url(book_data):
+    url = book_data.get('image_url') or ''
+    # Google Books の表紙URLは http のため https に統一（混在コンテンツを避ける）
+    if url.startswith('http://'):
+        url = 'https://' + url[len('http://'):]
+    return url
+
+
+def render(book_data, article_content, template=None):
+    """
+    記事と書籍情報から投稿用データを生成
+
+    Args:
+        book_data: 書籍情報
+        article_content: Markdown記事
+        template: 本文テンプレート（省略時は load_template()）
+
+    Returns:
+        dict: 投稿データ（title, content, status, categories, tags（著者名）, featured_media）
+    """
+    import markdown
+
+    template = template if template is not None else load_template()
+    fields = {
+        'isbn': html.escape(book_data.get('isbn', '')),
+        'title': html.escape(book_data.get('title', '')),
+        'authors': html.escape('、'.join(book_data.get('authors', []))),
+        'publisher': html.escape(book_data.get('publisher', '')),
+        'published_date': html.escape(book_data.get('published_date', '')),
+    }
+    cover_url = _cover_url(book_data)
+    cover = COVER_TEMPLATE.format(url=html.escape(cover_url), title=fields['title']) if cover_url else ''
+    rows = ''.join(f"<dt>{label}</dt><dd>{fields[name]}</dd>\n" for label, name in BOOK_BOX_ROWS if fields[name])
+    book_box = BOOK_BOX_TEMPLATE.format(cover=cover, rows=rows)
+    article = markdown.markdown(article_content, extensions=MARKDOWN_EXTENSIONS)
+
+    return {
+        'title': book_data.get('title', ''),
+        'content': template.format(book_box=book_box, article=article, **fields).strip() + '\n',
+        'status': 'draft',
+        'categories': [],
+        'tags': list(book_data.get('authors', [])),
+        'featured_media': None,
+    }
+
+
+def render_cached(isbn, book_data, article_content, render_dir=None, template=None, force=False):
+    """
+    投稿用データを取得（記事・書籍情報・テンプレートが前回と同じなら保存済みの結果）
+
+    プロセスプールから呼び出すため、設定は引数でも受け取る
+
+    Returns:
+        tuple: (投稿データ, 変換した場合True)
+    """
+    template = template if template is not None else load_template()
+    key = render_key(book_data, article_content, template)
+    if not force:
+        payload = load_cached(isbn, key, render_dir)
+        if payload is not None:
+            return payload, False
+
+    payload = render(book_data, article_content, template)
+    path = output_path(isbn, render_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'key': key, 'payload': payload}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return payload, True
+
+
+def render_file(isbn, book_data, article_file, render_dir, template, force=False):
+    """
+    記事ファイルを変換（一括レンダリングのプロセスプール用）
+
+    Returns:
+        tuple: (ISBN, 変換した場合True)
+    """
+    with open(article_file, 'r', encoding='utf-8') as f:
+        article_content = f.read()
+    _, rendered = render_cached(isbn, book_data, article_content, render_dir, template, force)
+    return isbn, rendered
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+robots_cache.py - robots.txt キャッシュモジュール
+レビュー詳細取得時にホストごとの robots.txt を1回だけ取得して判定を使い回す
+Crawl-delay が指定されている場合はホストのレート制限に反映する
+"""
+
+import time
+import threading
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+import http_client
+import rate_limiter
+
+
+# robots.txt の判定に使うエージェント名（該当なしは "*"）
+# robots.txt・レビュー詳細の取得時に送る User-Agent（http_client.CRAWLER_HEADERS）と揃える
+USER_AGENT = http_client.CRAWLER_AGENT
+ROBOTS_TTL = 24 * 3600     # 再取得までの期間（秒）
+ROBOTS_TIMEOUT = 5
+
+_robots = {}               # "スキーム://ホスト[:ポート]" → (RobotFileParser, 取得日時)
+_robots_lock = threading.Lock()
+_host_locks = {}
+
+
+def _host_lock(host):
+    with _robots_lock:
+        return _host_locks.setdefault(host, threading.Lock())
+
+
+def _fetch(scheme, netloc, host, logger=None):
+    """robots.txt を取得して解析（取得失敗時の扱いはRFC 9309準拠）"""
+    parser = RobotFileParser()
+    robots_url = f"{scheme}://{netloc}/robots.txt"
+    try:
+        response = http_client.get(robots_url, headers=http_client.CRAWLER_HEADERS, timeout=ROBOTS_TIMEOUT)
+    except requests.exceptions.RequestException as e:
+        # 到達できない場合は許可しない
+        if logger:
+            logger.warning(f"robots.txt取得失敗: {robots_url}: {e}")
+        parser.disallow_all = True
+        return parser
+
+    if response.status_code in (401, 403) or response.status_code >= 500:
+        parser.disallow_all = True
+    elif response.status_code >= 400:
+        parser.allow_all = True
+    else:
+        parser.parse(response.text.splitlines())
+
+        # Crawl-delay はレート制限に反映
+        delay = parser.crawl_delay(USER_AGENT)
+        if delay:
+            rate_limiter.limit_rate(host, 1 / float(delay))
+    return parser
+
+
+def get_parser(url, logger=None):
+    """URLのホストの robots.txt 判定器を取得（ホストごとに1回だけ取得）"""
+    parsed = urlparse(url)
+    # robots.txt はスキーム・ホスト・ポートごと（RFC 9309）
+    key = f"{parsed.scheme}://{parsed.netloc}"
+
+    cached = _robots.get(key)
+    if cached and time.time() - cached[1] < ROBOTS_TTL:
+        return cached[0]
+
+    # 同一ホストの同時取得は1回にまとめる
+    with _host_lock(key):
+        cached = _robots.get(key)
+        if cached and time.time() - cached[1] < ROBOTS_TTL:
+            return cached[0]
+        parser = _fetch(parsed.scheme, parsed.netloc, parsed.hostname, logger)
+        _robots[key] = (parser, time.time())
+        return parser
+
+
+def allowed(url, logger=None):
+    """robots.txt でクロールが許可されているか"""
+    return get_parser(url, logger).can_fetch(USER_AGENT, url)
@@ -1,162 +1,673 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """
-scraper.py - レビュー収集モジュール（試作版）
-Bing検索からレビュー要約を収集
+scraper.py - レビュー収集モジュール
+収集元（Google検索・Amazon・Bing）をレジストリに登録し、並列に実行して
+レビュー要約テキストを生成する
+
+収集元の追加は ReviewSource（取得処理 + 抽出処理）を register_source で登録するだけ
 """
 
 import os
 import time
-import requests
-from bs4 import BeautifulSoup
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlparse
+
+import extractors
+import http_client
+import log_handlers
+import metrics
+import robots_cache
+import snapshot_store
+import tracing
+
+
+# 収集元ごとの締め切り（秒）。config.json の review_deadlines で上書き可
+REVIEW_SOURCE_DEADLINES = {
+    'Google': 20,
+    'Amazon': 30,
+    'Bing': 20,
+}
+DEFAULT_REVIEW_DEADLINE = 30
+
+# 既定で有効な収集元（config.json の review_sources で変更可）
+ENABLED_SOURCES = ['Google', 'Amazon']
+
+# この件数が集まったら残りの収集元を打ち切る（0で全収集元の完了を待つ）
+REVIEW_TARGET = 15
 
+# 収集元のエンドポイント（config.json の endpoints で上書き可、ベンチマーク時はスタブサーバー）
+GOOGLE_SEARCH_URL = "https://www.google.com/search"
+AMAZON_URL = extractors.AMAZON_BASE_URL
+BING_SEARCH_URL = "https://www.bing.com/search"
 
-def scrape_reviews(isbn_or_title, logger):
+# レビュー要約の保存先
+REVIEW_DIR = "data/reviews"
+
+# レビュー詳細（検索結果URLの本文）取得。config.json の review_detail で上書き可
+DETAIL_MAX_PAGES = 5      # 1冊あたりの最大取得ページ数（0で取得しない）
+DETAIL_DEADLINE = 30      # 1冊あたりの詳細取得全体の締め切り（秒）
+DETAIL_WORKERS = 4        # 同時取得数
+DETAIL_PER_HOST = 1       # 同一ホストへの同時接続数
+
+# 収集元の実行結果
+OK = 'ok'
+TIMEOUT = 'timeout'
+CANCELLED = 'cancelled'
+ERROR = 'error'
+
+
+class ReviewSource:
     """
-    Bing検索から書評・レビューを収集し、要約テキストを生成
-    
+    レビュー収集元の定義
+
     Args:
-        isbn_or_title: ISBNまたは書籍タイトル
+        name: 収集元名（結果の source・設定のキー）
+        label: レビューファイルに記載する出典名
+        host: アクセス先ホスト
+        priority: 優先度（小さいほど先に実行・結果の先頭に記載）
+        fetch: fetch(context, logger) → ページ種別 → http_client.Page の辞書
+        extract: extract(pages, logger) → 結果リスト（ネットワークアクセスなし）
+    """
+
+    def __init__(self, name, label, host, priority, fetch, extract):
+        self.name = name
+        self.label = label
+        self.host = host
+        self.priority = priority
+        self.fetch = fetch
+        self.extract = extract
+
+
+SOURCES = {}
+
+
+def register_source(source):
+    """収集元をレジストリに登録（同名は置き換え）"""
+    SOURCES[source.name] = source
+
+
+def configure(enabled=None, target=None, deadlines=None):
+    """
+    収集設定の反映（config.json の review_sources / review_target / review_deadlines）
+
+    Args:
+        enabled: 有効にする収集元名のリスト
+        target: 打ち切り件数
+        deadlines: 収集元名 → 締め切り秒数
+    """
+    global ENABLED_SOURCES, REVIEW_TARGET
+    if enabled is not None:
+        ENABLED_SOURCES = list(enabled)
+    if target is not None:
+        REVIEW_TARGET = target
+    if deadlines:
+        REVIEW_SOURCE_DEADLINES.update(deadlines)
+
+
+def configure_detail(max_pages=None, deadline=None, workers=None, per_host=None):
+    """
+    レビュー詳細取得の設定反映（config.json の review_detail）
+
+    Args:
+        max_pages: 1冊あたりの最大取得ページ数（0で取得しない）
+        deadline: 詳細取得全体の締め切り（秒）
+        workers: 同時取得数
+        per_host: 同一ホストへの同時接続数
+    """
+    global DETAIL_MAX_PAGES, DETAIL_DEADLINE, DETAIL_WORKERS, DETAIL_PER_HOST
+    if max_pages is not None:
+        DETAIL_MAX_PAGES = max_pages
+    if deadline is not None:
+        DETAIL_DEADLINE = deadline
+    if workers is not None:
+        DETAIL_WORKERS = max(1, workers)
+    if per_host is not None:
+        DETAIL_PER_HOST = max(1, per_host)
+
+
+def configure_endpoints(google_search=None, amazon=None, bing=None):
+    """
+    収集元のエンドポイント設定（config.json の endpoints）
+
+    Args:
+        google_search: Google検索URL
+        amazon: AmazonのベースURL（検索・商品ページ共通）
+        bing: Bing検索URL
+    """
+    global GOOGLE_SEARCH_URL, AMAZON_URL, BING_SEARCH_URL
+    if google_search:
+        GOOGLE_SEARCH_URL = google_search
+    if amazon:
+        AMAZON_URL = amazon.rstrip('/')
+        extractors.AMAZON_BASE_URL = AMAZON_URL
+    if bing:
+        BING_SEARCH_URL = bing
+
+
+def enabled_sources():
+    """有効な収集元を優先度順に取得"""
+    sources = [SOURCES[name] for name in ENABLED_SOURCES if name in SOURCES]
+    return sorted(sources, key=lambda source: source.priority)
+
+
+# --- 収集元: Google検索 ----------------------------------------------------
+
+def fetch_google(context, logger):
+    """Google検索結果ページを取得"""
+    logger.info(f"Google検索: {context['search_term']}")
+
+    search_query = f"{context['search_term']} 書評 レビュー"
+    # Google検索URL（User-Agentを設定しないとブロックされる）
+    search_url = f"{GOOGLE_SEARCH_URL}?q={search_query}&hl=ja"
+
+    page = http_client.fetch_page(
+        search_url, 'google', logger, stop_when=extractors.google_result_counter()
+    )
+    return {snapshot_store.GOOGLE: page}
+
+
+def extract_google(pages, logger):
+    page = pages.get(snapshot_store.GOOGLE)
+    if page is None:
+        return []
+    return extractors.extract_google_results(page.content, logger, page.encoding)
+
+
+# --- 収集元: Amazon -------------------------------------------------------
+
+def fetch_amazon(context, logger):
+    """Amazon検索ページ → 最初の商品ページを取得"""
+    isbn = context['isbn']
+    logger.info(f"Amazon商品ページからレビュー取得: ISBN={isbn}")
+
+    # AmazonのISBN検索URL
+    amazon_url = f"{AMAZON_URL}/s?k={isbn}"
+
+    logger.info(f"Amazon検索: {amazon_url}")
+    pages = {}
+    pages[snapshot_store.AMAZON_SEARCH] = page = http_client.fetch_page(
+        amazon_url, 'amazon', logger, stop_when=extractors.amazon_product_link_counter()
+    )
+
+    # 最初の商品リンクを取得
+    product_url = extractors.extract_amazon_product_url(page.content, page.encoding)
+    if not product_url:
+        return pages
+
+    # 打ち切り済みなら商品ページは取得しない
+    if context['cancelled'].is_set():
+        return pages
+
+    logger.info(f"商品ページ発見: {product_url}")
+    # 商品ページにアクセス（間隔はrate_limiterで制御）
+    pages[snapshot_store.AMAZON_PRODUCT] = http_client.fetch_page(
+        product_url, 'amazon', logger, stop_when=extractors.amazon_review_counter()
+    )
+    return pages
+
+
+def extract_amazon(pages, logger):
+    page = pages.get(snapshot_store.AMAZON_PRODUCT)
+    if page is None:
+        return []
+    return extractors.extract_amazon_reviews(page.content, page.url, logger, page.encoding)
+
+
+# --- 収集元: Bing検索 -----------------------------------------------------
+
+def fetch_bing(context, logger):
+    """Bing検索結果ページを取得"""
+    search_query = f"{context['search_term']} 書評 レビュー"
+    search_url = f"{BING_SEARCH_URL}?q={search_query}"
+
+    logger.info(f"Bing検索: {search_url}")
+    page = http_client.fetch_page(
+        search_url, 'bing', logger, stop_when=extractors.bing_result_counter()
+    )
+    return {snapshot_store.BING: page}
+
+
+def extract_bing(pages, logger):
+    page = pages.get(snapshot_store.BING)
+    if page is None:
+        return []
+    results = extractors.extract_bing_results(page.content, logger, page.encoding)
+    for result in results:
+        result['source'] = 'Bing'
+    return results
+
+
+register_source(ReviewSource('Google', 'Google検索結果', 'www.google.com', 10, fetch_google, extract_google))
+register_source(ReviewSource('Amazon', 'Amazon カスタマーレビュー', 'www.amazon.co.jp', 20, fetch_amazon, extract_amazon))
+register_source(ReviewSource('Bing', 'Bing検索結果', 'www.bing.com', 30, fetch_bing, extract_bing))
+
+
+# --- スケジューラ ---------------------------------------------------------
+
+def run_source(source, context, logger):
+    """収集元1件を実行（取得ページはスナップショット保存）"""
+    with tracing.span(f"scrape_{source.name.lower()}", 'scrape', isbn=context['isbn']) as span:
+        pages = source.fetch(context, logger)
+        for kind, page in pages.items():
+            snapshot_store.save(context['isbn'], kind, page.url, page.content, page.encoding)
+        with tracing.span(f"extract_{source.name.lower()}", 'parse'):
+            results = source.extract(pages, logger)
+        span.set(reviews=len(results), bytes=sum(len(page.content) for page in pages.values()))
+        return results
+
+
+def collect_reviews(isbn, search_term, logger, sources=None, target=None):
+    """
+    収集元を並列実行してレビューを収集
+
+    各収集元は締め切り（REVIEW_SOURCE_DEADLINES）まで待ち、超過分は結果なしで続行
+    合計件数が target に達した時点で未完了の収集元は打ち切る
+
+    Args:
+        isbn: ISBN-13
+        search_term: 検索語（書籍タイトル + 著者）
         logger: ロガー
-    
+        sources: 実行する収集元（省略時は有効な収集元）
+        target: 打ち切り件数（省略時は REVIEW_TARGET、0で打ち切りなし）
+
     Returns:
-        str: 保存先ファイルパス
-    
-    Raises:
-        Exception: Bing検索失敗時
+        tuple: (収集元名 → 結果リスト（優先度順）, 収集元名 → 実行結果（OK / TIMEOUT / CANCELLED / ERROR）)
     """
-    logger.info(f"レビュー収集開始: {isbn_or_title}")
-    
-    # 保存先ディレクトリ作成
-    review_dir = "data/reviews"
-    if not os.path.exists(review_dir):
-        os.makedirs(review_dir)
-    
-    # 保存先ファイルパス
-    review_path = os.path.join(review_dir, f"review_{isbn_or_title}.txt")
-    
-    # Bing検索URL生成
-    search_query = f"{isbn_or_title} 書評 レビュー"
-    search_url = f"https://www.bing.com/search?q={search_query}"
-    
-    logger.info(f"Bing検索: {search_url}")
-    
-    # User-Agent設定（ブラウザ偽装）
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
+    if sources is None:
+        sources = enabled_sources()
+    if target is None:
+        target = REVIEW_TARGET
+
+    results = {source.name: [] for source in sources}
+    status = {}
+    if not sources:
+        return results, status
+
+    context = {
+        'isbn': isbn,
+        'search_term': search_term,
+        'cancelled': threading.Event(),
+    }
+
+    executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='review-source')
+    start_time = time.monotonic()
+    # ログのコンテキスト（ISBN・工程）をワーカースレッドに引き継ぐ
+    futures = {
+        executor.submit(contextvars.copy_context().run, run_source, source, context, logger): source
+        for source in sources
     }
-    
-    try:
-        # Bing検索実行
-        response = requests.get(search_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        # HTML解析
-        soup = BeautifulSoup(response.text, 'lxml')
-        
-        # 検索結果のリンクを抽出（試作版：簡易実装）
-        results = []
-        
-        # Bing検索結果のセレクタ（class="b_algo"）
-        search_results = soup.find_all('li', class_='b_algo', limit=10)
-        
-        logger.info(f"検索結果: {len(search_results)}件")
-        
-        for i, result in enumerate(search_results, 1):
+    pending = set(futures)
+
+    def deadline(future):
+        return REVIEW_SOURCE_DEADLINES.get(futures[future].name, DEFAULT_REVIEW_DEADLINE)
+
+    while pending:
+        # 締め切りを超過した収集元は待たない
+        elapsed = time.monotonic() - start_time
+        for future in [f for f in pending if not f.done() and deadline(f) <= elapsed]:
+            name = futures[future].name
+            logger.warning(f"{name}: 締め切り超過（{deadline(future)}秒）、他の収集元の結果で続行")
+            status[name] = TIMEOUT
+            pending.discard(future)
+        if not pending:
+            break
+
+        timeout = max(0, min(deadline(f) for f in pending) - elapsed)
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.discard(future)
+            name = futures[future].name
             try:
-                # タイトルとURL抽出
-                title_tag = result.find('h2')
-                if not title_tag:
-                    continue
-                
-                link_tag = title_tag.find('a')
-                if not link_tag:
-                    continue
-                
-                url = link_tag.get('href', '')
-                title = title_tag.get_text(strip=True)
-                
-                # スニペット（説明文）抽出
-                snippet_tag = result.find('p')
-                snippet = snippet_tag.get_text(strip=True) if snippet_tag else ''
-                
-                results.append({
-                    'number': i,
-                    'title': title,
-                    'url': url,
-                    'snippet': snippet
-                })
-                
-                logger.info(f"  [{i}] {title}")
-                
+                results[name] = future.result()
+                status[name] = OK
             except Exception as e:
-                logger.warning(f"検索結果の解析エラー: {e}")
-                continue
-        
-        # レビュー要約テキスト生成
-        if len(results) == 0:
-            logger.info("レビューがありませんでした")
-            review_text = "※ レビューが見つかりませんでした\n\n"
-            review_text += f"検索クエリ: {search_query}\n"
-            review_text += "手動でレビューを追加してください。"
-        else:
-            review_text = f"書籍レビュー要約 - {isbn_or_title}\n"
-            review_text += "="*50 + "\n\n"
-            review_text += f"検索クエリ: {search_query}\n"
-            review_text += f"収集日時: {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
-            review_text += f"検索結果件数: {len(results)}件\n\n"
-            review_text += "="*50 + "\n\n"
-            
-            for result in results:
-                review_text += f"【{result['number']}】 {result['title']}\n"
-                review_text += f"URL: {result['url']}\n"
-                review_text += f"要約: {result['snippet']}\n"
-                review_text += "-"*50 + "\n\n"
-            
-            review_text += "="*50 + "\n"
-            review_text += "※ 上記はBing検索結果のスニペットです\n"
-            review_text += "※ ChatGPT/Perplexityで記事生成時に参考にしてください\n"
-        
-        # ファイル保存
-        with open(review_path, 'w', encoding='utf-8') as f:
-            f.write(review_text)
-        
-        logger.info(f"レビューを保存しました: {review_path}")
-        
-        return review_path
-        
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Bing検索失敗: {e}")
-        raise Exception(f"Bing検索エラー: {e}")
-
-
-def scrape_review_detail(url, logger):
-    """
-    個別のレビューサイトから詳細を取得（将来拡張用）
-    
+                logger.warning(f"{name}: 収集エラー: {e}")
+                status[name] = ERROR
+
+        # 目標件数に達したら残りは打ち切り
+        collected = sum(len(r) for r in results.values())
+        if target and pending and collected >= target:
+            context['cancelled'].set()
+            for future in pending:
+                status[futures[future].name] = CANCELLED
+            logger.info(f"目標件数（{target}件）に到達、打ち切り: {', '.join(futures[f].name for f in pending)}")
+            break
+
+    # 締め切り超過・打ち切りのスレッドは待たずに切り離す（結果は破棄）
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    for name, source_status in status.items():
+        metrics.SOURCE_RUNS.inc(source=name, status=source_status)
+        metrics.REVIEWS_FOUND.inc(len(results[name]), source=name)
+
+    return results, status
+
+
+# --- レビュー詳細 ---------------------------------------------------------
+
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+
+def _host_slot(host):
+    """同一ホストへの同時接続数を制限するセマフォ"""
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(DETAIL_PER_HOST)
+        return slot
+
+
+def detail_kind(url):
+    """詳細ページのスナップショット種別"""
+    return f"{snapshot_store.DETAIL}:{url}"
+
+
+def scrape_review_detail(url, logger, isbn=None):
+    """
+    個別のレビューサイトから本文を取得
+
+    robots.txt で許可されていないURLは取得しない
+    アクセス間隔はホストごとのレート制限（rate_limiter）に従う
+
     Args:
         url: レビューサイトのURL
         logger: ロガー
-    
+        isbn: スナップショット保存先のISBN（省略時は保存しない）
+
+    Returns:
+        str: レビュー本文（取得不可・本文なしは空文字）
+
+    Raises:
+        requests.exceptions.RequestException: 通信失敗・4xx/5xx時
+    """
+    if not robots_cache.allowed(url, logger):
+        logger.info(f"robots.txtで不許可: {url}")
+        return ""
+
+    logger.info(f"詳細取得: {url}")
+    with tracing.span('scrape_review_detail', 'scrape', url=url) as span:
+        # robots.txt を確認した名前（bookpost）で取得（ブラウザ偽装しない）
+        page = http_client.fetch_page(url, 'detail', logger, crawler=True)
+        if isbn:
+            snapshot_store.save(isbn, detail_kind(url), page.url, page.content, page.encoding)
+        span.set(bytes=len(page.content))
+        return extractors.extract_main_content(page.content, page.encoding)
+
+
+def detail_targets(results, max_pages):
+    """詳細取得の対象（検索結果の外部サイトURL、重複・収集元ホストを除く）を優先度順に選択"""
+    source_hosts = {source.host for source in SOURCES.values()}
+    targets = []
+    seen = set()
+    for result in results:
+        url = result.get('url', '')
+        parsed = urlparse(url)
+        if 'rating' in result or parsed.scheme not in ('http', 'https'):
+            continue
+        if parsed.hostname in source_hosts or url in seen:
+            continue
+        seen.add(url)
+        targets.append(result)
+        if len(targets) >= max_pages:
+            break
+    return targets
+
+
+def crawl_review_details(isbn, results, logger, max_pages=None, deadline=None):
+    """
+    検索結果のレビューサイトを並列に取得し、本文を結果の "detail" に追加
+
+    全体の締め切りを超えた分は待たずに打ち切る（取得済みの本文のみ使用）
+
+    Args:
+        isbn: ISBN-13（スナップショット保存用）
+        results: 結果リスト（優先度順）
+        logger: ロガー
+        max_pages: 最大取得ページ数（省略時は DETAIL_MAX_PAGES）
+        deadline: 締め切り秒数（省略時は DETAIL_DEADLINE）
+
+    Returns:
+        int: 本文を取得できた件数
+    """
+    if max_pages is None:
+        max_pages = DETAIL_MAX_PAGES
+    if deadline is None:
+        deadline = DETAIL_DEADLINE
+
+    targets = detail_targets(results, max_pages) if max_pages > 0 else []
+    if not targets:
+        return 0
+
+    cancelled = threading.Event()
+
+    def crawl(url):
+        with _host_slot(urlparse(url).hostname):
+            # 待機中に締め切りを過ぎたものは取得しない
+            if cancelled.is_set():
+                return ""
+            return scrape_review_detail(url, logger, isbn=isbn)
+
+    executor = ThreadPoolExecutor(max_workers=min(DETAIL_WORKERS, len(targets)), thread_name_prefix='review-detail')
+    futures = {executor.submit(contextvars.copy_context().run, crawl, result['url']): result for result in targets}
+    done, pending = wait(futures, timeout=deadline)
+
+    if pending:
+        cancelled.set()
+        logger.warning(f"詳細取得: 締め切り超過（{deadline}秒）、未完了{len(pending)}件を打ち切り")
+
+    fetched = 0
+    for future in done:
+        result = futures[future]
+        try:
+            detail = future.result()
+        except Exception as e:
+            logger.warning(f"詳細取得エラー: {result['url']}: {e}")
+            continue
+        if detail:
+            result['detail'] = detail
+            fetched += 1
+
+    executor.shutdown(wait=False, cancel_futures=True)
+    logger.info(f"詳細取得: {fetched}/{len(targets)}件")
+    return fetched
+
+
+def attach_snapshot_details(results, pages):
+    """保存済みの詳細ページから本文を再抽出して結果に追加（reparse用）"""
+    details = {
+        kind[len(snapshot_store.DETAIL) + 1:]: page
+        for kind, page in pages.items()
+        if kind.startswith(f"{snapshot_store.DETAIL}:")
+    }
+    for result in results:
+        page = details.get(result.get('url'))
+        if page is None:
+            continue
+        detail = extractors.extract_main_content(page.content, page.encoding)
+        if detail:
+            result['detail'] = detail
+
+
+# --- レビューファイル生成 --------------------------------------------------
+
+def build_review_text(isbn, search_term, results, status):
+    """
+    レビュー要約テキストを生成
+
+    Args:
+        isbn: ISBN-13
+        search_term: 検索語
+        results: 収集元名 → 結果リスト（優先度順）
+        status: 収集元名 → 実行結果
+    """
+    all_results = [result for source_results in results.values() for result in source_results]
+    timed_out = [name for name, state in status.items() if state == TIMEOUT]
+
+    if len(all_results) == 0:
+        review_text = "※ レビューが見つかりませんでした\n\n"
+        review_text += f"書籍: {search_term}\n"
+        review_text += f"ISBN: {isbn}\n"
+        review_text += f"収集日時: {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
+        if timed_out:
+            review_text += f"締め切り超過: {', '.join(timed_out)}\n"
+        review_text += "\n【対処方法】\n"
+        review_text += "1. Amazon等で手動検索してレビューをコピー\n"
+        review_text += "2. このファイルに直接貼り付けて保存\n"
+        review_text += "3. ChatGPT/Perplexityで記事生成時に使用\n"
+        return review_text
+
+    counts = ', '.join(f"{name}: {len(source_results)}件" for name, source_results in results.items())
+    review_text = f"書籍レビュー要約\n"
+    review_text += "="*70 + "\n"
+    review_text += f"書籍: {search_term}\n"
+    review_text += f"ISBN: {isbn}\n"
+    review_text += f"収集日時: {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
+    review_text += f"収集件数: {len(all_results)}件（{counts}）\n"
+    details = sum(1 for result in all_results if result.get('detail'))
+    if details:
+        review_text += f"本文取得: {details}件\n"
+    review_text += "="*70 + "\n\n"
+
+    for result in all_results:
+        source = SOURCES.get(result['source'])
+        label = source.label if source else result['source']
+        review_text += f"【{result['number']}】 {result['title']}\n"
+        review_text += f"出典: {label}\n"
+        if 'rating' in result:  # カスタマーレビュー
+            review_text += f"評価: {result['rating']}\n"
+            review_text += f"内容: {result['content'][:200]}...\n"
+            review_text += f"URL: {result['url']}\n"
+        else:  # 検索結果
+            review_text += f"URL: {result['url']}\n"
+            review_text += f"要約: {result['snippet']}\n"
+            if result.get('detail'):
+                review_text += f"本文:\n{result['detail']}\n"
+
+        review_text += "-"*70 + "\n\n"
+
+    labels = [SOURCES[name].label for name, source_results in results.items() if source_results and name in SOURCES]
+    review_text += "="*70 + "\n"
+    if timed_out:
+        review_text += f"※ 締め切り超過のため取得できなかった収集元: {', '.join(timed_out)}\n"
+    review_text += f"※ 上記は{'・'.join(labels)}の要約です\n"
+    review_text += "※ ChatGPT/Perplexityで記事生成時に参考にしてください\n"
+    return review_text
+
+
+def review_file_path(isbn):
+    """レビュー要約テキストの保存先"""
+    return os.path.join(REVIEW_DIR, f"review_{isbn}.txt")
+
+
+@tracing.traced('write_review_file', 'io')
+def write_review_file(isbn, review_text, logger):
+    """レビュー要約テキストを data/reviews/review_{isbn}.txt に保存"""
+    # 保存先ディレクトリ作成
+    if not os.path.exists(REVIEW_DIR):
+        os.makedirs(REVIEW_DIR, exist_ok=True)
+        logger.info(f"ディレクトリ作成: {REVIEW_DIR}")
+
+    review_path = review_file_path(isbn)
+
+    # ファイル保存
+    with open(review_path, 'w', encoding='utf-8') as f:
+        f.write(review_text)
+
+    logger.info(f"レビュー保存: {review_path}")
+    return review_path
+
+
+def scrape_reviews(isbn_or_title, logger, search_term=None):
+    """
+    有効な収集元から書評・レビューを並列に収集し、要約テキストを生成
+
+    Args:
+        isbn_or_title: ISBNまたは書籍タイトル（ファイル名・Amazon検索に使用）
+        logger: ロガー
+        search_term: 検索語（省略時は isbn_or_title）
+
+    Returns:
+        str: 保存先ファイルパス
+    """
+    search_term = search_term or isbn_or_title
+    logger.info(f"レビュー収集開始（並列取得）: {search_term}")
+
+    with tracing.span('scrape_reviews', 'scrape', isbn=isbn_or_title):
+        with tracing.span('collect_reviews', 'scrape'):
+            results, status = collect_reviews(isbn_or_title, search_term, logger)
+        if not any(results.values()):
+            logger.info("レビューがありませんでした")
+        else:
+            # 検索結果のレビューサイトから本文を取得
+            all_results = [result for source_results in results.values() for result in source_results]
+            with tracing.span('crawl_review_details', 'scrape', candidates=len(all_results)):
+                crawl_review_details(isbn_or_title, all_results, logger)
+
+        review_text = build_review_text(isbn_or_title, search_term, results, status)
+        return write_review_file(isbn_or_title, review_text, logger)
+
+
+def reparse_reviews(isbn, search_term, snapshot_dir=None, review_dir=None, enabled_sources=None, amazon_url=None):
+    """
+    保存済みスナップショットからレビューを再抽出してファイルを再生成（ネットワークアクセスなし）
+
+    プロセスプールから呼び出すため、ロガーは引数ではなく名前で取得し、
+    設定は引数でも受け取る（spawn 方式の子プロセスには親プロセスの設定が引き継がれない）
+
+    Args:
+        isbn: ISBN-13
+        search_term: レビューファイルに記載する検索語
+        snapshot_dir: スナップショットの保存先（省略時は snapshot_store.SNAPSHOT_DIR）
+        review_dir: レビューファイルの保存先（省略時は REVIEW_DIR）
+        enabled_sources: 有効な収集元名のリスト（省略時は ENABLED_SOURCES）
+        amazon_url: AmazonのベースURL（省略時は AMAZON_URL）
+
     Returns:
-        str: レビュー本文
+        dict: 収集元名 → 件数
     """
-    # 将来的にAmazon、読書メーター等から詳細レビューを取得
-    # 現在は未実装（試作版ではスニペットのみ）
-    logger.info(f"詳細取得（未実装）: {url}")
-    return ""
+    global REVIEW_DIR
+    snapshot_store.configure(snapshot_dir)
+    configure(enabled=enabled_sources)
+    configure_endpoints(amazon=amazon_url)
+    if review_dir:
+        REVIEW_DIR = review_dir
+
+    logger = logging.getLogger("bookpost")
+    snapshots = snapshot_store.load(isbn)
+    if not snapshots:
+        raise ValueError(f"スナップショットがありません: {isbn}")
+
+    pages = {
+        kind: http_client.Page(snapshot['url'], snapshot['content'], snapshot['encoding'], from_cache=True)
+        for kind, snapshot in snapshots.items()
+    }
+
+    results = {}
+    with log_handlers.log_context(isbn=isbn, stage='reparse'):
+        for source in sorted(SOURCES.values(), key=lambda source: source.priority):
+            source_results = source.extract(pages, logger)
+            if source_results or source.name in ENABLED_SOURCES:
+                results[source.name] = source_results
+            attach_snapshot_details(source_results, pages)
+
+        review_text = build_review_text(isbn, search_term, results, {})
+        write_review_file(isbn, review_text, logger)
+    return {name: len(source_results) for name, source_results in results.items()}
 
 
 if __name__ == '__main__':
     # テスト実行用
-    import logging
-    
     logger = logging.getLogger('test')
     logger.setLevel(logging.INFO)
     handler = logging.StreamHandler()
     handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s: %(message)s'))
     logger.addHandler(handler)
-    
+
     # テスト
     test_isbn = "9784295404811"  # 例：『伝わる文章の書き方教室』
     result_path = scrape_reviews(test_isbn, logger)
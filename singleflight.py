@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+singleflight.py - 重複リクエスト統合モジュール
+同じキー（URL・ISBNなど）の処理が実行中の場合は新たに実行せず、
+実行中の処理の結果（例外も含む）を待っている全員で共有する
+完了後は保持しない（結果の再利用はキャッシュ側の役割）
+"""
+
+import threading
+from concurrent.futures import Future
+
+
+_groups = []
+
+
+class Group:
+    """キーごとに実行中の処理を1つにまとめるグループ（スレッドセーフ）"""
+
+    def __init__(self, name):
+        self.name = name
+        self.shared = 0     # 実行中の処理に相乗りした回数
+        self._calls = {}
+        self._lock = threading.Lock()
+        _groups.append(self)
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        キーの処理を実行（同じキーが実行中ならその結果を待って返す）
+
+        Args:
+            key: 統合のキー
+            func: 実行する関数
+            *args, **kwargs: func の引数
+
+        Returns:
+            func の戻り値
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.shared += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+def stats():
+    """グループ名 → 相乗り回数"""
+    return {group.name: group.shared for group in _groups}
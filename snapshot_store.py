@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+snapshot_store.py - HTMLスナップショット保存モジュール
+取得したページをgzip圧縮・内容アドレス（SHA-256）で保存し、ISBN × 収集元で索引
+セレクタ変更時は reparse コマンドでネットワークなしに再解析できる
+"""
+
+import os
+import gzip
+import time
+import hashlib
+import sqlite3
+import threading
+
+import tracing
+
+
+SNAPSHOT_DIR = "data/snapshots"
+
+# 収集元（ページ種別）
+GOOGLE = 'google'
+AMAZON_SEARCH = 'amazon_search'
+AMAZON_PRODUCT = 'amazon_product'
+BING = 'bing'
+DETAIL = 'detail'    # レビュー詳細ページ（"detail:{URL}" で保存）
+
+_local = threading.local()
+
+
+def configure(snapshot_dir=None):
+    """保存先の設定反映（config.json の snapshot_dir）"""
+    global SNAPSHOT_DIR
+    if snapshot_dir:
+        SNAPSHOT_DIR = snapshot_dir
+
+
+def get_connection():
+    """スレッドごとのインデックスDB接続を取得（初回のみ生成・テーブル作成）"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.snapshot_dir == SNAPSHOT_DIR:
+        return conn
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(SNAPSHOT_DIR, "index.db"), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " isbn TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " sha256 TEXT NOT NULL,"
+            " encoding TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " PRIMARY KEY (isbn, source))"
+        )
+
+    _local.conn = conn
+    _local.snapshot_dir = SNAPSHOT_DIR
+    return conn
+
+
+def _object_path(digest):
+    return os.path.join(SNAPSHOT_DIR, "objects", digest[:2], f"{digest}.html.gz")
+
+
+@tracing.traced('snapshot_save', 'io')
+def save(isbn, source, url, content, encoding):
+    """
+    ページを保存（同一内容のオブジェクトは再書き込みしない）
+
+    Args:
+        isbn: ISBN（Bing単体実行時は検索語）
+        source: 収集元（GOOGLE / AMAZON_SEARCH / AMAZON_PRODUCT / BING / "DETAIL:{URL}"）
+        url: ページURL
+        content: 本文（bytes）
+        encoding: 文字コード
+    """
+    digest = hashlib.sha256(content).hexdigest()
+    object_path = _object_path(digest)
+
+    if not os.path.exists(object_path):
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        tmp_path = f"{object_path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, object_path)
+
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO snapshots (isbn, source, url, sha256, encoding, fetched_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (isbn, source, url, digest, encoding, time.time())
+        )
+
+
+def load(isbn):
+    """
+    ISBNの最新スナップショットを読み込み
+
+    Returns:
+        dict: 収集元 → {"url", "content"（bytes）, "encoding"} の辞書（該当なしは空）
+    """
+    rows = get_connection().execute(
+        "SELECT source, url, sha256, encoding FROM snapshots WHERE isbn = ?", (isbn,)
+    ).fetchall()
+
+    snapshots = {}
+    for source, url, digest, encoding in rows:
+        try:
+            with gzip.open(_object_path(digest), 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            continue
+        snapshots[source] = {
+            'url': url,
+            'content': content,
+            'encoding': encoding,
+        }
+    return snapshots
+
+
+def list_isbns():
+    """スナップショットが保存されているISBN一覧"""
+    rows = get_connection().execute(
+        "SELECT DISTINCT isbn FROM snapshots ORDER BY isbn"
+    ).fetchall()
+    return [row[0] for row in rows]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_catalog_import.py - catalog_import.py と import コマンドのテスト
+
+実行: python -m pytest tests/（または python -m unittest discover tests）
+"""
+
+import os
+import sys
+import logging
+import argparse
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import book_cache
+import catalog_import
+
+
+def make_isbn(number):
+    """連番からチェックディジット付きのISBN-13を生成"""
+    isbn12 = f"978400{number:06d}"
+    return isbn12 + str(main.calculate_isbn13_check_digit(isbn12))
+
+
+class ResolveColumnTest(unittest.TestCase):
+    """ISBN列・見出し行の判定"""
+
+    def test_header_keyword(self):
+        self.assertEqual(catalog_import.resolve_column(['書名', 'ISBN13', '価格']), (1, True))
+
+    def test_no_header(self):
+        self.assertEqual(catalog_import.resolve_column(['9784873117782', 'テスト']), (0, False))
+
+    def test_column_name(self):
+        self.assertEqual(catalog_import.resolve_column(['title', 'code'], ' Code '), (1, True))
+        with self.assertRaises(ValueError):
+            catalog_import.resolve_column(['title', 'code'], 'isbn')
+
+    def test_column_number(self):
+        self.assertEqual(catalog_import.resolve_column(['title', 'isbn'], '2'), (1, True))
+        self.assertEqual(catalog_import.resolve_column(['テスト', '9784873117782'], '2'), (1, False))
+
+    def test_delimiter(self):
+        self.assertEqual(catalog_import.detect_delimiter('catalog.tsv', 'isbn,title'), '\t')
+        self.assertEqual(catalog_import.detect_delimiter('catalog.txt', 'isbn\ttitle'), '\t')
+        self.assertEqual(catalog_import.detect_delimiter('catalog.csv', 'isbn,title'), ',')
+
+
+class ReadRowsTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        return path
+
+    def test_header_and_bom(self):
+        path = self._write('catalog.csv', '\ufeff書名,ISBN\nA, 9784873117782 \n\nB\n')
+        self.assertEqual(list(catalog_import.read_rows(path)), [(2, '9784873117782'), (4, '')])
+
+    def test_tsv_without_header(self):
+        path = self._write('catalog.tsv', '9784873117782\tA\n9784000000000\tB\n')
+        self.assertEqual(list(catalog_import.read_rows(path)), [(1, '9784873117782'), (2, '9784000000000')])
+
+
+class SeenSetTest(unittest.TestCase):
+
+    def test_dedupe_across_chunks(self):
+        seen = catalog_import.SeenSet()
+        self.addCleanup(seen.close)
+        self.assertEqual(seen.filter_new(['a', 'b', 'a']), ['a', 'b'])
+        self.assertEqual(seen.filter_new(['b', 'c']), ['c'])
+        self.assertEqual(seen.filter_new([]), [])
+
+
+class ImportCommandTest(unittest.TestCase):
+    """import: チャンクをまたぐ重複除去・書籍情報キャッシュによる絞り込み"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        for target, name, value in (
+            (book_cache, 'DB_PATH', os.path.join(tmp.name, 'books.db')),
+            (book_cache, 'LEGACY_DIR', os.path.join(tmp.name, 'books')),
+            (catalog_import, 'CHUNK_SIZE', 2),
+        ):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.logger = logging.getLogger('bookpost.test')
+
+    def _run(self, rows):
+        catalog = os.path.join(self.tmp, 'catalog.csv')
+        with open(catalog, 'w', encoding='utf-8') as f:
+            f.write('isbn,title\n' + ''.join(f"{isbn},本\n" for isbn in rows))
+        output = os.path.join(self.tmp, 'out.txt')
+        invalid = os.path.join(self.tmp, 'invalid.csv')
+        args = argparse.Namespace(file=catalog, column=None, delimiter=None, output=output,
+                                  invalid=invalid, enqueue=None, priority=0)
+        main.cmd_import(args, self.logger)
+        with open(output, encoding='utf-8') as f:
+            needed = f.read().split()
+        with open(invalid, encoding='utf-8') as f:
+            invalid_rows = f.read().splitlines()[1:]
+        return needed, invalid_rows
+
+    def test_dedupe_and_cache_filter(self):
+        isbns = [make_isbn(i) for i in range(5)]
+        book_cache.put(isbns[1], {'title': '取得済み'})
+        book_cache.put_not_found(isbns[2])
+        # 1チャンク2行: 重複（ISBN-10・ハイフン表記を含む）は別チャンクでも除く
+        isbn10 = '4-00-000000-' + main.calculate_isbn10_check_digit('400000000')
+        rows = [isbns[0], isbns[1], 'bad', isbns[2], isbns[3], isbn10, isbns[4], isbns[3]]
+
+        needed, invalid_rows = self._run(rows)
+
+        self.assertEqual(needed, [isbns[0], isbns[3], isbns[4]])
+        self.assertEqual(len(invalid_rows), 1)
+        self.assertTrue(invalid_rows[0].startswith('4,bad,'))
+
+
+if __name__ == '__main__':
+    unittest.main()
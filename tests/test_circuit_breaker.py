@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_circuit_breaker.py - circuit_breaker.py のテスト
+
+実行: python -m pytest tests/（または python -m unittest discover tests）
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import circuit_breaker
+import http_client
+
+HOST = 'books.example.com'
+
+
+class FakeClock:
+    """circuit_breaker の time.monotonic() を置き換える時計（advance で進める）"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    """CircuitBreaker: closed → open → half-open → closed / open の遷移"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        for name, value in (('time', self.clock), ('FAILURE_THRESHOLD', 3),
+                            ('OPEN_SECONDS', 60), ('MAX_OPEN_SECONDS', 100)):
+            patcher = mock.patch.object(circuit_breaker, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.breaker = circuit_breaker.CircuitBreaker(HOST)
+
+    def _trip(self):
+        for _ in range(circuit_breaker.FAILURE_THRESHOLD):
+            self.breaker.before_request()
+            self.breaker.on_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(circuit_breaker.FAILURE_THRESHOLD - 1):
+            self.breaker.on_failure()
+        self.breaker.on_success()
+        # 成功を挟むと連続失敗はリセット
+        self.assertEqual((self.breaker.state, self.breaker.failures), (circuit_breaker.CLOSED, 0))
+
+        self._trip()
+        self.assertEqual((self.breaker.state, self.breaker.trips), (circuit_breaker.OPEN, 1))
+        with self.assertRaises(circuit_breaker.CircuitOpenError):
+            self.breaker.before_request()
+        self.assertEqual(self.breaker.rejected, 1)
+
+    def test_half_open_allows_single_probe(self):
+        self._trip()
+        self.clock.advance(60)
+        self.breaker.before_request()
+        self.assertEqual(self.breaker.state, circuit_breaker.HALF_OPEN)
+        # 復旧確認中は2件目以降を遮断
+        with self.assertRaises(circuit_breaker.CircuitOpenError):
+            self.breaker.before_request()
+
+    def test_probe_success_closes(self):
+        self._trip()
+        self.clock.advance(60)
+        self.breaker.before_request()
+        self.breaker.on_success()
+        self.assertEqual((self.breaker.state, self.breaker.failures), (circuit_breaker.CLOSED, 0))
+        self.breaker.before_request()
+
+    def test_probe_failure_reopens_with_longer_interval(self):
+        self._trip()
+        self.clock.advance(60)
+        self.breaker.before_request()
+        self.breaker.on_failure()
+        # 遮断時間は倍（120秒）に延長、ただし MAX_OPEN_SECONDS（100秒）まで
+        self.assertEqual((self.breaker.state, self.breaker.open_seconds), (circuit_breaker.OPEN, 100))
+        self.clock.advance(99)
+        with self.assertRaises(circuit_breaker.CircuitOpenError):
+            self.breaker.before_request()
+        self.clock.advance(1)
+        self.breaker.before_request()
+        self.assertEqual(self.breaker.state, circuit_breaker.HALF_OPEN)
+
+    def test_release_probe_allows_next_probe(self):
+        self._trip()
+        self.clock.advance(60)
+        self.breaker.before_request()
+        self.breaker.release_probe()
+        self.breaker.before_request()
+        self.assertEqual(self.breaker.state, circuit_breaker.HALF_OPEN)
+
+
+class HttpClientProbeTest(unittest.TestCase):
+    """http_client: 復旧確認の試行が再試行対象外の例外で終わった場合"""
+
+    def setUp(self):
+        self.addCleanup(circuit_breaker.configure, circuit_breaker.FAILURE_THRESHOLD,
+                        circuit_breaker.OPEN_SECONDS, circuit_breaker.MAX_OPEN_SECONDS)
+        circuit_breaker.configure(failure_threshold=1, open_seconds=0)
+
+    def test_probe_released_after_other_exception(self):
+        circuit_breaker.record_failure(HOST)
+        error = requests.exceptions.TooManyRedirects('too many redirects')
+        with mock.patch.object(http_client.get_session(), 'request', side_effect=error) as request:
+            for _ in range(2):
+                with self.assertRaises(requests.exceptions.TooManyRedirects):
+                    http_client.request('GET', f'https://{HOST}/', retries=0)
+        # 2件目も「復旧確認中」で遮断されず、実際に試行される
+        self.assertEqual(request.call_count, 2)
+        self.assertFalse(circuit_breaker.get_breaker(HOST).probing)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_job_queue.py - job_queue.py のテスト
+
+実行: python -m pytest tests/（または python -m unittest discover tests）
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import job_queue
+
+ISBN1 = '9784873117782'
+ISBN2 = '9784000000000'
+
+
+class FakeClock:
+    """job_queue の time.time() を置き換える時計（advance で進める）"""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class JobQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.clock = FakeClock()
+        for target, name, value in (
+            (job_queue, 'DB_PATH', os.path.join(tmp.name, 'jobs.db')),
+            (job_queue, 'MAX_ATTEMPTS', 3),
+            (job_queue, 'LEASE_SECONDS', 300),
+            (job_queue, 'RETRY_DELAY', 60),
+            (job_queue, 'RETRY_DELAY_MAX', 3600),
+            (job_queue, 'time', self.clock),
+        ):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_enqueue_merges_pending_jobs(self):
+        self.assertEqual(job_queue.enqueue([ISBN1, ISBN2], job_queue.FETCH), (2, 0))
+        self.assertEqual(job_queue.enqueue([ISBN1], job_queue.FETCH, priority=5), (0, 1))
+        # 登録済みのジョブは優先度の高い方に揃える
+        job = job_queue.lease('w1')
+        self.assertEqual((job['isbn'], job['priority'], job['attempts']), (ISBN1, 5, 1))
+
+    def test_lease_order_and_complete(self):
+        job_queue.enqueue([ISBN1], job_queue.FETCH)
+        job_queue.enqueue([ISBN2], job_queue.FETCH, priority=1)
+        self.assertEqual(job_queue.lease('w1')['isbn'], ISBN2)
+        job = job_queue.lease('w2')
+        self.assertEqual(job['isbn'], ISBN1)
+        self.assertIsNone(job_queue.lease('w3'))
+
+        job_queue.complete(job['id'], 'w2')
+        self.assertEqual(job_queue.stats()[job_queue.FETCH][job_queue.DONE], 1)
+        self.assertEqual(job_queue.pending_count(), 1)
+
+    def test_same_isbn_not_leased_twice(self):
+        job_queue.enqueue([ISBN1], job_queue.FETCH)
+        job_queue.enqueue([ISBN1], job_queue.POST)
+        fetch = job_queue.lease('w1')
+        self.assertEqual(fetch['kind'], job_queue.FETCH)
+        # 同じISBNの post はリース中の fetch が終わるまで取り出さない
+        self.assertIsNone(job_queue.lease('w2'))
+        job_queue.complete(fetch['id'], 'w1')
+        self.assertEqual(job_queue.lease('w2')['kind'], job_queue.POST)
+
+    def test_fail_backoff_until_max_attempts(self):
+        job_queue.enqueue([ISBN1], job_queue.FETCH)
+        for attempt, delay in ((1, 60), (2, 120)):
+            job = job_queue.lease('w1')
+            self.assertEqual(job['attempts'], attempt)
+            retry_at = job_queue.fail(job['id'], 'w1', 'timeout')
+            self.assertEqual(retry_at, self.clock.now + delay)
+            # 待ち時間の間は取り出さない
+            self.assertIsNone(job_queue.lease('w1'))
+            self.clock.advance(delay)
+
+        job = job_queue.lease('w1')
+        self.assertEqual(job['attempts'], 3)
+        self.assertIsNone(job_queue.fail(job['id'], 'w1', 'timeout'))
+        self.assertEqual(job_queue.list_failed(), [(ISBN1, job_queue.FETCH, 'timeout')])
+        self.assertEqual(job_queue.pending_count(), 0)
+
+    def test_fail_without_retry(self):
+        job_queue.enqueue([ISBN1], job_queue.POST)
+        job = job_queue.lease('w1')
+        self.assertIsNone(job_queue.fail(job['id'], 'w1', 'ファイルなし', retry=False))
+        self.assertEqual(job_queue.stats()[job_queue.POST][job_queue.FAILED], 1)
+
+    def test_expired_lease_is_reclaimed(self):
+        job_queue.enqueue([ISBN1], job_queue.FETCH)
+        job = job_queue.lease('w1')
+        self.assertIsNone(job_queue.lease('w2'))
+
+        self.clock.advance(job_queue.LEASE_SECONDS)
+        reclaimed = job_queue.lease('w2')
+        self.assertEqual((reclaimed['id'], reclaimed['attempts']), (job['id'], 2))
+        # 期限切れのワーカーは完了・延長できない
+        self.assertFalse(job_queue.extend(job['id'], 'w1'))
+        job_queue.complete(job['id'], 'w1')
+        self.assertEqual(job_queue.stats()[job_queue.FETCH][job_queue.LEASED], 1)
+        self.assertTrue(job_queue.extend(job['id'], 'w2'))
+
+    def test_expired_lease_at_max_attempts_fails(self):
+        job_queue.enqueue([ISBN1], job_queue.FETCH, max_attempts=1)
+        job_queue.lease('w1')
+        self.clock.advance(job_queue.LEASE_SECONDS)
+        self.assertIsNone(job_queue.lease('w2'))
+        self.assertEqual(job_queue.stats()[job_queue.FETCH][job_queue.FAILED], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_main.py - main.py のテスト
+
+実行: python -m pytest tests/（または python -m unittest discover tests）
+"""
+
+import os
+import sys
+import logging
+import argparse
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import book_cache
+import pipeline_state
+import snapshot_store
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bench', 'fixtures')
+
+
+class IsbnTest(unittest.TestCase):
+    """ISBNの正規化・チェックディジット"""
+
+    def test_check_digit(self):
+        self.assertEqual(main.calculate_isbn13_check_digit('978400000000'), 0)
+        self.assertEqual(main.calculate_isbn13_check_digit('978487311778'), 2)
+
+    def test_check_digit_full_width(self):
+        # 全角数字も1桁ずつ数値に変換して計算（UnicodeEncodeError にしない）
+        self.assertEqual(main.calculate_isbn13_check_digit('９７８４８７３１１７７８'), 2)
+
+    def test_check_digit_invalid(self):
+        with self.assertRaises(ValueError):
+            main.calculate_isbn13_check_digit('97848731177X')
+
+    def test_normalize_full_width(self):
+        self.assertEqual(main.normalize_isbn('ＩＳＢＮ９７８－４－８７３１１－７７８－２'), '9784873117782')
+        self.assertEqual(main.normalize_isbn('９７８４０００００００００'), '9784000000000')
+
+    def test_normalize_isbn10(self):
+        self.assertEqual(main.normalize_isbn('4-87311-778-X'), '9784873117782')
+
+    def test_normalize_invalid_check_digit(self):
+        with self.assertRaises(ValueError):
+            main.normalize_isbn('9784000000002')
+
+
+class ReparseTest(unittest.TestCase):
+    """reparse: 再生成したレビューファイルがパイプライン状態に記録されること"""
+
+    isbn = '9784000000000'
+
+    def setUp(self):
+        import scraper
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.scraper = scraper
+        # 設定はすべて一時ディレクトリに向ける（スレッドごとのSQLite接続はパスが変わると作り直される）
+        for target, name, value in (
+            (snapshot_store, 'SNAPSHOT_DIR', os.path.join(tmp.name, 'snapshots')),
+            (pipeline_state, 'DB_PATH', os.path.join(tmp.name, 'state', 'pipeline.db')),
+            (book_cache, 'DB_PATH', os.path.join(tmp.name, 'books', 'books.db')),
+            (book_cache, 'LEGACY_DIR', os.path.join(tmp.name, 'books')),
+            (scraper, 'REVIEW_DIR', os.path.join(tmp.name, 'reviews')),
+        ):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.logger = logging.getLogger('bookpost.test')
+
+    def test_reparse_marks_reviews_fresh(self):
+        with open(os.path.join(FIXTURE_DIR, 'google_serp.html'), 'rb') as f:
+            content = f.read()
+        snapshot_store.save(self.isbn, snapshot_store.GOOGLE, 'https://www.google.com/search?q=test', content, 'utf-8')
+        pipeline_state.mark_done(self.isbn, pipeline_state.METADATA, 'metadata-hash')
+
+        args = argparse.Namespace(isbn=self.isbn, isbn_file=None, workers=1)
+        main.cmd_reparse(args, self.logger)
+
+        review_path = self.scraper.review_file_path(self.isbn)
+        self.assertTrue(os.path.exists(review_path))
+        self.assertTrue(pipeline_state.is_fresh(self.isbn, pipeline_state.REVIEWS, review_path))
+
+
+class PostStageTest(unittest.TestCase):
+    """post: 削除された記事の再投稿・アップロード済み画像の再利用"""
+
+    isbn = '9784873117782'
+
+    def setUp(self):
+        import wp_client
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.wp_client = wp_client
+        self.image_file = os.path.join(tmp.name, f'thumbnail_{self.isbn}.png')
+        with open(self.image_file, 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n')
+        for target, name, value in (
+            (pipeline_state, 'DB_PATH', os.path.join(tmp.name, 'state', 'pipeline.db')),
+            (main, 'image_path', lambda isbn: self.image_file),
+            (wp_client, 'resolve_tags', lambda names: []),
+            (wp_client, 'CATEGORY_ID', None),
+        ):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.upload_media = self._patch('upload_media', side_effect=[{'id': 11}, {'id': 12}])
+        self.logger = logging.getLogger('bookpost.test')
+        self.post_data = {'title': 'テスト', 'content': '', 'status': 'draft', 'categories': [], 'tags': []}
+
+    def _patch(self, name, **kwargs):
+        patcher = mock.patch.object(self.wp_client, name, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_deleted_post_is_created_again(self):
+        pipeline_state.record_post(self.isbn, 100, None, None, 'http://wp/?p=100')
+        not_found = self.wp_client.WordPressError("記事投稿失敗: HTTP 404", 404)
+        save_post = self._patch('save_post', side_effect=[not_found, {'id': 200, 'link': 'http://wp/?p=200'}])
+
+        result = main.post_stage(self.isbn, self.post_data, self.logger)
+
+        self.assertEqual(result['id'], 200)
+        self.assertEqual([call.args[1] for call in save_post.call_args_list], [100, None])
+        self.assertEqual(pipeline_state.get_post(self.isbn)['post_id'], 200)
+
+    def test_media_reused_after_failed_post(self):
+        failure = self.wp_client.WordPressError("記事投稿失敗: HTTP 500", 500)
+        save_post = self._patch('save_post', side_effect=[failure, {'id': 200, 'link': 'http://wp/?p=200'}])
+
+        with self.assertRaises(self.wp_client.WordPressError):
+            main.post_stage(self.isbn, self.post_data, self.logger)
+        main.post_stage(self.isbn, self.post_data, self.logger)
+
+        self.assertEqual(self.upload_media.call_count, 1)
+        self.assertEqual(save_post.call_args.args[0]['featured_media'], 11)
+        self.assertEqual(pipeline_state.get_post(self.isbn)['media_id'], 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+test_robots_cache.py - robots_cache.py のテスト
+
+実行: python -m pytest tests/（または python -m unittest discover tests）
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import http_client
+import robots_cache
+
+ROBOTS_TXT = b"User-agent: bookpost\nDisallow: /private/\n\nUser-agent: *\nDisallow: /\n"
+
+
+def _response(url, content, status_code=200):
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = url
+    response._content = content
+    response.headers['Content-Type'] = 'text/plain'
+    return response
+
+
+class RobotsAgentTest(unittest.TestCase):
+    """robots.txt の判定と取得時の User-Agent が一致すること"""
+
+    def setUp(self):
+        robots_cache._robots.clear()
+        self.addCleanup(robots_cache._robots.clear)
+        patcher = mock.patch.object(http_client.get_session(), 'request',
+                                    side_effect=lambda method, url, **kwargs: _response(url, ROBOTS_TXT))
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rules_for_sent_agent(self):
+        self.assertTrue(robots_cache.allowed('https://reviews.example.com/book/1'))
+        self.assertFalse(robots_cache.allowed('https://reviews.example.com/private/1'))
+
+        user_agent = self.request.call_args.kwargs['headers']['User-Agent']
+        self.assertTrue(user_agent.startswith(f"{robots_cache.USER_AGENT}/"))
+
+
+if __name__ == '__main__':
+    unittest.main()
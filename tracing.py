@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+tracing.py - 処理時間計測モジュール
+書籍情報取得・レビュー収集・HTML解析・ファイル入出力を入れ子のスパンとして記録し、
+Chrome トレース形式（chrome://tracing / Perfetto で表示）で保存する
+スパンには転送バイト数・キャッシュヒットなどの属性を付けられる
+
+--profile 指定時のみ有効（無効時の span() は何もしないオブジェクトを返すだけ）
+cProfile による関数単位のプロファイル（pstats形式）も併せて出力できる
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from functools import wraps
+
+
+PROFILE_DIR = "data/profile"
+MAX_EVENTS = 1000000    # 記録するスパンの上限（超過分は破棄して件数のみ記録）
+
+ENABLED = False
+
+_events = []
+_dropped = 0
+_lock = threading.Lock()
+_local = threading.local()
+_origin_ns = time.perf_counter_ns()
+_profilers = []
+
+
+class Span:
+    """計測中のスパン（with文で使用）"""
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def set(self, **args):
+        """属性を追加（bytes・cache など）"""
+        self.args.update(args)
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end_ns = time.perf_counter_ns()
+        _local.stack.pop()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        _record({
+            'name': self.name,
+            'cat': self.category,
+            'ph': 'X',
+            'ts': (self.start_ns - _origin_ns) / 1000,
+            'dur': (end_ns - self.start_ns) / 1000,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': self.args,
+        })
+        return False
+
+
+class _NullSpan:
+    """無効時のスパン（何もしない）"""
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _record(event):
+    global _dropped
+    with _lock:
+        if len(_events) < MAX_EVENTS:
+            _events.append(event)
+        else:
+            _dropped += 1
+
+
+def enable():
+    """計測を開始"""
+    global ENABLED, _origin_ns
+    with _lock:
+        _events.clear()
+    _origin_ns = time.perf_counter_ns()
+    ENABLED = True
+
+
+def span(name, category='app', **args):
+    """
+    スパンを開始（with文で使用、無効時は何もしない）
+
+    Args:
+        name: スパン名
+        category: 分類（network / parse / io / cache など）
+        **args: 属性（isbn・url など）
+
+    Returns:
+        Span: with文で使用するスパン
+    """
+    if not ENABLED:
+        return _NULL_SPAN
+    return Span(name, category, args)
+
+
+def annotate(**args):
+    """実行中（最も内側）のスパンに属性を追加"""
+    if not ENABLED:
+        return
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        stack[-1].set(**args)
+
+
+def traced(name=None, category='app'):
+    """関数全体をスパンとして記録するデコレーター"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            with Span(span_name, category, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def write_trace(path):
+    """
+    記録したスパンを Chrome トレース形式で保存
+
+    Args:
+        path: 保存先（JSON）
+
+    Returns:
+        int: 保存したスパン数
+    """
+    with _lock:
+        events = list(_events)
+        dropped = _dropped
+    threads = {thread.ident: thread.name for thread in threading.enumerate()}
+    metadata = [
+        {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid,
+         'args': {'name': threads.get(tid, f"thread-{tid}")}}
+        for tid in sorted({event['tid'] for event in events})
+    ]
+
+    trace_dir = os.path.dirname(path)
+    if trace_dir:
+        os.makedirs(trace_dir, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'traceEvents': metadata + events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'dropped_spans': dropped},
+        }, f, ensure_ascii=False)
+    return len(events)
+
+
+def summary():
+    """
+    スパン名ごとの集計
+
+    Returns:
+        list: {"name", "count", "total_ms", "max_ms", "bytes"} のリスト（合計時間の降順）
+    """
+    totals = {}
+    with _lock:
+        events = list(_events)
+    for event in events:
+        item = totals.setdefault(event['name'], {'name': event['name'], 'count': 0,
+                                                 'total_ms': 0.0, 'max_ms': 0.0, 'bytes': 0})
+        duration_ms = event['dur'] / 1000
+        item['count'] += 1
+        item['total_ms'] += duration_ms
+        item['max_ms'] = max(item['max_ms'], duration_ms)
+        item['bytes'] += event['args'].get('bytes', 0)
+    return sorted(totals.values(), key=lambda item: item['total_ms'], reverse=True)
+
+
+# --- cProfile --------------------------------------------------------------
+
+def _profile_thread(frame, event, arg):
+    import cProfile
+
+    # 新しいスレッドの最初の呼び出しで、そのスレッド用のプロファイラーを開始
+    profiler = cProfile.Profile()
+    with _lock:
+        _profilers.append(profiler)
+    profiler.enable()
+
+
+def start_profile():
+    """cProfile を開始（以降に起動したワーカースレッドも対象）"""
+    import cProfile
+
+    profiler = cProfile.Profile()
+    _profilers.append(profiler)
+    profiler.enable()
+    # 3.12以降の cProfile は全スレッド共通（sys.monitoring）のため、スレッドごとの開始は不要
+    if sys.version_info < (3, 12):
+        threading.setprofile(_profile_thread)
+
+
+def stop_profile(path):
+    """
+    cProfile を終了して pstats 形式で保存
+
+    Args:
+        path: 保存先（.prof、`python -m pstats` や snakeviz で表示）
+
+    Returns:
+        pstats.Stats: 全スレッド分を合算した統計
+    """
+    import pstats
+
+    threading.setprofile(None)
+    with _lock:
+        profilers = list(_profilers)
+        _profilers.clear()
+    for profiler in profilers:
+        profiler.disable()
+    stats = pstats.Stats(*profilers)
+
+    profile_dir = os.path.dirname(path)
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+    stats.dump_stats(path)
+    return stats
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+wp_client.py - WordPress REST API 通信モジュール
+画像アップロード（/media）・記事投稿（/posts）・タグ解決（/tags）を
+共通セッション（http_client.py、keep-alive）とアプリケーションパスワードの Basic 認証で行う
+
+画像は multipart に組み立てず、ファイルをそのまま本文として送信する
+（Content-Disposition でファイル名を指定、メモリに読み込まずストリーミング）
+同時アップロード数は UPLOAD_WORKERS で制限し、他のワーカーの記事投稿と並行させる
+"""
+
+import os
+import html
+import base64
+import mimetypes
+import threading
+
+import http_client
+import singleflight
+
+
+# 接続設定（config.json の wp_url / wp_user / wp_app_password）
+WP_URL = None             # 記事投稿のエンドポイント（.../wp-json/wp/v2/posts）
+CATEGORY_ID = None
+DEFAULT_TAGS = []
+
+UPLOAD_WORKERS = 2        # 同時アップロード数（config.json の wp_upload_workers）
+UPLOAD_TIMEOUT = 60       # アップロードの応答待ち（秒、サーバー側でサムネイル生成があるため長め）
+
+_auth_header = None
+_upload_slots = threading.BoundedSemaphore(UPLOAD_WORKERS)
+
+# タグ名 → ID（実行中に作成したタグも含む）
+_tag_ids = {}
+_tag_lock = threading.Lock()
+# 同じタグの検索・作成が実行中なら結果を共有（同時作成による重複を防ぐ）
+_tag_flight = singleflight.Group('wp_tag')
+
+
+class WordPressError(Exception):
+    """WordPress REST API のエラー（認証失敗・画像アップロード失敗・記事投稿失敗）"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def configure(url=None, user=None, app_password=None, category_id=None, default_tags=None,
+              upload_workers=None, upload_timeout=None):
+    """
+    接続設定の反映（config.json の wp_*）
+
+    Args:
+        url: 記事投稿のエンドポイント（wp_url）
+        user: ユーザー名
+        app_password: アプリケーションパスワード
+        category_id: 投稿カテゴリID
+        default_tags: 全記事に付けるタグ名
+        upload_workers: 同時アップロード数
+        upload_timeout: アップロードの応答待ち（秒）
+    """
+    global WP_URL, CATEGORY_ID, DEFAULT_TAGS, UPLOAD_WORKERS, UPLOAD_TIMEOUT
+    global _auth_header, _upload_slots
+    if url:
+        WP_URL = url.rstrip('/')
+    if user and app_password:
+        token = base64.b64encode(f"{user}:{app_password}".encode('utf-8')).decode('ascii')
+        _auth_header = f"Basic {token}"
+    if category_id is not None:
+        CATEGORY_ID = category_id
+    if default_tags is not None:
+        DEFAULT_TAGS = list(default_tags)
+    if upload_workers is not None:
+        UPLOAD_WORKERS = max(1, upload_workers)
+        _upload_slots = threading.BoundedSemaphore(UPLOAD_WORKERS)
+    if upload_timeout is not None:
+        UPLOAD_TIMEOUT = upload_timeout
+
+
+def api_url(resource):
+    """REST API のURL（wp_url の /posts を置き換え）"""
+    if not WP_URL:
+        raise WordPressError("WordPressの接続設定がありません（config.json の wp_url）")
+    base = WP_URL[:-len('/posts')] if WP_URL.endswith('/posts') else WP_URL
+    return f"{base}/{resource}"
+
+
+def _headers(extra=None):
+    if _auth_header is None:
+        raise WordPressError("WordPressの認証情報がありません（config.json の wp_user / wp_app_password）")
+    headers = {'Authorization': _auth_header}
+    if extra:
+        headers.update(extra)
+    return headers
+
+
+def _check(response, action):
+    """エラー応答を WordPressError に変換（401は認証失敗）"""
+    if response.status_code == 401:
+        raise WordPressError("WordPress認証失敗", response.status_code)
+    if response.status_code >= 400:
+        try:
+            detail = response.json().get('message', '')
+        except ValueError:
+            detail = response.text[:200]
+        raise WordPressError(f"{action}失敗: HTTP {response.status_code} {detail}".rstrip(), response.status_code)
+
+
+def upload_media(path, filename=None):
+    """
+    画像アップロード（ファイルを本文としてストリーミング送信）
+
+    Args:
+        path: 画像ファイルパス
+        filename: WordPress に登録するファイル名（省略時は path のファイル名、
+                  縮小済みのキャッシュを送る場合は元画像の名前を指定）
+
+    Returns:
+        dict: メディア情報（id, source_url など）
+
+    Raises:
+        WordPressError: 認証失敗・アップロード失敗時
+    """
+    filename = filename or os.path.basename(path)
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    headers = _headers({
+        'Content-Type': content_type,
+        'Content-Disposition': f'attachment; filename="{filename}"',
+    })
+    with _upload_slots, open(path, 'rb') as f:
+        # 本文がファイルのため再試行しない（失敗分は次回の post で再実行）
+        response = http_client.request('POST', api_url('media'), headers=headers, data=f,
+                                       timeout=(http_client.CONNECT_TIMEOUT, UPLOAD_TIMEOUT))
+    _check(response, '画像アップロード')
+    return response.json()
+
+
+def save_post(post_data, post_id=None):
+    """
+    記事投稿（post_id 指定時は既存の記事を更新）
+
+    Args:
+        post_data: 投稿データ（title, content, status, categories, tags, featured_media）
+        post_id: 更新する記事ID
+
+    Returns:
+        dict: 記事情報（id, link, status など）
+
+    Raises:
+        WordPressError: 認証失敗・投稿失敗時
+    """
+    url = api_url('posts') if post_id is None else api_url(f'posts/{post_id}')
+    response = http_client.request('POST', url, headers=_headers(), json=post_data)
+    _check(response, '記事投稿')
+    return response.json()
+
+
+def resolve_tags(names):
+    """
+    タグ名をIDに変換（存在しないタグは作成）
+
+    Args:
+        names: タグ名のリスト
+
+    Returns:
+        list: タグIDのリスト（重複を除く、入力順）
+    """
+    tag_ids = []
+    for name in names:
+        name = name.strip()
+        if not name:
+            continue
+        key = name.casefold()
+        with _tag_lock:
+            tag_id = _tag_ids.get(key)
+        if tag_id is None:
+            tag_id = _tag_flight.do(key, _resolve_tag, name)
+            with _tag_lock:
+                _tag_ids[key] = tag_id
+        if tag_id not in tag_ids:
+            tag_ids.append(tag_id)
+    return tag_ids
+
+
+def _resolve_tag(name):
+    response = http_client.get(api_url('tags'), headers=_headers(), params={'search': name, 'per_page': 100})
+    _check(response, 'タグ取得')
+    for tag in response.json():
+        # 応答のタグ名はHTMLエスケープ済み
+        if html.unescape(tag['name']).casefold() == name.casefold():
+            return tag['id']
+
+    response = http_client.request('POST', api_url('tags'), headers=_headers(), json={'name': name})
+    if response.status_code == 400:
+        # 検索とのすれ違いで作成済みの場合
+        error = response.json()
+        if error.get('code') == 'term_exists':
+            return error['data']['term_id']
+    _check(response, 'タグ作成')
+    return response.json()['id']